@@ -0,0 +1,87 @@
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+
+ANALYSIS_CACHE_FILE = 'analysis_cache.sqlite'
+
+ANALYSIS_CACHE_TTL_SECONDS = 7 * 24 * 3600
+
+ANALYSIS_CACHE_MAX_ENTRIES = 2000
+
+# What the page itself says and how it is served. Timings and everything
+# computed across the crawl (degrees, PageRank, clusters, layout, crawl stats,
+# link health) are left out, so a page keeps its cached analysis until its own
+# content changes. text_hash stands in for the body text.
+ANALYSIS_KEY_FIELDS = (
+    "url", "status_code", "truncated", "http_delivery", "security", "internal_links", "external_links",
+    "title", "meta_description", "meta_keywords", "h1_tags", "has_viewport_meta", "lang_attribute",
+    "text_hash", "word_count", "image_count", "script_count", "stylesheet_count", "heading_count",
+    "paragraph_count", "structured", "semantic_elements", "heading_issues", "unlabeled_inputs",
+    "images_without_alt", "a11y_extras", "mixed_content", "link_rel", "media_hints",
+    "keyword_density", "detected_language", "language_match",
+)
+
+def _key_material(page_data):
+    material = {k: page_data[k] for k in ANALYSIS_KEY_FIELDS if k in page_data}
+    if "text_hash" not in material:
+        material["text_content"] = page_data.get("text_content")
+    delivery = material.get("http_delivery")
+    if isinstance(delivery, dict):
+        material["http_delivery"] = dict(delivery, redirect_chain=[
+            {"url": hop.get("url"), "status": hop.get("status")} for hop in delivery.get("redirect_chain") or []])
+    return material
+
+def analysis_cache_key(page_data, **request_params):
+    material = {"page": _key_material(page_data), "request": request_params}
+    encoded = json.dumps(material, sort_keys=True, ensure_ascii=False, separators=(',', ':'))
+    return hashlib.sha256(encoded.encode('utf-8')).hexdigest()
+
+class AnalysisCache:
+    def __init__(self, db_file=ANALYSIS_CACHE_FILE, ttl=ANALYSIS_CACHE_TTL_SECONDS, max_entries=ANALYSIS_CACHE_MAX_ENTRIES):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_file, check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS analyses ("
+            "key TEXT PRIMARY KEY, analysis TEXT NOT NULL, created_at REAL NOT NULL, last_used REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS analyses_last_used ON analyses (last_used)")
+        self._conn.commit()
+
+    def get(self, key):
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute("SELECT analysis, created_at FROM analyses WHERE key = ?", (key,)).fetchone()
+            if not row:
+                return None
+            if self.ttl is not None and now - row[1] > self.ttl:
+                self._conn.execute("DELETE FROM analyses WHERE key = ?", (key,))
+                self._conn.commit()
+                return None
+            self._conn.execute("UPDATE analyses SET last_used = ? WHERE key = ?", (now, key))
+            self._conn.commit()
+            return row[0]
+
+    def put(self, key, analysis):
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO analyses (key, analysis, created_at, last_used) VALUES (?, ?, ?, ?)",
+                (key, analysis, now, now)
+            )
+            if self.ttl is not None:
+                self._conn.execute("DELETE FROM analyses WHERE created_at < ?", (now - self.ttl,))
+            if self.max_entries is not None:
+                self._conn.execute(
+                    "DELETE FROM analyses WHERE key IN ("
+                    "SELECT key FROM analyses ORDER BY last_used DESC LIMIT -1 OFFSET ?)",
+                    (self.max_entries,)
+                )
+            self._conn.commit()
+
+    def __len__(self):
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM analyses").fetchone()[0]
@@ -0,0 +1,207 @@
+import re
+from collections import namedtuple
+from urllib.parse import urldefrag, urljoin
+
+import nlp
+from dom_analyzer import analyze_dom, parse_html, scan_hrefs
+from frontier import canonicalize_url, is_internal
+from near_duplicates import simhash_hex, text_fingerprint
+
+NLP_FIELDS = ("readability_score", "sentiment", "keyword_density", "detected_language")
+
+READING_WORDS_PER_MINUTE = 200
+
+# A per-page analyzer adds `fields` to the page record. Analyzers with
+# dom=False can run from the raw HTML without building a parse tree.
+Analyzer = namedtuple("Analyzer", ["name", "fields", "run", "dom"])
+
+ANALYZERS = {}
+
+def analyzer(name, fields, dom=True):
+    def register(run):
+        ANALYZERS[name] = Analyzer(name, tuple(fields), run, dom)
+        return run
+    return register
+
+# Inputs shared by the analyzers of one page. The parse and the single DOM pass
+# run at most once, and only if an analyzer in the profile needs them.
+class PageContext:
+    def __init__(self, page, start_url, timer, html_parser='html.parser', uses_dom=True):
+        self.page = page
+        self.url = page["url"]
+        self.base_url = page.get("base_url") or page["url"]
+        self.start_url = start_url
+        self.timer = timer
+        self.html_parser = html_parser
+        self.uses_dom = uses_dom
+        self.internal_links_found = []
+        self.reused = False
+        self._dom = None
+        self._fingerprint = None
+
+    @property
+    def dom(self):
+        if self._dom is None:
+            with self.timer.stage("parse"):
+                soup = parse_html(self.page["html"], self.html_parser)
+            with self.timer.stage("dom"):
+                self._dom = analyze_dom(soup, self.base_url)
+        return self._dom
+
+    @property
+    def text(self):
+        return self.dom["text"]
+
+    @property
+    def fingerprint(self):
+        if self._fingerprint is None:
+            self._fingerprint = text_fingerprint(self.text)
+        return self._fingerprint
+
+    # NLP results are copied from the previous crawl when the text is unchanged.
+    def nlp(self, field, compute):
+        previous = self.page.get("previous") or {}
+        if field in previous and previous.get("text_hash") == self.fingerprint:
+            self.reused = True
+            return previous[field]
+        return compute(self.text)
+
+@analyzer("links", ("internal_links", "external_links"), dom=False)
+def links(ctx):
+    hrefs = ctx.dom["hrefs"] if ctx.uses_dom else scan_hrefs(ctx.page["html"])
+    internal_links_found = []
+    internal_links = []
+    external_links_found = []
+    for href in hrefs:
+        if not href or href.startswith('#') or href.startswith('mailto:') or href.startswith('tel:'):
+            continue
+
+        absolute_href = urldefrag(urljoin(ctx.base_url, href))[0]
+        canonical_href = canonicalize_url(absolute_href)
+
+        if is_internal(canonical_href, ctx.start_url):
+            internal_links_found.append(absolute_href)
+            internal_links.append(canonical_href)
+        else:
+            external_links_found.append(canonical_href)
+    ctx.internal_links_found = internal_links_found
+    return {
+        "internal_links": list(sorted(set(internal_links))),
+        "external_links": list(sorted(set(external_links_found)))
+    }
+
+@analyzer("meta", ("title", "meta_description", "meta_keywords", "h1_tags", "has_viewport_meta", "lang_attribute"))
+def meta(ctx):
+    return {key: ctx.dom[key] for key in ("title", "meta_description", "meta_keywords", "h1_tags", "has_viewport_meta", "lang_attribute")}
+
+@analyzer("content", ("text_content", "search_text", "word_count", "read_time_minutes", "image_count", "script_count",
+                      "stylesheet_count", "heading_count", "paragraph_count"))
+def content(ctx):
+    dom = ctx.dom
+    text = dom["text"]
+    text_content = text.strip()
+    word_count = len(text.split()) if text else 0
+    return {
+        "text_content": text_content,
+        "search_text": re.sub(r'\s+', ' ', text_content).lower(),
+        "word_count": word_count,
+        "read_time_minutes": round(word_count / float(READING_WORDS_PER_MINUTE), 2),
+        "image_count": dom["image_count"],
+        "script_count": dom["script_count"],
+        "stylesheet_count": dom["stylesheet_count"],
+        "heading_count": dom["heading_count"],
+        "paragraph_count": dom["paragraph_count"]
+    }
+
+@analyzer("structured", ("structured",))
+def structured(ctx):
+    return {"structured": ctx.dom["structured"]}
+
+@analyzer("accessibility", ("semantic_elements", "heading_issues", "unlabeled_inputs", "images_without_alt", "a11y_extras"))
+def accessibility(ctx):
+    return {key: ctx.dom[key] for key in ("semantic_elements", "heading_issues", "unlabeled_inputs", "images_without_alt", "a11y_extras")}
+
+@analyzer("mixed_content", ("mixed_content",))
+def mixed_content(ctx):
+    return {"mixed_content": ctx.dom["mixed_content"]}
+
+@analyzer("resource_hints", ("link_rel", "media_hints"))
+def resource_hints(ctx):
+    return {"link_rel": ctx.dom["link_rel"], "media_hints": ctx.dom["media_hints"]}
+
+@analyzer("fingerprint", ("text_hash", "simhash"))
+def fingerprint(ctx):
+    return {"text_hash": ctx.fingerprint, "simhash": simhash_hex(ctx.text)}
+
+@analyzer("readability", ("readability_score",))
+def readability(ctx):
+    return {"readability_score": ctx.nlp("readability_score", nlp.readability)}
+
+@analyzer("sentiment", ("sentiment",))
+def sentiment(ctx):
+    return {"sentiment": ctx.nlp("sentiment", nlp.sentiment)}
+
+@analyzer("keywords", ("keyword_density",))
+def keywords(ctx):
+    return {"keyword_density": ctx.nlp("keyword_density", nlp.keyword_density)}
+
+@analyzer("language", ("detected_language", "language_match"))
+def language(ctx):
+    detected_language = ctx.nlp("detected_language", nlp.detect_language)
+    lang_attr = ctx.dom["lang_attribute"]
+    return {
+        "detected_language": detected_language,
+        "language_match": (lang_attr.lower().startswith(detected_language)) if lang_attr and detected_language != "unknown" else None
+    }
+
+# "links-only" maps the site without parsing a DOM or loading any NLP library;
+# "seo" runs every DOM check plus keywords and language but skips the slow
+# readability and sentiment models; "full" runs everything.
+ANALYSIS_PROFILES = {
+    "links-only": ("links",),
+    "seo": ("links", "meta", "content", "structured", "accessibility", "mixed_content", "resource_hints",
+            "fingerprint", "keywords", "language"),
+    "full": tuple(ANALYZERS),
+}
+
+# Analyzers for a profile name or an explicit list of analyzer names. "links"
+# always runs because the crawl follows what it finds.
+def profile_analyzers(profile):
+    names = ANALYSIS_PROFILES.get(profile) if isinstance(profile, str) else profile
+    if names is None:
+        raise ValueError(f"Unknown analysis profile {profile!r}; expected one of {', '.join(ANALYSIS_PROFILES)}")
+    unknown = [name for name in names if name not in ANALYZERS]
+    if unknown:
+        raise ValueError(f"Unknown analyzers {unknown}; expected some of {', '.join(ANALYZERS)}")
+    return [ANALYZERS["links"]] + [ANALYZERS[name] for name in names if name != "links"]
+
+WARM_UP_TEXT = "The crawler loads its language models and word lists once before any page is analyzed."
+
+# Loads the NLP resources a profile needs up front, for callers that analyze
+# pages on several threads: the libraries load their corpora and models lazily
+# and not thread-safely on first use.
+def warm_up(profile):
+    steps = {"readability": nlp.readability, "sentiment": nlp.sentiment, "keywords": nlp.keyword_density,
+             "language": nlp.detect_language}
+    for a in profile_analyzers(profile):
+        if a.name in steps:
+            try:
+                steps[a.name](WARM_UP_TEXT)
+            except Exception as e:
+                print(f"Could not load the resources of the {a.name} analyzer: {e}")
+
+# Runs a profile's analyzers on one fetched page, timing each into `timer`.
+# Returns the fields they produced and the internal links in document order, as
+# linked (absolute, without fragment); the record's internal_links are canonical.
+def run_analyzers(page, start_url, profile, timer, html_parser='html.parser'):
+    selected = profile_analyzers(profile)
+    ctx = PageContext(page, start_url, timer, html_parser, uses_dom=any(a.dom for a in selected))
+    if ctx.uses_dom:
+        ctx.dom
+    fields = {}
+    for a in selected:
+        with timer.stage(a.name):
+            fields.update(a.run(ctx))
+    if ctx.reused:
+        fields["reused_analysis"] = "unchanged_text"
+    return fields, ctx.internal_links_found
@@ -1,7 +1,10 @@
 import os
 import json
-from anthropic import Anthropic
+import time
+from anthropic import Anthropic, APIConnectionError
 from dotenv import load_dotenv
+from analysis_cache import AnalysisCache, analysis_cache_key
+from prompt_compaction import compact_page_data, estimate_tokens, PROMPT_TOKEN_BUDGET, CHARS_PER_TOKEN
 
 load_dotenv()
 
@@ -14,26 +17,69 @@ try:
 except Exception as e:
     raise ValueError(f"Failed to initialize Anthropic client: {e}")
 
+MODEL = "claude-3-7-sonnet-20250219"
 
-def analyze_with_anthropic(page_data):
-    system_prompt = """You are an expert analyst. Your task is to review structured JSON data from a webpage.
+MAX_TOKENS = 1500
+
+TEMPERATURE = 0.5
+
+NO_CONTENT_MESSAGE = "No content returned from API."
+
+SYSTEM_PROMPT = """You are an expert analyst. Your task is to review structured JSON data from a webpage.
 Summarize the strengths and weaknesses of this page in terms of SEO, accessibility, and semantic HTML structure.
 Provide specific, actionable suggestions for improvements.
 Structure your response clearly, using Markdown for headings (e.g., ## Strengths, ## Weaknesses, ## Suggestions)."""
 
+analysis_cache = AnalysisCache()
+
+
+class AnthropicAPIError(Exception):
+    def __init__(self, message, status_code=None, retry_after=None, connection_error=False):
+        super().__init__(message)
+        self.status_code = status_code
+        self.retry_after = retry_after
+        self.connection_error = connection_error
+
+
+def set_client(client):
+    global anthropic
+    anthropic = client
+
+
+def _retry_after_seconds(error):
+    headers = getattr(getattr(error, 'response', None), 'headers', None) or {}
+    try:
+        return float(headers.get('retry-after'))
+    except (TypeError, ValueError):
+        return None
+
+
+def log_usage(response, payload, original_chars, latency):
+    usage = getattr(response, 'usage', None)
+    input_tokens = getattr(usage, 'input_tokens', None)
+    output_tokens = getattr(usage, 'output_tokens', None)
+    print(f"Claude analysis: {input_tokens} input tokens, {output_tokens} output tokens, {latency:.2f}s "
+          f"(page payload ~{estimate_tokens(payload)} tokens, ~{original_chars // CHARS_PER_TOKEN} before compaction)")
+
+
+def analyze_with_anthropic(page_data, token_budget=PROMPT_TOKEN_BUDGET):
+    system_prompt = SYSTEM_PROMPT
+    payload = json.dumps(compact_page_data(page_data, token_budget), ensure_ascii=False, separators=(',', ':'))
+
     user_message_content = f"""
 Here is a structured JSON of a webpage:
 
-{json.dumps(page_data, indent=2)}
+{payload}
 
 Please analyze it based on the instructions provided.
 """
 
     try:
+        started = time.time()
         response = anthropic.messages.create(
-            model="claude-3-7-sonnet-20250219",
-            max_tokens=1500,
-            temperature=0.5,
+            model=MODEL,
+            max_tokens=MAX_TOKENS,
+            temperature=TEMPERATURE,
             system=system_prompt,
             messages=[
                 {
@@ -42,10 +88,11 @@ Please analyze it based on the instructions provided.
                 }
             ]
         )
+        log_usage(response, payload, len(json.dumps(page_data, indent=2)), time.time() - started)
         if response.content and len(response.content) > 0:
             return response.content[0].text.strip()
         else:
-            return "No content returned from API."
+            return NO_CONTENT_MESSAGE
 
     except Exception as e:
         error_message = f"Anthropic API error: {e}"
@@ -58,4 +105,18 @@ Please analyze it based on the instructions provided.
                 error_message += f" | Details: (Could not decode JSON error response from API)"
 
 
-        raise Exception(error_message)
\ No newline at end of file
+        raise AnthropicAPIError(error_message, status_code=getattr(e, 'status_code', None), retry_after=_retry_after_seconds(e),
+                                connection_error=isinstance(e, APIConnectionError))
+
+
+def analyze_with_cache(page_data):
+    key = analysis_cache_key(page_data, model=MODEL, system=SYSTEM_PROMPT, max_tokens=MAX_TOKENS, temperature=TEMPERATURE,
+                             token_budget=PROMPT_TOKEN_BUDGET)
+    cached = analysis_cache.get(key)
+    if cached is not None:
+        return cached, True
+
+    analysis = analyze_with_anthropic(page_data)
+    if analysis != NO_CONTENT_MESSAGE:
+        analysis_cache.put(key, analysis)
+    return analysis, False
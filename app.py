@@ -1,19 +1,35 @@
 import requests
 import subprocess
-from urllib.parse import urljoin, urlparse
-from bs4 import BeautifulSoup
+import argparse
+from urllib.parse import urlparse
 import json
 import time
-import textstat
-from textblob import TextBlob
-import nltk
-from nltk.corpus import stopwords
-from collections import Counter, defaultdict
+from collections import defaultdict, deque, namedtuple
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, wait, FIRST_COMPLETED
+from contextlib import contextmanager
+import threading
+import multiprocessing
 import re
-import hashlib
+import sys
 from dotenv import load_dotenv
+from frontier import Frontier, canonicalize_url, is_internal
+from checkpoint import CheckpointWriter, iter_checkpoint, write_final_output
+from near_duplicates import near_duplicate_clusters
+from analyzers import NLP_FIELDS, profile_analyzers, run_analyzers
+from graph_metrics import compute_graph_metrics
+from graph_layout import compute_graph_layout
+from graph_export import write_graph_file
+from page_store import iter_json_object
+from page_records import PageRecordStore
+from robots import RobotsMatcher
+from sitemaps import read_sitemaps
+from rate_control import RateController, THROTTLE_STATUS_CODES
+from downloads import read_html_body, media_type
+from link_health import (LINK_CHECK_CONCURRENCY, LINK_CHECK_PER_HOST, LinkHealthCache, build_check_session,
+                         check_urls, link_health_summary)
+from timings import (CRAWL_METRICS_FILE, StageHistograms, StageTimer, TimedHTTPAdapter, pop_connection_timings,
+                     write_metrics_file)
 
-from requests.adapters import HTTPAdapter
 try:
     from urllib3.util.retry import Retry
 except Exception:
@@ -25,53 +41,71 @@ except Exception:
 
 load_dotenv()
 
-nltk.download('punkt', quiet=True)
-nltk.download('stopwords', quiet=True)
-
 WEBSITE_TO_CRAWL = 'https://www.example.com/'
 
 MAX_PAGES_TO_CRAWL = 50
 
-GENERIC_LINK_TEXT = {"click here", "learn more", "more", "here"}
-
-def is_internal(url, base):
-    return urlparse(url).netloc == urlparse(base).netloc
-
-def check_heading_structure(soup):
-    headings = [int(tag.name[1]) for tag in soup.find_all(re.compile('^h[1-6]$'))]
-    skipped_levels = []
-    prev_level = 0
-    for level in headings:
-        if prev_level and level > prev_level + 1:
-            skipped_levels.append((prev_level, level))
-        prev_level = level
-    return skipped_levels
-
-def check_semantic_elements(soup):
-    semantic_tags = ['main', 'nav', 'article', 'section', 'header', 'footer', 'aside']
-    used_semantics = {tag: bool(soup.find(tag)) for tag in semantic_tags}
-    return used_semantics
-
-def check_image_alts(soup):
-    images = soup.find_all('img')
-    images_without_alt = [img.get('src') or img.get('data-src') or '' for img in images if not img.get('alt') or img.get('alt').strip() == '']
-    return [src for src in images_without_alt if src]
-
-def check_form_labels(soup):
-    inputs = soup.find_all(['input', 'textarea', 'select'])
-    labeled_inputs = set()
-    for label in soup.find_all('label'):
-        if label.get('for'):
-            labeled_inputs.add(label['for'])
-    inputs_without_labels = []
-    for field in inputs:
-        ftype = (field.get('type') or '').lower()
-        if field.get('id') and ftype not in ['hidden', 'submit', 'button', 'reset']:
-            if field['id'] not in labeled_inputs:
-                parent_label = field.find_parent('label')
-                if not parent_label:
-                    inputs_without_labels.append(field['id'])
-    return inputs_without_labels
+CONCURRENT_REQUESTS = 8
+
+MAX_REQUESTS_PER_HOST = 4
+
+CRAWL_ORDER = 'bfs'
+
+# The frontier holds up to this many candidate URLs per page of the crawl
+# budget, so the "depth" and "links" orderings decide which pages are crawled
+# and not just in what order.
+FRONTIER_SIZE_FACTOR = 10
+
+HTML_PARSER = 'html.parser'
+
+INCREMENTAL_CRAWL = False
+
+PREVIOUS_CRAWL_FILE = 'links.json'
+
+CHECKPOINT_FILE = 'crawl_checkpoint.ndjson'
+
+STREAM_TO_CHECKPOINT = False
+
+# Which per-page analyzers run (see analyzers.ANALYSIS_PROFILES): "links-only",
+# "seo" or "full".
+ANALYSIS_PROFILE = "full"
+
+ANALYSIS_WORKERS = 0
+
+ANALYSIS_QUEUE_SIZE = 32
+
+RESPECT_ROBOTS_TXT = True
+
+SEED_FROM_SITEMAPS = True
+
+# Sitemap URLs may take at most this share of MAX_PAGES_TO_CRAWL as seeds, so
+# the rest of the budget is left for pages discovered through links.
+SITEMAP_SEED_SHARE = 0.5
+
+SITEMAP_SEED_DEPTH = 1
+
+# Paces requests to each host with rate_control.RateController; 429 and 503
+# responses are retried up to THROTTLE_RETRIES times once the host allows it.
+ADAPTIVE_RATE_LIMIT = True
+
+THROTTLE_RETRIES = 3
+
+# Every page's stage timings (connect, tls, wait, download, parse, dom, links and
+# the NLP steps) feed the histograms written to CRAWL_METRICS_FILE; set this to
+# also keep them in each record's "timings" field.
+RECORD_PAGE_TIMINGS = False
+
+# After the crawl, check every distinct external link and mixed-content asset
+# once (HEAD, then GET if needed), cache the results in LINK_HEALTH_CACHE_FILE
+# and add an "external_link_health" field to each page referencing them.
+CHECK_EXTERNAL_LINKS = False
+
+# After the crawl, precompute the force-directed layout main.js draws the graph
+# with. It takes about 5 seconds for 5,000 pages and grows a little faster than
+# linearly, so larger crawls skip it and main.js runs its live simulation.
+COMPUTE_LAYOUT = True
+
+LAYOUT_MAX_PAGES = 10000
 
 def extract_http_delivery(resp):
     h = {k.lower(): v for k, v in resp.headers.items()}
@@ -121,103 +155,6 @@ def extract_security_headers(resp):
         "permissions_policy": h.get("permissions-policy", "")
     }
 
-def detect_mixed_content(page_url, soup):
-    try:
-        is_https = urlparse(page_url).scheme == "https"
-    except Exception:
-        is_https = False
-    if not is_https:
-        return []
-
-    urls = []
-    for tag, attr in [("img","src"), ("script","src"), ("link","href"), ("iframe","src"), ("video","src"), ("source","src")]:
-        for el in soup.find_all(tag):
-            u = el.get(attr)
-            if not u:
-                continue
-            absu = urljoin(page_url, u)
-            if absu.lower().startswith("http://"):
-                urls.append(absu)
-    return list(sorted(set(urls)))
-
-def extract_structured_data(soup):
-    jsonld = []
-    for tag in soup.select('script[type="application/ld+json"]'):
-        try:
-            if tag.string:
-                jsonld.append(json.loads(tag.string))
-        except Exception:
-            pass
-    og = {m.get('property'): m.get('content') for m in soup.select('meta[property^="og:"]') if m.get('property')}
-    tw = {m.get('name'): m.get('content') for m in soup.select('meta[name^="twitter:"]') if m.get('name')}
-    canonical = (soup.find('link', rel='canonical') or {}).get('href', '')
-    hreflang = [(l.get('hreflang'), l.get('href')) for l in soup.select('link[rel="alternate"][hreflang]')]
-    return {"jsonld": jsonld, "opengraph": og, "twitter": tw, "canonical": canonical, "hreflang": hreflang}
-
-def extract_a11y_extras(soup):
-    links = [(a.get_text(strip=True).lower(), a.get('href')) for a in soup.find_all('a', href=True)]
-    generic = [url for (txt, url) in links if txt in GENERIC_LINK_TEXT]
-    landmarks = {t: len(soup.find_all(t)) for t in ['main', 'nav', 'header', 'footer', 'aside', 'section', 'article']}
-    aria_roles = Counter([el.get('role') for el in soup.find_all(attrs={"role": True})])
-    return {"generic_link_texts": generic, "landmarks_count": landmarks, "aria_roles": dict(aria_roles)}
-
-def text_fingerprint(text):
-    norm = re.sub(r'\s+', ' ', (text or '').lower()).strip()
-    return hashlib.md5(norm.encode()).hexdigest() if norm else ""
-
-def estimate_language(text):
-    if not text:
-        return "unknown"
-    words = re.findall(r"[a-zA-Z']+", text.lower())
-    if not words:
-        return "unknown"
-    sw = set(stopwords.words('english'))
-    hits = sum(1 for w in words if w in sw)
-    ratio = hits / max(1, len(words))
-    return "en" if ratio >= 0.02 else "unknown"
-
-def estimate_read_time_minutes(word_count, wpm=200):
-    return round((word_count or 0) / float(wpm), 2)
-
-def extract_preloads(soup):
-    out = []
-    for l in soup.find_all('link'):
-        rel = l.get('rel')
-        if not rel:
-            continue
-        rels = [r.lower() for r in (rel if isinstance(rel, list) else [rel])]
-        if any(r in ('preload', 'prefetch', 'preconnect') for r in rels):
-            out.append({
-                "rel": " ".join(rels),
-                "as": l.get('as', ''),
-                "href": l.get('href', '')
-            })
-    return out
-
-def extract_media_hints(soup):
-    imgs = soup.find_all('img')
-    lazy_count = 0
-    largest = {"src": "", "area": 0, "width": 0, "height": 0}
-    for img in imgs:
-        if (img.get('loading') or '').lower() == 'lazy' or img.get('data-src') or img.get('data-lazy'):
-            lazy_count += 1
-        w = img.get('width')
-        h = img.get('height')
-        try:
-            wv = int(re.sub(r'\D', '', str(w))) if w else 0
-            hv = int(re.sub(r'\D', '', str(h))) if h else 0
-        except Exception:
-            wv, hv = 0, 0
-        area = wv * hv
-        if area > largest["area"]:
-            largest = {
-                "src": img.get('src') or img.get('data-src') or '',
-                "area": area,
-                "width": wv,
-                "height": hv
-            }
-    return {"lazy_images_count": lazy_count, "largest_image": largest}
-
 def fetch_robots_and_sitemaps(base_url, session):
     root = urlparse(base_url)
     robots_url = f"{root.scheme}://{root.netloc}/robots.txt"
@@ -226,7 +163,7 @@ def fetch_robots_and_sitemaps(base_url, session):
     try:
         r = session.get(robots_url, timeout=8, headers={'User-Agent': 'MyCrawler/1.0'})
         if r.status_code == 200 and 'text' in r.headers.get('content-type',''):
-            robots_txt = r.text[:10000]
+            robots_txt = r.text
             for line in robots_txt.splitlines():
                 if line.lower().startswith('sitemap:'):
                     sm = line.split(':', 1)[1].strip()
@@ -241,16 +178,20 @@ def fetch_robots_and_sitemaps(base_url, session):
                 sitemaps.append(guess)
         except Exception:
             pass
-    return {"robots_txt": robots_txt, "sitemaps": list(sorted(set(sitemaps)))}
+    robots = RobotsMatcher(robots_txt, session.headers.get('User-Agent', '*').split('/')[0])
+    return {"robots_txt": robots_txt[:10000], "sitemaps": list(sorted(set(sitemaps)))}, robots
 
-def build_session():
+# 429 and 503 are left to the rate controller (see fetch_page), which backs the
+# whole host off instead of sleeping in one worker.
+def build_session(pool_size=10):
     s = requests.Session()
     try:
         retry = Retry(
             total=3, backoff_factor=0.4,
-            status_forcelist=(429, 500, 502, 503, 504),
+            status_forcelist=(500, 502, 504),
+            respect_retry_after_header=False,
         )
-        adapter = HTTPAdapter(max_retries=retry, pool_connections=10, pool_maxsize=10)
+        adapter = TimedHTTPAdapter(max_retries=retry, pool_connections=10, pool_maxsize=max(10, pool_size))
         s.mount('http://', adapter)
         s.mount('https://', adapter)
     except Exception:
@@ -258,243 +199,502 @@ def build_session():
     s.headers.update({'User-Agent': 'MyCrawler/1.0'})
     return s
 
-def crawl_site(start_url, max_links=MAX_PAGES_TO_CRAWL):
-    session = build_session()
+CrawlResult = namedtuple("CrawlResult", ["root_url", "pages", "in_edges", "out_edges", "site_meta", "fingerprints", "sitemap_urls",
+                                         "external_refs", "link_health"])
+
+class HostLimiter:
+    def __init__(self, per_host=MAX_REQUESTS_PER_HOST):
+        self.per_host = max(1, per_host)
+        self._lock = threading.Lock()
+        self._semaphores = {}
+
+    @contextmanager
+    def slot(self, url):
+        host = urlparse(url).netloc.lower()
+        with self._lock:
+            semaphore = self._semaphores.get(host)
+            if semaphore is None:
+                semaphore = threading.BoundedSemaphore(self.per_host)
+                self._semaphores[host] = semaphore
+        with semaphore:
+            yield
+
+def load_previous_crawl(filename='links.json'):
+    try:
+        with open(filename, 'r', encoding='utf-8') as f:
+            previous = json.load(f)
+        print(f"Loaded {len(previous)} previously crawled URLs from {filename}")
+        return previous if isinstance(previous, dict) else {}
+    except FileNotFoundError:
+        print(f"No previous crawl found at {filename}, crawling from scratch.")
+    except json.JSONDecodeError:
+        print(f"Could not decode previous crawl {filename}, crawling from scratch.")
+    return {}
+
+def conditional_headers(previous_record):
+    if not previous_record or previous_record.get("error") or not previous_record.get("text_hash"):
+        return {}
+    delivery = previous_record.get("http_delivery") or {}
+    headers = {}
+    if delivery.get("etag"):
+        headers["If-None-Match"] = delivery["etag"]
+    if delivery.get("last_modified"):
+        headers["If-Modified-Since"] = delivery["last_modified"]
+    return headers
+
+# Fields computed across the whole crawl by site_annotations and finalize_record.
+# A page reused after a 304 gets them from the current crawl or not at all, so a
+# value this crawl does not recompute (external_link_health with
+# CHECK_EXTERNAL_LINKS off, say) is never carried forward stale.
+SITE_ANNOTATION_FIELDS = frozenset({
+    "in_degree", "out_degree", "is_orphan", "site_wide", "near_duplicate_cluster", "pagerank", "click_depth",
+    "click_parent", "scc_id", "scc_size", "betweenness", "layout", "in_sitemap", "sitemap_orphan", "external_link_health",
+})
+
+def reuse_previous_record(previous_record, depth, response, response_time):
+    record = {k: v for k, v in previous_record.items() if k not in SITE_ANNOTATION_FIELDS and k != "timings"}
+    record["depth"] = depth
+    record["response_time"] = round(response_time, 2)
+    record["ttfb"] = round(response.elapsed.total_seconds() if response.elapsed else 0, 3)
+    record["reused_analysis"] = "not_modified"
+    return record
+
+# Streams the response so only HTML bodies are downloaded, within the limits in
+# downloads.py. Returns the response, the total time, the HtmlBody (None for
+# non-200 responses and non-HTML content, whose bodies are never read) and the
+# connect/tls/wait/download timings of the request.
+def fetch_page(session, url, host_limiter, previous_record=None, rate_controller=None):
+    attempt = 0
+    while True:
+        with host_limiter.slot(url):
+            if rate_controller is not None:
+                rate_controller.acquire(url)
+            start_time = time.time()
+            pop_connection_timings()
+            try:
+                response = session.get(url, timeout=10, headers=conditional_headers(previous_record), stream=True)
+                headers_at = time.time()
+                if response.status_code == 200:
+                    body = read_html_body(response)
+                else:
+                    body = None
+                    response.close()
+            except Exception:
+                if rate_controller is not None:
+                    rate_controller.record(url, None)
+                raise
+            elapsed = time.time() - start_time
+        timer = StageTimer(pop_connection_timings())
+        waited = response.elapsed.total_seconds() if response.elapsed else headers_at - start_time
+        timer.add("wait", max(0.0, waited - timer.stages.get("connect", 0.0) - timer.stages.get("tls", 0.0)))
+        timer.add("download", start_time + elapsed - headers_at)
+        if rate_controller is None:
+            return response, elapsed, body, timer.result()
+        rate_controller.record(url, response.status_code, response.elapsed.total_seconds() if response.elapsed else None, response.headers)
+        if response.status_code not in THROTTLE_STATUS_CODES or attempt >= THROTTLE_RETRIES:
+            return response, elapsed, body, timer.result()
+        attempt += 1
+        print(f"Throttled on {url} (HTTP {response.status_code}), retry {attempt}/{THROTTLE_RETRIES}")
+
+def prepare_page(normalized_url, depth, response, response_time, body, fetch_timings, previous_record=None):
+    status_code = response.status_code
+
+    if status_code == 304 and previous_record:
+        print(f"Unchanged since last crawl: {normalized_url}")
+        record = reuse_previous_record(previous_record, depth, response, response_time)
+        record["timings"] = fetch_timings
+        return (record, record.get("internal_links") or []), None
+
+    if response.status_code != 200:
+        print(f"Skipping {normalized_url} due to status code: {status_code}")
+        return ({
+            "url": normalized_url,
+            "status_code": status_code,
+            "error": "Failed to fetch",
+            "depth": depth,
+            "ttfb": round(response.elapsed.total_seconds() if response.elapsed else 0, 3),
+            "http_delivery": extract_http_delivery(response),
+            "security": extract_security_headers(response),
+            "timings": fetch_timings,
+        }, []), None
+
+    if body is None:
+        content_type = media_type(response.headers.get('content-type')) or 'unknown'
+        print(f"Skipping {normalized_url} as content type is not HTML: {content_type}")
+        return ({
+            "url": normalized_url,
+            "status_code": status_code,
+            "error": "Not HTML content",
+            "depth": depth,
+            "ttfb": round(response.elapsed.total_seconds() if response.elapsed else 0, 3),
+            "http_delivery": extract_http_delivery(response),
+            "security": extract_security_headers(response),
+            "timings": fetch_timings,
+        }, []), None
+
+    page = {
+        "url": normalized_url,
+        "depth": depth,
+        "status_code": status_code,
+        "response_time": round(response_time, 2),
+        "ttfb": round(response.elapsed.total_seconds() if response.elapsed else 0, 3),
+        "http_delivery": extract_http_delivery(response),
+        "security": extract_security_headers(response),
+        "base_url": response.url,
+        "html": body.text,
+        "truncated": body.truncated,
+        "timings": fetch_timings,
+    }
+    if body.truncated:
+        print(f"Truncated {normalized_url} after {body.bytes_read} bytes")
+    if previous_record and not previous_record.get("error"):
+        page["previous"] = {k: previous_record[k] for k in ("text_hash",) + NLP_FIELDS if k in previous_record}
+    return None, page
+
+# Key order of a page record in links.json; fields a profile does not produce
+# are skipped.
+RECORD_FIELDS = (
+    "url", "title", "meta_description", "meta_keywords", "h1_tags", "text_content", "search_text", "word_count",
+    "readability_score", "sentiment", "keyword_density", "image_count", "script_count", "stylesheet_count",
+    "has_viewport_meta", "heading_count", "paragraph_count", "status_code", "response_time", "ttfb", "truncated",
+    "internal_links", "external_links", "semantic_elements", "heading_issues", "unlabeled_inputs",
+    "images_without_alt", "depth", "http_delivery", "security", "structured", "a11y_extras", "mixed_content",
+    "text_hash", "simhash", "read_time_minutes", "lang_attribute", "detected_language", "language_match",
+    "link_rel", "media_hints",
+)
+
+def analyze_html(page, start_url, profile=ANALYSIS_PROFILE):
+    timer = StageTimer(page.get("timings"))
+    fields, internal_links_found = run_analyzers(page, start_url, profile, timer, HTML_PARSER)
+    fields.update({key: page[key] for key in ("url", "status_code", "response_time", "ttfb", "truncated", "depth",
+                                              "http_delivery", "security")})
+    record = {key: fields.pop(key) for key in RECORD_FIELDS if key in fields}
+    record.update(fields)
+    record["timings"] = timer.result()
+    return record, internal_links_found
+
+def fetch_error_record(normalized_url, depth, error):
+    if isinstance(error, requests.exceptions.Timeout):
+        print(f"Timeout crawling {normalized_url}")
+        return {
+            "url": normalized_url,
+            "status_code": "Timeout",
+            "error": "Request timed out",
+            "depth": depth
+        }
+    if isinstance(error, requests.exceptions.RequestException):
+        print(f"Failed to crawl {normalized_url}: {error}")
+        return {
+            "url": normalized_url,
+            "status_code": "Error",
+            "error": str(error),
+            "depth": depth
+        }
+    print(f"An unexpected error occurred while processing {normalized_url}: {error}")
+    return {
+        "url": normalized_url,
+        "status_code": "Processing Error",
+        "error": str(error),
+        "depth": depth
+    }
+
+class PendingPage:
+    __slots__ = ("url", "depth", "previous", "fetch", "page", "analysis", "result")
 
+    def __init__(self, url, depth, fetch, previous=None):
+        self.url = url
+        self.depth = depth
+        self.previous = previous
+        self.fetch = fetch
+        self.page = None
+        self.analysis = None
+        self.result = None
+
+    def stage(self):
+        try:
+            response, response_time, body, fetch_timings = self.fetch.result()
+            self.result, self.page = prepare_page(self.url, self.depth, response, response_time, body, fetch_timings, self.previous)
+        except Exception as e:
+            self.result = (fetch_error_record(self.url, self.depth, e), [])
+        self.fetch = None
+
+    def analyze(self, analysis_pool, start_url, profile=ANALYSIS_PROFILE):
+        page, self.page = self.page, None
+        if analysis_pool is None:
+            try:
+                self.result = analyze_html(page, start_url, profile)
+            except Exception as e:
+                self.result = (fetch_error_record(self.url, self.depth, e), [])
+        else:
+            self.analysis = analysis_pool.submit(analyze_html, page, start_url, profile)
+
+    def done(self):
+        if self.result is None and self.analysis is not None and self.analysis.done():
+            try:
+                self.result = self.analysis.result()
+            except Exception as e:
+                self.result = (fetch_error_record(self.url, self.depth, e), [])
+            self.analysis = None
+        return self.result is not None
+
+def run_crawl(start_url, emit, max_links=MAX_PAGES_TO_CRAWL, concurrency=CONCURRENT_REQUESTS, per_host=MAX_REQUESTS_PER_HOST, ordering=CRAWL_ORDER,
+              analysis_workers=ANALYSIS_WORKERS, analysis_queue=ANALYSIS_QUEUE_SIZE, previous=None, replay=None,
+              respect_robots=RESPECT_ROBOTS_TXT, seed_from_sitemaps=SEED_FROM_SITEMAPS, rate_limit=ADAPTIVE_RATE_LIMIT,
+              record_timings=RECORD_PAGE_TIMINGS, metrics_file=CRAWL_METRICS_FILE, analysis_profile=ANALYSIS_PROFILE,
+              check_links=CHECK_EXTERNAL_LINKS):
+    profile_analyzers(analysis_profile)
+    concurrency = max(1, concurrency)
+    analysis_queue = max(1, analysis_queue)
+    session = build_session(pool_size=concurrency)
+    host_limiter = HostLimiter(per_host)
+    requested_start_url = start_url
+    start_url = canonicalize_url(start_url)
+    site_meta, robots = fetch_robots_and_sitemaps(start_url, session)
+    robots_blocked = set()
+    rate_controller = RateController() if rate_limit else None
+    if rate_controller is not None and respect_robots:
+        rate_controller.set_crawl_delay(start_url, robots.crawl_delay)
+    crawl_started = time.time()
+    histograms = StageHistograms()
+
+    previous = previous or {}
     visited = set()
-    site_structure = {}
-    to_visit = [(start_url.rstrip('/'), 0)]
+    to_visit = Frontier(ordering, max_size=max_links * FRONTIER_SIZE_FACTOR)
+    to_visit.add(start_url, 0, requested_start_url)
+    in_flight = deque()
     in_edges = defaultdict(set)
     out_edges = defaultdict(set)
 
-    site_meta = fetch_robots_and_sitemaps(start_url, session)
-
-    while to_visit and len(visited) < max_links:
-        url, depth = to_visit.pop(0)
-        if url in visited:
-            continue
-
-        normalized_url = url.rstrip('/')
-        if normalized_url in visited:
-            continue
-
-        visited.add(normalized_url)
-        print(f"Crawling: {normalized_url} (depth {depth}) ({len(visited)}/{max_links})")
-
-        try:
-            start_time = time.time()
-            response = session.get(normalized_url, timeout=10)
-            response_time = time.time() - start_time
-            status_code = response.status_code
-
-            if response.status_code != 200:
-                print(f"Skipping {normalized_url} due to status code: {status_code}")
-                site_structure[normalized_url] = {
-                    "url": normalized_url,
-                    "status_code": status_code,
-                    "error": "Failed to fetch",
-                    "depth": depth,
-                    "ttfb": round(response.elapsed.total_seconds() if response.elapsed else 0, 3),
-                    "http_delivery": extract_http_delivery(response),
-                    "security": extract_security_headers(response),
-                }
-                continue
-
-            content_type = response.headers.get('content-type', '').lower()
-            if 'text/html' not in content_type:
-                print(f"Skipping {normalized_url} as content type is not HTML: {content_type}")
-                site_structure[normalized_url] = {
-                    "url": normalized_url,
-                    "status_code": status_code,
-                    "error": "Not HTML content",
-                    "depth": depth,
-                    "ttfb": round(response.elapsed.total_seconds() if response.elapsed else 0, 3),
-                    "http_delivery": extract_http_delivery(response),
-                    "security": extract_security_headers(response),
-                }
-                continue
-
-            soup = BeautifulSoup(response.text, 'html.parser')
-            page_title = soup.title.string.strip() if soup.title else ''
-
-            meta_desc_tag = soup.find('meta', attrs={'name': 'description'})
-            meta_description = meta_desc_tag['content'].strip() if meta_desc_tag and 'content' in meta_desc_tag.attrs else ''
-
-            meta_keywords_tag = soup.find('meta', attrs={'name': 'keywords'})
-            meta_keywords = meta_keywords_tag['content'].strip() if meta_keywords_tag and 'content' in meta_keywords_tag.attrs else ''
-
-            h1_tags = [h1.get_text(strip=True) for h1 in soup.find_all('h1')]
-
-            text_content_for_analysis = []
-            for element in soup.find_all(['p', 'h1', 'h2', 'h3', 'h4', 'h5', 'h6', 'li', 'span', 'article']):
-                text_content_for_analysis.append(element.get_text(separator=' ', strip=True))
-            text = " ".join(text_content_for_analysis)
-            
-            text_content = text.strip()
-            search_text = re.sub(r'\s+', ' ', text_content).lower()
-
-            word_count = len(text.split()) if text else 0
-            readability_score = textstat.flesch_kincaid_grade(text) if text else 0
-            sentiment = TextBlob(text).sentiment.polarity if text else 0
-
-            keyword_density = {}
-            if text:
-                text_clean = re.sub(r'[^\w\s]', '', text.lower())
-                tokens = nltk.word_tokenize(text_clean)
-                stop_words = set(stopwords.words('english'))
-                filtered_tokens = [word for word in tokens if word not in stop_words and word.isalpha() and len(word) > 1]
-                if filtered_tokens:
-                    word_freq = Counter(filtered_tokens)
-                    total_filtered_words = sum(word_freq.values())
-                    most_common = word_freq.most_common(10)
-                    keyword_density = {word: round(count / total_filtered_words, 4) for word, count in most_common}
-
-            image_count = len(soup.find_all('img'))
-            script_count = len(soup.find_all('script'))
-            stylesheet_count = len(soup.find_all('link', rel='stylesheet'))
-            has_viewport_meta = bool(soup.find('meta', attrs={'name': 'viewport'}))
-            heading_count = len(soup.find_all(['h2', 'h3', 'h4', 'h5', 'h6']))
-            paragraph_count = len(soup.find_all('p'))
-
-            semantic_elements = check_semantic_elements(soup)
-            heading_issues = check_heading_structure(soup)
-            unlabeled_inputs = check_form_labels(soup)
-            images_without_alt = check_image_alts(soup)
-
-            http_delivery = extract_http_delivery(response)
-            security = extract_security_headers(response)
-            structured = extract_structured_data(soup)
-            a11y_extras = extract_a11y_extras(soup)
-
-            mixed_content = detect_mixed_content(normalized_url, soup)
-
-            fingerprint = text_fingerprint(text)
-            read_time = estimate_read_time_minutes(word_count)
-            lang_attr = (soup.find('html') or {}).get('lang', '') if soup.find('html') else ''
-            detected_language = estimate_language(text)
-            language_match = (lang_attr.lower().startswith(detected_language)) if lang_attr and detected_language != "unknown" else None
-
-            link_rel = extract_preloads(soup)
-            media_hints = extract_media_hints(soup)
-
-            internal_links_found = []
-            external_links_found = []
-
-            for link_tag in soup.find_all('a', href=True):
-                href = link_tag.get('href')
-                if not href or href.startswith('#') or href.startswith('mailto:') or href.startswith('tel:'):
+    pages = []
+    fingerprints = {}
+    external_refs = defaultdict(list)
+
+    # Disallowed URLs never enter the frontier; the start URL is always crawled.
+    # Pages are keyed by canonical URL and fetched as linked.
+    def admit(url, depth, fetch_url=None):
+        if respect_robots and not robots.allowed(fetch_url or url):
+            robots_blocked.add(url)
+            return
+        to_visit.add(url, depth, fetch_url)
+
+    # Every page links to the navigation URLs; interning keeps one copy of each
+    # URL shared by the edge sets, the frontier and the page list.
+    def merge(normalized_url, depth, internal_links_found, record):
+        normalized_url = sys.intern(normalized_url)
+        pages.append(normalized_url)
+        if isinstance(record, dict) and "simhash" in record:
+            fingerprints[normalized_url] = record["simhash"]
+        for absolute_href in internal_links_found:
+            target = sys.intern(canonicalize_url(absolute_href))
+            out_edges[normalized_url].add(target)
+            in_edges[target].add(normalized_url)
+            admit(target, depth + 1, absolute_href)
+
+        if check_links:
+            for target in external_references(record):
+                external_refs[sys.intern(target)].append(normalized_url)
+
+    for record, internal_links_found in (replay or []):
+        to_visit.discard(record["url"])
+        visited.add(record["url"])
+        merge(record["url"], record.get("depth") or 0, internal_links_found, record)
+    if visited:
+        print(f"Resuming crawl with {len(visited)} pages already done and {len(to_visit)} queued")
+
+    sitemap_urls = set()
+    if seed_from_sitemaps and site_meta["sitemaps"]:
+        def normalize(loc):
+            url = canonicalize_url(loc)
+            return url if is_internal(url, start_url) else None
+
+        sitemap_urls, seeds = read_sitemaps(session, site_meta["sitemaps"], normalize, int(max_links * SITEMAP_SEED_SHARE))
+        for entry in seeds:
+            admit(entry.loc, SITEMAP_SEED_DEPTH)
+        print(f"Read {len(sitemap_urls)} URLs from sitemaps, seeded {len(seeds)}")
+    site_meta["sitemap_url_count"] = len(sitemap_urls)
+
+    analysis_pool = None
+    if analysis_workers > 0:
+        analysis_pool = ProcessPoolExecutor(max_workers=analysis_workers, mp_context=multiprocessing.get_context("spawn"))
+
+    # Pages are fetched on threads and parsed/analyzed in worker processes ahead of
+    # time, but merged strictly in queue order, so the frontier evolves exactly as
+    # it would with one request at a time. At most `analysis_queue` pages wait in
+    # the process pool; fetched pages beyond that hold back new fetches.
+    try:
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            while to_visit or in_flight:
+                fetching = sum(1 for p in in_flight if p.fetch is not None)
+                while to_visit and fetching < concurrency and len(in_flight) < concurrency + analysis_queue and len(visited) < max_links:
+                    normalized_url, depth, fetch_url = to_visit.pop()
+                    visited.add(normalized_url)
+                    print(f"Crawling: {fetch_url} (depth {depth}) ({len(visited)}/{max_links})")
+                    previous_record = previous.get(normalized_url)
+                    fetch = pool.submit(fetch_page, session, fetch_url, host_limiter, previous_record, rate_controller)
+                    in_flight.append(PendingPage(normalized_url, depth, fetch, previous_record))
+                    fetching += 1
+
+                if not in_flight:
+                    break
+
+                for p in in_flight:
+                    if p.fetch is not None and p.fetch.done():
+                        p.stage()
+                    p.done()
+
+                analyzing = sum(1 for p in in_flight if p.analysis is not None)
+                for p in in_flight:
+                    if p.page is None:
+                        continue
+                    if analysis_pool is not None and analyzing >= analysis_queue:
+                        break
+                    p.analyze(analysis_pool, start_url, analysis_profile)
+                    analyzing += 1
+
+                head = in_flight[0]
+                if not head.done():
+                    outstanding = [p.fetch or p.analysis for p in in_flight if p.fetch is not None or p.analysis is not None]
+                    wait(outstanding, return_when=FIRST_COMPLETED)
                     continue
 
-                absolute_href = urljoin(normalized_url, href).split('#')[0].rstrip('/')
-
-                if is_internal(absolute_href, start_url):
-                    internal_links_found.append(absolute_href)
-                    out_edges[normalized_url].add(absolute_href)
-                    if absolute_href not in visited and all(absolute_href != u for (u, _) in to_visit) and len(visited) + len(to_visit) < max_links:
-                        to_visit.append((absolute_href, depth + 1))
-                else:
-                    external_links_found.append(absolute_href)
-
-            for t in set(internal_links_found):
-                in_edges[t].add(normalized_url)
-
-            site_structure[normalized_url] = {
-                "url": normalized_url,
-                "title": page_title,
-                "meta_description": meta_description,
-                "meta_keywords": meta_keywords,
-                "h1_tags": h1_tags,
-                "text_content": text_content,
-                "search_text": search_text,
-                "word_count": word_count,
-                "readability_score": readability_score,
-                "sentiment": sentiment,
-                "keyword_density": keyword_density,
-                "image_count": image_count,
-                "script_count": script_count,
-                "stylesheet_count": stylesheet_count,
-                "has_viewport_meta": has_viewport_meta,
-                "heading_count": heading_count,
-                "paragraph_count": paragraph_count,
-                "status_code": status_code,
-                "response_time": round(response_time, 2),
-                "ttfb": round(response.elapsed.total_seconds() if response.elapsed else 0, 3),
-                "internal_links": list(sorted(set(internal_links_found))),
-                "external_links": list(sorted(set(external_links_found))),
-                "semantic_elements": semantic_elements,
-                "heading_issues": heading_issues,
-                "unlabeled_inputs": unlabeled_inputs,
-                "images_without_alt": images_without_alt,
-                "depth": depth,
-                "http_delivery": http_delivery,
-                "security": security,
-                "structured": structured,
-                "a11y_extras": a11y_extras,
-                "mixed_content": mixed_content,
-                "text_hash": fingerprint,
-                "read_time_minutes": read_time,
-                "lang_attribute": lang_attr,
-                "detected_language": detected_language,
-                "language_match": language_match,
-                "link_rel": link_rel,
-                "media_hints": media_hints
-            }
-
-        except requests.exceptions.Timeout:
-            print(f"Timeout crawling {normalized_url}")
-            site_structure[normalized_url] = {
-                "url": normalized_url,
-                "status_code": "Timeout",
-                "error": "Request timed out",
-                "depth": depth
-            }
-        except requests.exceptions.RequestException as e:
-            print(f"Failed to crawl {normalized_url}: {e}")
-            site_structure[normalized_url] = {
-                "url": normalized_url,
-                "status_code": "Error",
-                "error": str(e),
-                "depth": depth
-            }
-        except Exception as e:
-            print(f"An unexpected error occurred while processing {normalized_url}: {e}")
-            site_structure[normalized_url] = {
-                "url": normalized_url,
-                "status_code": "Processing Error",
-                "error": str(e),
-                "depth": depth
-            }
-
-    for url, data in site_structure.items():
-        if not isinstance(data, dict):
-            continue
-        in_deg = len(in_edges.get(url, set()))
-        out_deg = len(set(data.get("internal_links") or []))
-        data["in_degree"] = in_deg
-        data["out_degree"] = out_deg
-
-    root_norm = start_url.rstrip('/')
-    for url, data in site_structure.items():
-        if not isinstance(data, dict):
+                in_flight.popleft()
+                record, internal_links_found = head.result
+                if isinstance(record, dict) and "timings" in record:
+                    histograms.observe_all(record["timings"] if record_timings else record.pop("timings"))
+                emit(record, internal_links_found)
+                merge(head.url, head.depth, internal_links_found, record)
+    finally:
+        if analysis_pool is not None:
+            analysis_pool.shutdown(cancel_futures=True)
+
+    crawl_seconds = time.time() - crawl_started
+    site_meta["crawl_stats"] = {
+        "pages": len(pages),
+        "seconds": round(crawl_seconds, 3),
+        "pages_per_second": round(len(pages) / crawl_seconds, 3) if crawl_seconds > 0 else None,
+        "rate_control": rate_controller.stats() if rate_controller is not None else None
+    }
+    if metrics_file:
+        write_metrics_file(histograms, site_meta["crawl_stats"], metrics_file)
+    site_meta["robots_crawl_delay"] = robots.crawl_delay
+    site_meta["robots_blocked"] = len(robots_blocked)
+    site_meta["robots_blocked_sample"] = sorted(robots_blocked)[:10]
+
+    link_health = check_external_links(external_refs, site_meta) if check_links else {}
+    return CrawlResult(start_url, pages, in_edges, out_edges, site_meta, fingerprints, sitemap_urls, external_refs, link_health)
+
+# External links and mixed-content assets of a record, each once.
+def external_references(record):
+    if not isinstance(record, dict):
+        return []
+    return list(dict.fromkeys((record.get("external_links") or []) + (record.get("mixed_content") or [])))
+
+# The post-crawl link check: {url: result} for every referenced URL, with the
+# totals added to site_meta.
+def check_external_links(external_refs, site_meta):
+    if not external_refs:
+        return {}
+    cache = LinkHealthCache()
+    try:
+        link_health = check_urls(external_refs, build_check_session(LINK_CHECK_CONCURRENCY), LINK_CHECK_CONCURRENCY,
+                                 HostLimiter(LINK_CHECK_PER_HOST), cache)
+    finally:
+        cache.close()
+    site_meta["link_health"] = link_health_summary(link_health)
+    return link_health
+
+# Site-level fields that can only be computed once every page is known, keyed
+# by URL and merged into each record by finalize_record.
+def site_annotations(result):
+    annotations = defaultdict(dict)
+    for url, cluster in near_duplicate_clusters(result.fingerprints).items():
+        annotations[url]["near_duplicate_cluster"] = cluster
+    for url, metrics in compute_graph_metrics(result.pages, result.out_edges, result.root_url).items():
+        annotations[url].update(metrics)
+    if COMPUTE_LAYOUT and len(result.pages) <= LAYOUT_MAX_PAGES:
+        for url, position in compute_graph_layout(result.pages, result.out_edges).items():
+            annotations[url]["layout"] = position
+    for url in result.pages:
+        in_sitemap = url in result.sitemap_urls
+        annotations[url]["in_sitemap"] = in_sitemap
+        annotations[url]["sitemap_orphan"] = in_sitemap and url != result.root_url and annotations[url].get("click_depth") is None
+    for target, referrers in result.external_refs.items():
+        health = result.link_health.get(target)
+        if health is None:
             continue
-        data["is_orphan"] = (url != root_norm and (data.get("in_degree") or 0) == 0)
+        for url in referrers:
+            annotations[url].setdefault("external_link_health", {})[target] = health
+    return annotations
+
+def finalize_record(url, data, result, root_url, annotations):
+    if not isinstance(data, dict):
+        return data
+    data["in_degree"] = len(result.in_edges.get(url, set()))
+    data["out_degree"] = len(set(data.get("internal_links") or []))
+    data["is_orphan"] = (url != root_url and (data.get("in_degree") or 0) == 0)
+    data.update(annotations.get(url) or {})
+    if url == root_url:
+        data["site_wide"] = result.site_meta
+    return data
+
+# Records are kept compactly in a PageRecordStore (see page_records.py), which
+# reads back as the same dicts; finalized records are stored again.
+def crawl_site(start_url, max_links=MAX_PAGES_TO_CRAWL, **options):
+    site_structure = PageRecordStore()
+
+    def emit(record, internal_links_found):
+        site_structure[record["url"]] = record
+
+    result = run_crawl(start_url, emit, max_links, **options)
+
+    root_url = canonicalize_url(start_url)
+    annotations = site_annotations(result)
+    for url in site_structure:
+        site_structure[url] = finalize_record(url, site_structure[url], result, root_url, annotations)
+
+    return site_structure
 
+# Appends each page to an NDJSON checkpoint as soon as it is merged instead of
+# keeping records in memory, then streams the final links.json from that file.
+# With resume=True the visited set and frontier are rebuilt from the checkpoint.
+def crawl_site_to_file(start_url, max_links=MAX_PAGES_TO_CRAWL, checkpoint_file=CHECKPOINT_FILE, filename='links.json', resume=False, **options):
+    writer = CheckpointWriter(checkpoint_file, resume=resume)
+    replay = iter_checkpoint(checkpoint_file) if resume else None
     try:
-        if root_norm in site_structure and isinstance(site_structure[root_norm], dict):
-            site_structure[root_norm]["site_wide"] = site_meta
-    except Exception:
-        pass
+        result = run_crawl(start_url, writer.write, max_links, replay=replay, **options)
+    finally:
+        writer.close()
 
-    return site_structure
+    root_url = canonicalize_url(start_url)
+    annotations = site_annotations(result)
+    return write_final_output(checkpoint_file, filename, lambda url, data: finalize_record(url, data, result, root_url, annotations))
 
+# Writes the same bytes as json.dump(site_structure, indent=2), one record at a
+# time, so a PageRecordStore is never expanded into a dict of all pages.
 def save_links_as_json(site_structure, filename='links.json'):
+    count = 0
     with open(filename, 'w', encoding='utf-8') as file:
-        json.dump(site_structure, file, indent=2, ensure_ascii=False)
+        file.write("{")
+        for url, data in site_structure.items():
+            record = json.dumps(data, indent=2, ensure_ascii=False).replace("\n", "\n  ")
+            file.write(("," if count else "") + "\n  " + json.dumps(url, ensure_ascii=False) + ": " + record)
+            count += 1
+        file.write("\n}" if count else "}")
     print(f"Site structure saved to {filename}")
 
 if __name__ == "__main__":
-    crawled_site_structure = crawl_site(WEBSITE_TO_CRAWL, MAX_PAGES_TO_CRAWL)
-    save_links_as_json(crawled_site_structure)
+    parser = argparse.ArgumentParser(description="Crawl a website and map its internal links.")
+    parser.add_argument("--resume", action="store_true", help=f"continue an interrupted crawl from {CHECKPOINT_FILE}")
+    args = parser.parse_args()
+
+    previous_crawl = load_previous_crawl(PREVIOUS_CRAWL_FILE) if INCREMENTAL_CRAWL else None
+    if STREAM_TO_CHECKPOINT or args.resume:
+        crawl_site_to_file(WEBSITE_TO_CRAWL, MAX_PAGES_TO_CRAWL, resume=args.resume, previous=previous_crawl)
+        write_graph_file(iter_json_object('links.json'))
+    else:
+        crawled_site_structure = crawl_site(WEBSITE_TO_CRAWL, MAX_PAGES_TO_CRAWL, previous=previous_crawl)
+        save_links_as_json(crawled_site_structure)
+        write_graph_file(crawled_site_structure.items())
     print("Crawling complete. Starting Flask server subprocess...")
     subprocess.run(["python", "flask_server.py"])
     print("Flask server subprocess has been initiated.")
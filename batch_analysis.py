@@ -0,0 +1,87 @@
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from anthropic_api import AnthropicAPIError, analyze_with_cache
+
+BATCH_CONCURRENCY = 4
+
+BATCH_MAX_URLS = 500
+
+BATCH_MAX_RETRIES = 5
+
+BATCH_BACKOFF_SECONDS = 2.0
+
+BATCH_MAX_BACKOFF_SECONDS = 60.0
+
+RETRYABLE_STATUS_CODES = {408, 409, 429, 500, 502, 503, 504, 529}
+
+# Shared by every worker of a batch: once one call is rate limited, the others
+# hold off until the same deadline instead of piling more requests on the API.
+class BackoffGate:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._resume_at = 0.0
+
+    def wait(self, sleep=time.sleep):
+        while True:
+            with self._lock:
+                delay = self._resume_at - time.time()
+            if delay <= 0:
+                return
+            sleep(delay)
+
+    def pause(self, seconds):
+        with self._lock:
+            self._resume_at = max(self._resume_at, time.time() + seconds)
+
+# Timeouts and dropped connections (the SDK's APIConnectionError) and the
+# status codes above are retried; any other failure is reported at once.
+def is_retryable(error):
+    if not isinstance(error, AnthropicAPIError):
+        return False
+    return error.connection_error or error.status_code in RETRYABLE_STATUS_CODES
+
+def backoff_delay(error, attempt, base=BATCH_BACKOFF_SECONDS, cap=BATCH_MAX_BACKOFF_SECONDS):
+    if getattr(error, 'retry_after', None):
+        return min(cap, error.retry_after)
+    return min(cap, base * (2 ** attempt)) * random.uniform(0.5, 1.0)
+
+def analyze_with_retries(page_data, gate, analyze=analyze_with_cache, max_retries=BATCH_MAX_RETRIES, sleep=time.sleep):
+    attempt = 0
+    while True:
+        gate.wait(sleep)
+        try:
+            return analyze(page_data)
+        except Exception as e:
+            if not is_retryable(e) or attempt >= max_retries:
+                raise
+            delay = backoff_delay(e, attempt)
+            print(f"Analysis rate limited or failed ({e}); retrying in {delay:.1f}s")
+            gate.pause(delay)
+            attempt += 1
+
+# Yields one result dict per URL in completion order, at most `concurrency`
+# API calls in flight at once.
+def run_batch(urls, find_page, concurrency=BATCH_CONCURRENCY, analyze=analyze_with_cache, max_retries=BATCH_MAX_RETRIES, sleep=time.sleep):
+    gate = BackoffGate()
+
+    def work(url):
+        page_data = find_page(url)
+        if not page_data:
+            return {"url": url, "error": "No data found for this URL"}
+        started = time.time()
+        try:
+            analysis, cached = analyze_with_retries(page_data, gate, analyze, max_retries, sleep)
+        except Exception as e:
+            return {"url": url, "error": f"An error occurred during analysis: {str(e)}"}
+        return {"url": url, "analysis": analysis, "cached": cached, "seconds": round(time.time() - started, 3)}
+
+    with ThreadPoolExecutor(max_workers=max(1, concurrency)) as pool:
+        futures = [pool.submit(work, url) for url in urls]
+        try:
+            for future in as_completed(futures):
+                yield future.result()
+        finally:
+            for future in futures:
+                future.cancel()
@@ -0,0 +1,323 @@
+import argparse
+import json
+import multiprocessing
+import os
+import platform
+import random
+import subprocess
+import tempfile
+import threading
+import time
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from queue import Empty
+
+from timings import load_metrics_file
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+BENCHMARK_RESULTS_FILE = 'benchmark_results.json'
+
+BENCHMARK_TIMEOUT = 3600
+
+BENCHMARK_POLL_INTERVAL = 1.0
+
+# The adaptive per-host rate limit would mostly measure its own ramp-up against
+# the single local host, so benchmarks run without it unless asked. The
+# setting is recorded with the crawl options and so is part of what makes two
+# runs comparable.
+BENCHMARK_RATE_LIMIT = False
+
+# Site shapes for --profile; any field can be overridden on the command line.
+# `fanout` is the number of internal links per page, `html_kb` pads every page
+# with markup up to that size, `words` is the visible text per page and
+# `broken`/`redirects` are the share of links that 404 or go through a 301.
+BENCHMARK_PROFILES = {
+    "small": {"pages": 200, "fanout": 8, "html_kb": 20, "words": 400, "broken": 0.02, "redirects": 0.02,
+              "latency": 0.02, "jitter": 0.01},
+    "medium": {"pages": 1000, "fanout": 12, "html_kb": 40, "words": 800, "broken": 0.02, "redirects": 0.02,
+               "latency": 0.05, "jitter": 0.03},
+    "heavy": {"pages": 300, "fanout": 20, "html_kb": 250, "words": 3000, "broken": 0.05, "redirects": 0.05,
+              "latency": 0.1, "jitter": 0.1},
+}
+
+VOCABULARY_SIZE = 400
+
+SITE_SEED = 0
+
+# Stages timed while fetching; every other stage is part of "analysis".
+FETCH_STAGES = ("connect", "tls", "wait", "download")
+
+# A deterministic synthetic site. Page i lives at /p{i}/ ("/" is page 0) and
+# links to its children in a `fanout`-ary tree, so every page is reachable,
+# then to random pages; a share of the links points at /r{i} (a 301 to /p{i}/)
+# or at /missing{k} (404). Pages are generated on request.
+class SyntheticSite:
+    def __init__(self, pages, fanout, html_kb, words, broken, redirects, seed=SITE_SEED):
+        self.pages = max(1, pages)
+        self.fanout = max(1, fanout)
+        self.html_bytes = html_kb * 1024
+        self.words = words
+        self.broken = broken
+        self.redirects = redirects
+        self.seed = seed
+        rng = random.Random(seed)
+        letters = "abcdefghijklmnopqrstuvwxyz"
+        self.vocabulary = ["".join(rng.choice(letters) for _ in range(rng.randint(2, 10))) for _ in range(VOCABULARY_SIZE)]
+
+    def links(self, i):
+        rng = random.Random(self.seed * 1000003 + i)
+        targets = [c for c in range(i * self.fanout + 1, (i + 1) * self.fanout + 1) if c < self.pages]
+        while len(targets) < self.fanout:
+            targets.append(rng.randrange(self.pages))
+        hrefs = []
+        for target in targets:
+            roll = rng.random()
+            if roll < self.broken:
+                hrefs.append(f"/missing{rng.randrange(self.pages)}")
+            elif roll < self.broken + self.redirects:
+                hrefs.append(f"/r{target}")
+            else:
+                hrefs.append(f"/p{target}/")
+        return hrefs
+
+    def text(self, rng):
+        words = [rng.choice(self.vocabulary) for _ in range(self.words)]
+        return "".join(f"<p>{' '.join(words[k:k + 60])}.</p>\n" for k in range(0, len(words), 60))
+
+    def page(self, i):
+        rng = random.Random(self.seed * 7919 + i)
+        nav = "".join(f'<li><a href="{href}">{rng.choice(self.vocabulary)}</a></li>' for href in self.links(i))
+        head = (f'<!doctype html><html lang="en"><head><meta charset="utf-8"><title>Page {i}</title>'
+                f'<meta name="description" content="Synthetic page {i}"><meta name="viewport" content="width=device-width">'
+                f'<link rel="stylesheet" href="/site.css"><link rel="canonical" href="/p{i}/"></head>'
+                f'<body><header><nav><ul>{nav}</ul></nav></header><main><h1>Page {i}</h1>\n')
+        tail = '</main><footer><a href="/">Home</a></footer></body></html>'
+        body = [head, self.text(rng)]
+        size = len(head) + len(body[1]) + len(tail)
+        k = 0
+        while size < self.html_bytes:
+            block = f'<div class="card card-{k % 7}" data-id="{i}-{k}"><span class="label">{rng.choice(self.vocabulary)}</span><img src="/i/{k % 50}.png" alt=""></div>\n'
+            body.append(block)
+            size += len(block)
+            k += 1
+        body.append(tail)
+        return "".join(body).encode("utf-8")
+
+    def url_count(self):
+        return self.pages + int(self.pages * (self.broken + self.redirects) * self.fanout)
+
+def _handler(site, latency, jitter):
+    class SiteHandler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, *args):
+            pass
+
+        def send(self, status, body=b"", content_type="text/html; charset=utf-8", headers=()):
+            self.send_response(status)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(body)))
+            for name, value in headers:
+                self.send_header(name, value)
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self):
+            time.sleep(latency + random.uniform(0, jitter))
+            path = self.path.split("?", 1)[0]
+            number = path.strip("/")[1:]
+            if path == "/":
+                self.send(200, site.page(0))
+            elif path.startswith("/p") and number.isdigit() and int(number) < site.pages:
+                self.send(200, site.page(int(number)))
+            elif path.startswith("/r") and number.isdigit():
+                self.send(301, headers=[("Location", f"/p{number}/")])
+            else:
+                self.send(404, b"<html><body>Not found</body></html>")
+
+    return SiteHandler
+
+class BenchmarkServer(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 256
+
+    # The crawler drops kept-alive connections and aborts streamed bodies.
+    def handle_error(self, request, client_address):
+        pass
+
+def serve_site(site, latency=0.0, jitter=0.0, port=0):
+    server = BenchmarkServer(("127.0.0.1", port), _handler(site, latency, jitter))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}/"
+
+def _peak_rss_mb():
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return round(peak / (1024 * 1024 if platform.system() == "Darwin" else 1024), 1)
+
+# Runs in a fresh process so peak RSS covers one crawl only. Per-page times come
+# from the stage histograms the crawl writes to its metrics file.
+def _crawl_worker(start_url, max_pages, options, out_dir, queue):
+    import app
+    links_file = os.path.join(out_dir, "links.json")
+    graph_file = os.path.join(out_dir, "graph.json")
+    metrics_file = os.path.join(out_dir, "crawl_metrics.json")
+
+    start = time.perf_counter()
+    site = app.crawl_site(start_url, max_pages, metrics_file=metrics_file, **options)
+    crawl_seconds = time.perf_counter() - start
+    app.save_links_as_json(site, links_file)
+    app.write_graph_file(site.items(), graph_file)
+
+    stages = load_metrics_file(metrics_file)["stages"]
+    stage_ms = {name: round(stage["sum"] / stage["count"] * 1000, 3) for name, stage in stages.items() if stage["count"]}
+    queue.put({
+        "pages": len(site),
+        "html_pages": sum(1 for record in site.values() if isinstance(record, dict) and not record.get("error")),
+        "crawl_seconds": round(crawl_seconds, 3),
+        "pages_per_second": round(len(site) / crawl_seconds, 2) if crawl_seconds > 0 else None,
+        "parse_ms_per_page": stage_ms.get("parse"),
+        "analysis_ms_per_page": round(sum(ms for name, ms in stage_ms.items() if name not in FETCH_STAGES), 3),
+        "peak_rss_mb": _peak_rss_mb(),
+        "links_json_bytes": os.path.getsize(links_file),
+        "graph_json_bytes": os.path.getsize(graph_file),
+        "stage_ms_per_page": stage_ms,
+    })
+
+# The crawl's metrics, polling so that a crawl process that dies without
+# reporting fails the benchmark at once instead of after BENCHMARK_TIMEOUT.
+def _wait_for_metrics(worker, queue, timeout=BENCHMARK_TIMEOUT):
+    deadline = time.time() + timeout
+    while True:
+        try:
+            return queue.get(timeout=BENCHMARK_POLL_INTERVAL)
+        except Empty:
+            pass
+        if not worker.is_alive():
+            try:
+                return queue.get(timeout=BENCHMARK_POLL_INTERVAL)
+            except Empty:
+                raise RuntimeError(f"Benchmark crawl exited with code {worker.exitcode} without reporting results")
+        if time.time() > deadline:
+            raise TimeoutError(f"Benchmark crawl did not finish within {timeout}s")
+
+def git_revision():
+    try:
+        result = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                                cwd=os.path.dirname(os.path.abspath(__file__)))
+        return result.stdout.strip() or None
+    except OSError:
+        return None
+
+def run_benchmark(site_options, crawl_options=None, max_pages=None):
+    site_options = dict(site_options)
+    crawl_options = dict(crawl_options or {})
+    crawl_options.setdefault("rate_limit", BENCHMARK_RATE_LIMIT)
+    latency = site_options.pop("latency", 0.0)
+    jitter = site_options.pop("jitter", 0.0)
+    site = SyntheticSite(**site_options)
+    max_pages = max_pages or site.url_count()
+    server, start_url = serve_site(site, latency, jitter)
+    context = multiprocessing.get_context("spawn")
+    queue = context.Queue()
+    try:
+        with tempfile.TemporaryDirectory() as out_dir:
+            worker = context.Process(target=_crawl_worker, args=(start_url, max_pages, crawl_options, out_dir, queue))
+            worker.start()
+            try:
+                metrics = _wait_for_metrics(worker, queue)
+            except BaseException:
+                worker.terminate()
+                raise
+            finally:
+                worker.join()
+    finally:
+        server.shutdown()
+        server.server_close()
+    return {
+        "revision": git_revision(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "site": dict(site_options, latency=latency, jitter=jitter),
+        "crawl": dict(crawl_options, max_pages=max_pages),
+        "metrics": metrics,
+    }
+
+def load_results(filename=BENCHMARK_RESULTS_FILE):
+    try:
+        with open(filename, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return []
+    except json.JSONDecodeError:
+        print(f"Could not decode {filename}, starting a new results file.")
+        return []
+
+def save_result(result, filename=BENCHMARK_RESULTS_FILE):
+    results = load_results(filename)
+    results.append(result)
+    with open(filename, "w", encoding="utf-8") as f:
+        json.dump(results, f, indent=2)
+    print(f"Benchmark result saved to {filename}")
+    return results
+
+# Latest earlier run with the same site and crawl settings, if any.
+def previous_result(results, result):
+    for earlier in reversed(results):
+        if earlier is not result and earlier["site"] == result["site"] and earlier["crawl"] == result["crawl"]:
+            return earlier
+    return None
+
+def _report_line(name, value, before):
+    line = f"  {name:<22} {value}"
+    if isinstance(value, (int, float)) and isinstance(before, (int, float)) and before:
+        line += f"  ({(value - before) / before * 100:+.1f}% vs {before})"
+    return line
+
+def print_report(result, baseline=None):
+    print(f"Benchmark at {result['revision'] or 'unknown revision'}: {result['site']}")
+    if baseline:
+        print(f"Compared with {baseline['revision'] or 'unknown revision'} ({baseline['timestamp']})")
+    before = baseline["metrics"] if baseline else {}
+    for name, value in result["metrics"].items():
+        if isinstance(value, dict):
+            print(f"  {name}:")
+            for stage, ms in value.items():
+                print("  " + _report_line(stage, ms, (before.get(name) or {}).get(stage)))
+        else:
+            print(_report_line(name, value, before.get(name)))
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Crawl a synthetic site served locally and record crawler performance.")
+    parser.add_argument("--profile", choices=sorted(BENCHMARK_PROFILES), default="small")
+    for name, kind in (("pages", int), ("fanout", int), ("html-kb", int), ("words", int), ("broken", float),
+                       ("redirects", float), ("latency", float), ("jitter", float)):
+        parser.add_argument(f"--{name}", type=kind, help="override the profile's value")
+    parser.add_argument("--max-pages", type=int, help="crawl budget (default: every URL on the site)")
+    parser.add_argument("--concurrency", type=int)
+    parser.add_argument("--analysis-workers", type=int)
+    parser.add_argument("--analysis-profile", help="links-only, seo or full (default: ANALYSIS_PROFILE in app.py)")
+    parser.add_argument("--rate-limit", action="store_true", help="crawl with the adaptive per-host rate limit on")
+    parser.add_argument("--results", default=BENCHMARK_RESULTS_FILE, help="file the result is appended to")
+    args = parser.parse_args()
+
+    site_options = dict(BENCHMARK_PROFILES[args.profile])
+    for name in ("pages", "fanout", "html_kb", "words", "broken", "redirects", "latency", "jitter"):
+        if getattr(args, name) is not None:
+            site_options[name] = getattr(args, name)
+    crawl_options = {}
+    if args.concurrency is not None:
+        crawl_options["concurrency"] = args.concurrency
+    if args.analysis_workers is not None:
+        crawl_options["analysis_workers"] = args.analysis_workers
+    if args.analysis_profile is not None:
+        crawl_options["analysis_profile"] = args.analysis_profile
+    crawl_options["rate_limit"] = args.rate_limit or BENCHMARK_RATE_LIMIT
+
+    result = run_benchmark(site_options, crawl_options, args.max_pages)
+    results = save_result(result, args.results)
+    print_report(result, previous_result(results, result))
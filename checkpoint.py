@@ -0,0 +1,61 @@
+import json
+import os
+
+def encode_record(obj):
+    return json.dumps(obj, ensure_ascii=False, separators=(',', ':'))
+
+class CheckpointWriter:
+    def __init__(self, filename, resume=False):
+        self.filename = filename
+        if resume:
+            repair_checkpoint(filename)
+        self._file = open(filename, 'a' if resume else 'w', encoding='utf-8')
+
+    def write(self, record, links):
+        self._file.write(encode_record({"record": record, "links": links}) + "\n")
+        self._file.flush()
+
+    def close(self):
+        self._file.close()
+
+# A crash can leave a half-written last line behind; cut the file back to the
+# last complete entry so resumed appends start on a clean line.
+def repair_checkpoint(filename):
+    if not os.path.exists(filename):
+        return
+    with open(filename, 'rb+') as f:
+        data = f.read()
+        end = data.rfind(b"\n") + 1
+        if end < len(data):
+            f.truncate(end)
+
+def iter_checkpoint(filename):
+    try:
+        with open(filename, 'r', encoding='utf-8') as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    entry = json.loads(line)
+                except json.JSONDecodeError:
+                    print(f"Skipping unreadable checkpoint line in {filename}")
+                    continue
+                yield entry["record"], entry.get("links") or []
+    except FileNotFoundError:
+        return
+
+def write_final_output(checkpoint_file, filename, finalize):
+    return write_records_output((record for record, _ in iter_checkpoint(checkpoint_file)), filename, finalize)
+
+def write_records_output(records, filename, finalize):
+    count = 0
+    with open(filename, 'w', encoding='utf-8') as out:
+        out.write("{")
+        for record in records:
+            url = record.get("url")
+            out.write(("," if count else "") + "\n" + encode_record(url) + ":" + encode_record(finalize(url, record)))
+            count += 1
+        out.write("\n}\n")
+    print(f"Site structure for {count} URLs saved to {filename}")
+    return count
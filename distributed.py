@@ -0,0 +1,479 @@
+import argparse
+import heapq
+import json
+import multiprocessing
+import os
+import sqlite3
+import sys
+import time
+import zlib
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+from app import (ADAPTIVE_RATE_LIMIT, ANALYSIS_PROFILE, CHECK_EXTERNAL_LINKS, CONCURRENT_REQUESTS, FRONTIER_SIZE_FACTOR,
+                 MAX_PAGES_TO_CRAWL, MAX_REQUESTS_PER_HOST, RECORD_PAGE_TIMINGS, RESPECT_ROBOTS_TXT, SEED_FROM_SITEMAPS,
+                 SITEMAP_SEED_DEPTH, SITEMAP_SEED_SHARE, WEBSITE_TO_CRAWL, CrawlResult, HostLimiter, analyze_html, build_session,
+                 check_external_links, external_references, fetch_error_record, fetch_page, fetch_robots_and_sitemaps,
+                 finalize_record, prepare_page, profile_analyzers, site_annotations)
+from analyzers import warm_up
+from checkpoint import CheckpointWriter, write_records_output
+from frontier import canonicalize_url, is_internal
+from graph_export import write_graph_file
+from page_store import iter_json_object
+from rate_control import RateController
+from sitemaps import read_sitemaps
+from timings import CRAWL_METRICS_FILE, StageHistograms, write_metrics_file
+
+DISTRIBUTED_DIR = 'crawl_shards'
+
+FRONTIER_FILE = 'frontier.sqlite'
+
+DISTRIBUTED_WORKERS = 4
+
+# A claimed URL not completed within this many seconds (its worker died or hung)
+# can be claimed by another worker.
+LEASE_SECONDS = 120
+
+POLL_INTERVAL = 0.2
+
+SQLITE_BUSY_TIMEOUT = 30
+
+QUEUED, LEASED, DONE = 0, 1, 2
+
+def shard_of(url, shards):
+    return zlib.crc32(url.encode('utf-8')) % shards
+
+def partial_file(work_dir, worker_id):
+    return os.path.join(work_dir, f"worker-{worker_id}.ndjson")
+
+def stats_file(work_dir, worker_id):
+    return os.path.join(work_dir, f"worker-{worker_id}.stats.json")
+
+# The crawl's visited set and queue, shared by every worker process through one
+# SQLite file. Each admitted URL is a row (its rowid is the admission order) in
+# the shard given by its hash; workers claim rows from their own shard first
+# and lease them until they are completed. At most `max_size` URLs are ever
+# admitted and at most `max_pages` are crawled. Settings shared with the
+# workers (start URL, shard count, options) and the running totals live in the
+# meta table, updated in the same transaction as the rows they count.
+class SharedFrontier:
+    def __init__(self, db_file, shards=None, max_size=None, max_pages=None):
+        self.db_file = db_file
+        self._conn = sqlite3.connect(db_file, timeout=SQLITE_BUSY_TIMEOUT, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS urls ("
+            "seq INTEGER PRIMARY KEY AUTOINCREMENT, url TEXT NOT NULL UNIQUE, shard INTEGER NOT NULL, depth INTEGER NOT NULL, "
+            "state INTEGER NOT NULL DEFAULT 0, owner TEXT, lease_expires REAL, fetch_url TEXT)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS urls_claim ON urls (shard, state, depth, seq)")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS urls_state ON urls (state, depth, seq)")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS urls_lease ON urls (state, lease_expires)")
+        self._conn.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)")
+        if shards is not None:
+            self.set_meta("shards", shards)
+        if max_size is not None:
+            self.set_meta("max_size", max_size)
+        if max_pages is not None:
+            self.set_meta("max_pages", max_pages)
+        if self.get_meta("admitted") is None:
+            self.set_meta("admitted", self._conn.execute("SELECT COUNT(*) FROM urls").fetchone()[0])
+            self.set_meta("started", self._conn.execute("SELECT COUNT(*) FROM urls WHERE state != ?", (QUEUED,)).fetchone()[0])
+        self.shards = self.get_meta("shards", 1)
+        self.max_size = self.get_meta("max_size")
+        self.max_pages = self.get_meta("max_pages")
+
+    def set_meta(self, key, value):
+        self._conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", (key, json.dumps(value)))
+
+    def get_meta(self, key, default=None):
+        row = self._conn.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return json.loads(row[0]) if row else default
+
+    def _admit(self, links):
+        admitted = self.get_meta("admitted", 0)
+        for link in links:
+            url, depth = link[0], link[1]
+            fetch_url = link[2] if len(link) > 2 and link[2] != url else None
+            # A URL found again at a smaller depth before it is crawled keeps the smaller one.
+            updated = self._conn.execute("UPDATE urls SET depth = ? WHERE url = ? AND state = ? AND depth > ?",
+                                         (depth, url, QUEUED, depth)).rowcount
+            if updated or (self.max_size is not None and admitted >= self.max_size):
+                continue
+            admitted += self._conn.execute("INSERT OR IGNORE INTO urls (url, shard, depth, fetch_url) VALUES (?, ?, ?, ?)",
+                                           (url, shard_of(url, self.shards), depth, fetch_url)).rowcount
+        self.set_meta("admitted", admitted)
+
+    def add(self, links):
+        self._conn.execute("BEGIN IMMEDIATE")
+        try:
+            self._admit(links)
+            self._conn.execute("COMMIT")
+        except Exception:
+            self._conn.execute("ROLLBACK")
+            raise
+
+    def _room(self):
+        if self.max_pages is None:
+            return None
+        return max(0, self.max_pages - self.get_meta("started", 0))
+
+    # Up to `limit` (url, depth, fetch_url) tuples: URLs whose lease expired
+    # first, then queued ones, shallowest and oldest first, from the worker's
+    # shard or, once that is empty, from any shard. Queued URLs count against
+    # `max_pages` when first claimed.
+    def claim(self, owner, shard, limit, lease_seconds=LEASE_SECONDS):
+        now = time.time()
+        self._conn.execute("BEGIN IMMEDIATE")
+        try:
+            rows = self._conn.execute(
+                "SELECT seq, url, depth, fetch_url FROM urls WHERE state = ? AND lease_expires < ? ORDER BY depth, seq LIMIT ?",
+                (LEASED, now, limit)
+            ).fetchall()
+            room = self._room()
+            wanted = limit - len(rows) if room is None else min(limit - len(rows), room)
+            if wanted > 0:
+                for where, params in (("shard = ? AND ", (shard,)), ("", ())):
+                    queued = self._conn.execute(
+                        f"SELECT seq, url, depth, fetch_url FROM urls WHERE {where}state = ? ORDER BY depth, seq LIMIT ?",
+                        params + (QUEUED, wanted)
+                    ).fetchall()
+                    if queued:
+                        break
+                rows += queued
+                self.set_meta("started", self.get_meta("started", 0) + len(queued))
+            self._conn.executemany("UPDATE urls SET state = ?, owner = ?, lease_expires = ? WHERE seq = ?",
+                                   ((LEASED, owner, now + lease_seconds, seq) for seq, _, _, _ in rows))
+            self._conn.execute("COMMIT")
+        except Exception:
+            self._conn.execute("ROLLBACK")
+            raise
+        return [(url, depth, fetch_url or url) for _, url, depth, fetch_url in rows]
+
+    # Marks a crawled URL done by `owner` and admits the links found on it, in
+    # one transaction. A URL crawled twice (its first lease expired) keeps the
+    # owner that completed it last.
+    def complete(self, url, links, owner):
+        self._conn.execute("BEGIN IMMEDIATE")
+        try:
+            self._conn.execute("UPDATE urls SET state = ?, owner = ?, lease_expires = NULL WHERE url = ?", (DONE, owner, url))
+            self._admit(links)
+            self._conn.execute("COMMIT")
+        except Exception:
+            self._conn.execute("ROLLBACK")
+            raise
+
+    # True once nothing is leased and nothing queued can still be claimed.
+    def finished(self):
+        def exists(state):
+            return self._conn.execute("SELECT EXISTS (SELECT 1 FROM urls WHERE state = ?)", (state,)).fetchone()[0]
+        return not exists(LEASED) and (self._room() == 0 or not exists(QUEUED))
+
+    def counts(self):
+        rows = self._conn.execute("SELECT state, COUNT(*) FROM urls GROUP BY state").fetchall()
+        counts = dict.fromkeys(("queued", "leased", "done"), 0)
+        counts.update({("queued", "leased", "done")[state]: n for state, n in rows})
+        return counts
+
+    def order(self):
+        return {url: seq for seq, url in self._conn.execute("SELECT seq, url FROM urls WHERE state = ?", (DONE,))}
+
+    # Id of the worker that completed each crawled URL.
+    def completed_by(self):
+        rows = self._conn.execute("SELECT url, owner FROM urls WHERE state = ? AND owner IS NOT NULL", (DONE,))
+        return {url: int(owner.split(":", 1)[0]) for url, owner in rows}
+
+    def close(self):
+        self._conn.close()
+
+def crawl_page(session, url, fetch_url, depth, host_limiter, rate_controller, start_url, profile):
+    try:
+        response, response_time, body, fetch_timings = fetch_page(session, fetch_url, host_limiter, None, rate_controller)
+        result, page = prepare_page(url, depth, response, response_time, body, fetch_timings)
+        if page is not None:
+            result = analyze_html(page, start_url, profile)
+    except Exception as e:
+        result = (fetch_error_record(url, depth, e), [])
+    return result
+
+# One crawl worker: claims URLs from the shared frontier, fetches and analyzes
+# them on `concurrency` threads, appends each page to its own partial file (in
+# the checkpoint format) and reports the links it found back to the frontier.
+# Runs until no URL is queued or leased. Options come from the frontier's meta
+# table, so a worker on another machine only needs the shared directory.
+def run_worker(work_dir, worker_id):
+    frontier = SharedFrontier(os.path.join(work_dir, FRONTIER_FILE))
+    options = frontier.get_meta("options")
+    start_url = frontier.get_meta("start_url")
+    concurrency = max(1, options["concurrency"])
+    owner = f"{worker_id}:{os.getpid()}"
+    shard = worker_id % frontier.shards
+
+    session = build_session(pool_size=concurrency)
+    host_limiter = HostLimiter(options["per_host"])
+    _, robots = fetch_robots_and_sitemaps(start_url, session)
+    rate_controller = RateController() if options["rate_limit"] else None
+    if rate_controller is not None and options["respect_robots"]:
+        rate_controller.set_crawl_delay(start_url, robots.crawl_delay)
+    histograms = StageHistograms()
+    robots_blocked = set()
+    pages = 0
+    started = time.time()
+
+    warm_up(options["analysis_profile"])
+    writer = CheckpointWriter(partial_file(work_dir, worker_id), resume=True)
+    in_flight = {}
+    try:
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            while True:
+                if len(in_flight) < concurrency:
+                    for url, depth, fetch_url in frontier.claim(owner, shard, concurrency - len(in_flight), options["lease_seconds"]):
+                        print(f"[worker {worker_id}] Crawling: {fetch_url} (depth {depth})")
+                        future = pool.submit(crawl_page, session, url, fetch_url, depth, host_limiter, rate_controller, start_url,
+                                             options["analysis_profile"])
+                        in_flight[future] = (url, depth)
+                if not in_flight:
+                    if frontier.finished():
+                        break
+                    time.sleep(POLL_INTERVAL)
+                    continue
+
+                done, _ = wait(in_flight, timeout=POLL_INTERVAL, return_when=FIRST_COMPLETED)
+                for future in done:
+                    url, depth = in_flight.pop(future)
+                    record, internal_links_found = future.result()
+                    if isinstance(record, dict) and "timings" in record:
+                        histograms.observe_all(record["timings"] if options["record_timings"] else record.pop("timings"))
+                    writer.write(record, internal_links_found)
+                    links = []
+                    for link in dict.fromkeys(internal_links_found):
+                        target = canonicalize_url(link)
+                        if options["respect_robots"] and not robots.allowed(link):
+                            robots_blocked.add(target)
+                        else:
+                            links.append((target, depth + 1, link))
+                    frontier.complete(url, links, owner)
+                    pages += 1
+    finally:
+        writer.close()
+        frontier.close()
+
+    with open(stats_file(work_dir, worker_id), 'w', encoding='utf-8') as f:
+        json.dump({
+            "worker": worker_id,
+            "pages": pages,
+            "seconds": round(time.time() - started, 3),
+            "robots_blocked": sorted(robots_blocked),
+            "robots_crawl_delay": robots.crawl_delay,
+            "rate_control": rate_controller.stats() if rate_controller is not None else None,
+            "histograms": histograms.to_dict(),
+        }, f)
+    print(f"[worker {worker_id}] Done after {pages} pages")
+
+# Shortest link distance of every page from the seeds (the start URL at 0,
+# sitemap seeds at their seed depth): the depth a single-process BFS crawl
+# records. Workers racing each other can first reach a page by a longer path.
+def discovery_depths(seeds, out_edges):
+    depths = {}
+    heap = [(depth, url) for url, depth in seeds]
+    heapq.heapify(heap)
+    while heap:
+        depth, url = heapq.heappop(heap)
+        if url in depths:
+            continue
+        depths[url] = depth
+        for link in out_edges.get(url, ()):
+            if link not in depths:
+                heapq.heappush(heap, (depth + 1, link))
+    return depths
+
+def _read_line(files, location):
+    f = files[location[0]]
+    f.seek(location[1])
+    entry = json.loads(f.readline())
+    return entry["record"], entry.get("links") or []
+
+# Rebuilds the crawl from the workers' partial files: every page once (a page
+# crawled twice after an expired lease keeps the record of the worker that
+# completed it last, the last one that worker wrote), in admission order, with the link graph, duplicates and annotations recomputed over the
+# whole site. Writes `filename` in the same format as crawl_site_to_file.
+def merge_partials(work_dir, filename='links.json', check_links=CHECK_EXTERNAL_LINKS, metrics_file=CRAWL_METRICS_FILE):
+    frontier = SharedFrontier(os.path.join(work_dir, FRONTIER_FILE))
+    start_url = frontier.get_meta("start_url")
+    site_meta = frontier.get_meta("site_meta") or {}
+    sitemap_urls = set(frontier.get_meta("sitemap_urls") or [])
+    seeds = frontier.get_meta("seeds") or [(start_url, 0)]
+    shards = frontier.shards
+    order = frontier.order()
+    completed_by = frontier.completed_by()
+    frontier.close()
+
+    workers = sorted(int(name[len("worker-"):-len(".ndjson")]) for name in os.listdir(work_dir)
+                     if name.startswith("worker-") and name.endswith(".ndjson"))
+    files = {w: open(partial_file(work_dir, w), 'rb') for w in workers}
+    try:
+        locations = defaultdict(dict)
+        for w, f in files.items():
+            offset = 0
+            for line in f:
+                if line.strip():
+                    try:
+                        url = json.loads(line)["record"]["url"]
+                    except (ValueError, KeyError, TypeError):
+                        print(f"Skipping unreadable line in {partial_file(work_dir, w)}")
+                    else:
+                        locations[url][w] = (w, offset)
+                offset += len(line)
+        locations = {url: by_worker.get(completed_by.get(url), by_worker[max(by_worker)])
+                     for url, by_worker in locations.items()}
+        urls = sorted(locations, key=lambda url: (order.get(url, float("inf")), url))
+
+        pages = []
+        in_edges = defaultdict(set)
+        out_edges = defaultdict(set)
+        fingerprints = {}
+        external_refs = defaultdict(list)
+        for url in urls:
+            record, internal_links_found = _read_line(files, locations[url])
+            url = sys.intern(url)
+            pages.append(url)
+            if isinstance(record, dict) and "simhash" in record:
+                fingerprints[url] = record["simhash"]
+            for link in internal_links_found:
+                link = sys.intern(canonicalize_url(link))
+                out_edges[url].add(link)
+                in_edges[link].add(url)
+            if check_links:
+                for target in external_references(record):
+                    external_refs[sys.intern(target)].append(url)
+
+        histograms = StageHistograms()
+        robots_blocked = set()
+        worker_stats = []
+        for w in workers:
+            try:
+                with open(stats_file(work_dir, w), 'r', encoding='utf-8') as f:
+                    stats = json.load(f)
+            except (FileNotFoundError, json.JSONDecodeError):
+                continue
+            histograms.merge(stats.pop("histograms"))
+            robots_blocked.update(stats.pop("robots_blocked"))
+            site_meta["robots_crawl_delay"] = stats["robots_crawl_delay"]
+            worker_stats.append(stats)
+        seconds = max((s["seconds"] for s in worker_stats), default=0)
+        site_meta["crawl_stats"] = {
+            "pages": len(pages),
+            "seconds": seconds,
+            "pages_per_second": round(len(pages) / seconds, 3) if seconds > 0 else None,
+            "rate_control": None,
+            "shards": shards,
+            "workers": worker_stats,
+        }
+        if metrics_file:
+            write_metrics_file(histograms, site_meta["crawl_stats"], metrics_file)
+        site_meta["robots_blocked"] = len(robots_blocked)
+        site_meta["robots_blocked_sample"] = sorted(robots_blocked)[:10]
+
+        link_health = check_external_links(external_refs, site_meta) if check_links else {}
+        result = CrawlResult(start_url, pages, in_edges, out_edges, site_meta, fingerprints, sitemap_urls, external_refs, link_health)
+        annotations = site_annotations(result)
+        depths = discovery_depths(seeds, out_edges)
+
+        def finalize(url, data):
+            if isinstance(data, dict) and isinstance(data.get("depth"), int) and url in depths:
+                data["depth"] = min(data["depth"], depths[url])
+            return finalize_record(url, data, result, start_url, annotations)
+
+        records = (_read_line(files, locations[url])[0] for url in urls)
+        return write_records_output(records, filename, finalize)
+    finally:
+        for f in files.values():
+            f.close()
+
+# Seeds a shared frontier in `work_dir` (start URL, sitemap seeds), runs
+# `workers` worker processes on this machine and merges their output into
+# `filename`. With resume=True an interrupted crawl in `work_dir` continues:
+# leases of the dead run expire and the partial files are appended to.
+def crawl_site_distributed(start_url, max_links=MAX_PAGES_TO_CRAWL, workers=DISTRIBUTED_WORKERS, work_dir=DISTRIBUTED_DIR,
+                           filename='links.json', resume=False, concurrency=CONCURRENT_REQUESTS, per_host=MAX_REQUESTS_PER_HOST,
+                           analysis_profile=ANALYSIS_PROFILE, respect_robots=RESPECT_ROBOTS_TXT,
+                           seed_from_sitemaps=SEED_FROM_SITEMAPS, rate_limit=ADAPTIVE_RATE_LIMIT,
+                           record_timings=RECORD_PAGE_TIMINGS, check_links=CHECK_EXTERNAL_LINKS, metrics_file=CRAWL_METRICS_FILE,
+                           lease_seconds=LEASE_SECONDS):
+    profile_analyzers(analysis_profile)
+    workers = max(1, workers)
+    os.makedirs(work_dir, exist_ok=True)
+    frontier_file = os.path.join(work_dir, FRONTIER_FILE)
+    if not resume:
+        for name in os.listdir(work_dir):
+            if name.startswith(FRONTIER_FILE) or name.startswith("worker-"):
+                os.remove(os.path.join(work_dir, name))
+
+    requested_start_url = start_url
+    start_url = canonicalize_url(start_url)
+    frontier = SharedFrontier(frontier_file, shards=workers, max_size=max_links * FRONTIER_SIZE_FACTOR, max_pages=max_links)
+    if not resume or frontier.get_meta("start_url") is None:
+        session = build_session()
+        site_meta, robots = fetch_robots_and_sitemaps(start_url, session)
+        seeds = [(start_url, 0)]
+        sitemap_urls = set()
+        if seed_from_sitemaps and site_meta["sitemaps"]:
+            def normalize(loc):
+                url = canonicalize_url(loc)
+                return url if is_internal(url, start_url) else None
+
+            sitemap_urls, entries = read_sitemaps(session, site_meta["sitemaps"], normalize, int(max_links * SITEMAP_SEED_SHARE))
+            seeds += [(entry.loc, SITEMAP_SEED_DEPTH) for entry in entries
+                      if not respect_robots or robots.allowed(entry.loc)]
+            print(f"Read {len(sitemap_urls)} URLs from sitemaps, seeded {len(entries)}")
+        site_meta["sitemap_url_count"] = len(sitemap_urls)
+        frontier.set_meta("start_url", start_url)
+        frontier.set_meta("site_meta", site_meta)
+        frontier.set_meta("sitemap_urls", sorted(sitemap_urls))
+        frontier.set_meta("seeds", seeds)
+        frontier.add([(start_url, 0, requested_start_url)] + seeds[1:])
+    # Hosts see up to `workers` times the per-process limits, so split them.
+    frontier.set_meta("options", {
+        "concurrency": concurrency,
+        "per_host": max(1, per_host // workers),
+        "analysis_profile": analysis_profile,
+        "respect_robots": respect_robots,
+        "rate_limit": rate_limit,
+        "record_timings": record_timings,
+        "lease_seconds": lease_seconds,
+    })
+    print(f"Starting {workers} workers on {frontier_file} ({frontier.counts()})")
+    frontier.close()
+
+    context = multiprocessing.get_context("spawn")
+    processes = [context.Process(target=run_worker, args=(work_dir, i)) for i in range(workers)]
+    for p in processes:
+        p.start()
+    for p in processes:
+        p.join()
+    failed = [i for i, p in enumerate(processes) if p.exitcode != 0]
+    if failed:
+        print(f"Workers {failed} exited with errors; their leased URLs are recrawled with --resume")
+
+    return merge_partials(work_dir, filename, check_links, metrics_file)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Crawl a website with several worker processes sharing one frontier.")
+    parser.add_argument("--url", default=WEBSITE_TO_CRAWL, help="site to crawl (default: WEBSITE_TO_CRAWL in app.py)")
+    parser.add_argument("--workers", type=int, default=DISTRIBUTED_WORKERS, help="worker processes to start on this machine")
+    parser.add_argument("--work-dir", default=DISTRIBUTED_DIR, help="directory holding the shared frontier and partial results")
+    parser.add_argument("--resume", action="store_true", help="continue an interrupted crawl in --work-dir")
+    parser.add_argument("--join", type=int, metavar="WORKER_ID",
+                        help="run one extra worker with this id against a crawl already started in --work-dir")
+    parser.add_argument("--merge", action="store_true", help="only merge the partial results in --work-dir into links.json")
+    args = parser.parse_args()
+
+    if args.join is not None:
+        run_worker(args.work_dir, args.join)
+    else:
+        if not args.merge:
+            crawl_site_distributed(args.url, MAX_PAGES_TO_CRAWL, args.workers, args.work_dir, resume=args.resume)
+        else:
+            merge_partials(args.work_dir)
+        write_graph_file(iter_json_object('links.json'))
@@ -0,0 +1,251 @@
+import json
+import re
+from collections import Counter
+from html.parser import HTMLParser
+from urllib.parse import urljoin, urlparse
+from bs4 import BeautifulSoup, Tag
+
+try:
+    import lxml  # noqa: F401
+    HAS_LXML = True
+except Exception:
+    HAS_LXML = False
+
+GENERIC_LINK_TEXT = {"click here", "learn more", "more", "here"}
+
+TEXT_TAGS = {'p', 'h1', 'h2', 'h3', 'h4', 'h5', 'h6', 'li', 'span', 'article'}
+HEADING_TAGS = {'h1': 1, 'h2': 2, 'h3': 3, 'h4': 4, 'h5': 5, 'h6': 6}
+SEMANTIC_TAGS = ['main', 'nav', 'article', 'section', 'header', 'footer', 'aside']
+LANDMARK_TAGS = ['main', 'nav', 'header', 'footer', 'aside', 'section', 'article']
+FORM_FIELD_TAGS = {'input', 'textarea', 'select'}
+MIXED_CONTENT_ATTRS = {"img": "src", "script": "src", "link": "href", "iframe": "src", "video": "src", "source": "src"}
+
+def parse_html(html, backend='html.parser'):
+    if backend == 'lxml' and not HAS_LXML:
+        backend = 'html.parser'
+    return BeautifulSoup(html, backend)
+
+def _attr_matches(el, attr, value):
+    current = el.get(attr)
+    if current is None:
+        return False
+    if isinstance(current, list):
+        return value in current or " ".join(current) == value
+    return current == value
+
+def _joined(value):
+    return " ".join(value) if isinstance(value, list) else value
+
+# Walks the parsed tree once and returns every DOM-derived field of a page record:
+# headings and heading-level skips, semantic landmarks, images without alt text,
+# unlabeled form fields, mixed content, structured data, link rels and media hints.
+def analyze_dom(soup, page_url):
+    title_tag = None
+    html_tag = None
+    meta_description_tag = None
+    meta_keywords_tag = None
+    has_viewport_meta = False
+
+    h1_tags = []
+    text_parts = []
+    headings = []
+    image_count = 0
+    script_count = 0
+    stylesheet_count = 0
+    heading_count = 0
+    paragraph_count = 0
+
+    landmarks = {t: 0 for t in LANDMARK_TAGS}
+    fields = []
+    labeled_inputs = set()
+    images_without_alt = []
+    mixed = set()
+    is_https = urlparse(page_url).scheme == "https"
+
+    jsonld = []
+    og = {}
+    tw = {}
+    canonical_tag = None
+    hreflang = []
+
+    anchors = []
+    aria_roles = Counter()
+    link_rel = []
+
+    lazy_count = 0
+    largest = {"src": "", "area": 0, "width": 0, "height": 0}
+
+    for el in soup.descendants:
+        if not isinstance(el, Tag):
+            continue
+        name = el.name
+
+        if el.get('role') is not None:
+            aria_roles[el.get('role')] += 1
+
+        if name in TEXT_TAGS:
+            text_parts.append(el.get_text(separator=' ', strip=True))
+
+        if name in HEADING_TAGS:
+            level = HEADING_TAGS[name]
+            headings.append(level)
+            if level == 1:
+                h1_tags.append(el.get_text(strip=True))
+            else:
+                heading_count += 1
+        elif name == 'p':
+            paragraph_count += 1
+        elif name in landmarks:
+            landmarks[name] += 1
+
+        if is_https and name in MIXED_CONTENT_ATTRS:
+            u = el.get(MIXED_CONTENT_ATTRS[name])
+            if u:
+                absu = urljoin(page_url, u)
+                if absu.lower().startswith("http://"):
+                    mixed.add(absu)
+
+        if name == 'a':
+            if el.get('href') is not None:
+                anchors.append(el)
+        elif name == 'img':
+            image_count += 1
+            alt = el.get('alt')
+            if not alt or alt.strip() == '':
+                src = el.get('src') or el.get('data-src') or ''
+                if src:
+                    images_without_alt.append(src)
+            if (el.get('loading') or '').lower() == 'lazy' or el.get('data-src') or el.get('data-lazy'):
+                lazy_count += 1
+            w = el.get('width')
+            h = el.get('height')
+            try:
+                wv = int(re.sub(r'\D', '', str(w))) if w else 0
+                hv = int(re.sub(r'\D', '', str(h))) if h else 0
+            except Exception:
+                wv, hv = 0, 0
+            area = wv * hv
+            if area > largest["area"]:
+                largest = {
+                    "src": el.get('src') or el.get('data-src') or '',
+                    "area": area,
+                    "width": wv,
+                    "height": hv
+                }
+        elif name == 'script':
+            script_count += 1
+            if (_joined(el.get('type')) or '').lower() == 'application/ld+json':
+                try:
+                    if el.string:
+                        jsonld.append(json.loads(el.string))
+                except Exception:
+                    pass
+        elif name == 'link':
+            if _attr_matches(el, 'rel', 'stylesheet'):
+                stylesheet_count += 1
+            if canonical_tag is None and _attr_matches(el, 'rel', 'canonical'):
+                canonical_tag = el
+            if _joined(el.get('rel')) == 'alternate' and el.get('hreflang') is not None:
+                hreflang.append((el.get('hreflang'), el.get('href')))
+            rel = el.get('rel')
+            if rel:
+                rels = [r.lower() for r in (rel if isinstance(rel, list) else [rel])]
+                if any(r in ('preload', 'prefetch', 'preconnect') for r in rels):
+                    link_rel.append({
+                        "rel": " ".join(rels),
+                        "as": el.get('as', ''),
+                        "href": el.get('href', '')
+                    })
+        elif name == 'meta':
+            meta_name = el.get('name')
+            if meta_name == 'description':
+                meta_description_tag = meta_description_tag or el
+            elif meta_name == 'keywords':
+                meta_keywords_tag = meta_keywords_tag or el
+            elif meta_name == 'viewport':
+                has_viewport_meta = True
+            if meta_name and meta_name.startswith('twitter:'):
+                tw[meta_name] = el.get('content')
+            prop = el.get('property')
+            if prop and prop.startswith('og:'):
+                og[prop] = el.get('content')
+        elif name == 'label':
+            if el.get('for'):
+                labeled_inputs.add(el['for'])
+        elif name in FORM_FIELD_TAGS:
+            fields.append(el)
+        elif name == 'title':
+            title_tag = title_tag or el
+        elif name == 'html':
+            html_tag = html_tag or el
+
+    unlabeled_inputs = []
+    for field in fields:
+        ftype = (field.get('type') or '').lower()
+        if field.get('id') and ftype not in ['hidden', 'submit', 'button', 'reset']:
+            if field['id'] not in labeled_inputs:
+                if not field.find_parent('label'):
+                    unlabeled_inputs.append(field['id'])
+
+    skipped_levels = []
+    prev_level = 0
+    for level in headings:
+        if prev_level and level > prev_level + 1:
+            skipped_levels.append((prev_level, level))
+        prev_level = level
+
+    links = [(a.get_text(strip=True).lower(), a.get('href')) for a in anchors]
+
+    return {
+        "title": title_tag.string.strip() if title_tag else '',
+        "meta_description": meta_description_tag['content'].strip() if meta_description_tag and 'content' in meta_description_tag.attrs else '',
+        "meta_keywords": meta_keywords_tag['content'].strip() if meta_keywords_tag and 'content' in meta_keywords_tag.attrs else '',
+        "h1_tags": h1_tags,
+        "text": " ".join(text_parts),
+        "image_count": image_count,
+        "script_count": script_count,
+        "stylesheet_count": stylesheet_count,
+        "has_viewport_meta": has_viewport_meta,
+        "heading_count": heading_count,
+        "paragraph_count": paragraph_count,
+        "semantic_elements": {t: landmarks[t] > 0 for t in SEMANTIC_TAGS},
+        "heading_issues": skipped_levels,
+        "unlabeled_inputs": unlabeled_inputs,
+        "images_without_alt": images_without_alt,
+        "structured": {
+            "jsonld": jsonld,
+            "opengraph": og,
+            "twitter": tw,
+            "canonical": canonical_tag.get('href', '') if canonical_tag is not None else '',
+            "hreflang": hreflang
+        },
+        "a11y_extras": {
+            "generic_link_texts": [url for (txt, url) in links if txt in GENERIC_LINK_TEXT],
+            "landmarks_count": landmarks,
+            "aria_roles": dict(aria_roles)
+        },
+        "mixed_content": list(sorted(mixed)),
+        "lang_attribute": html_tag.get('lang', '') if html_tag is not None else '',
+        "link_rel": link_rel,
+        "media_hints": {"lazy_images_count": lazy_count, "largest_image": largest},
+        "hrefs": [href for (_, href) in links]
+    }
+
+class _HrefScanner(HTMLParser):
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.hrefs = []
+
+    def handle_starttag(self, tag, attrs):
+        if tag == 'a':
+            attrs = dict(attrs)
+            if 'href' in attrs:
+                self.hrefs.append(attrs['href'] or '')
+
+# The href of every <a> in document order, as analyze_dom reports them, from the
+# tokenizer alone without building a tree; used when only links are wanted.
+def scan_hrefs(html):
+    scanner = _HrefScanner()
+    scanner.feed(html or '')
+    scanner.close()
+    return scanner.hrefs
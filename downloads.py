@@ -0,0 +1,73 @@
+import time
+from collections import namedtuple
+
+from requests.compat import chardet
+
+DOWNLOAD_CHUNK_SIZE = 64 * 1024
+
+# Bodies are cut off after MAX_BODY_BYTES (after Content-Encoding is undone) or
+# once reading them has taken DOWNLOAD_TIME_BUDGET seconds; the request timeout
+# only bounds each read, so a server dripping bytes could hold a worker forever.
+MAX_BODY_BYTES = 5 * 1024 * 1024
+
+DOWNLOAD_TIME_BUDGET = 20
+
+# Pages without a charset in Content-Type are decoded with the encoding guessed
+# from their first ENCODING_SNIFF_BYTES bytes rather than from the whole body.
+ENCODING_SNIFF_BYTES = 64 * 1024
+
+HTML_MEDIA_TYPES = ("text/html",)
+
+# Content types that say nothing about the body, which is then sniffed the way
+# browsers do: after whitespace, an HTML tag or comment must come first.
+UNKNOWN_MEDIA_TYPES = ("", "unknown/unknown", "application/unknown", "*/*")
+
+HTML_SIGNATURES = (b"<!doctype html", b"<html", b"<head", b"<script", b"<iframe", b"<h1", b"<div", b"<font",
+                   b"<table", b"<a", b"<style", b"<title", b"<b", b"<body", b"<br", b"<p")
+
+HtmlBody = namedtuple("HtmlBody", ["text", "bytes_read", "truncated"])
+
+def media_type(content_type):
+    return (content_type or "").split(";", 1)[0].strip().lower()
+
+def looks_like_html(chunk):
+    head = chunk[:1024].lstrip(b"\xef\xbb\xbf").lstrip(b" \t\r\n\x0c").lower()
+    if head.startswith(b"<!--"):
+        return True
+    return any(head.startswith(sig) and head[len(sig):len(sig) + 1] in (b" ", b">") for sig in HTML_SIGNATURES)
+
+def decode_body(content, encoding=None):
+    if not encoding:
+        encoding = chardet.detect(content[:ENCODING_SNIFF_BYTES]).get("encoding") or "utf-8"
+    try:
+        return content.decode(encoding, errors="replace")
+    except LookupError:
+        return content.decode("utf-8", errors="replace")
+
+# Reads the body of a response requested with stream=True if it is HTML, judged
+# from Content-Type or, when that is missing, from the first chunk. Returns None
+# without downloading the rest for anything else. The connection is always
+# released, and a body cut short by the size or time budget is marked truncated.
+def read_html_body(response, max_bytes=MAX_BODY_BYTES, time_budget=DOWNLOAD_TIME_BUDGET):
+    try:
+        declared = media_type(response.headers.get("content-type"))
+        if declared not in HTML_MEDIA_TYPES and declared not in UNKNOWN_MEDIA_TYPES:
+            return None
+        deadline = time.time() + time_budget
+        chunks = []
+        size = 0
+        truncated = False
+        for chunk in response.iter_content(DOWNLOAD_CHUNK_SIZE):
+            if not chunks and declared in UNKNOWN_MEDIA_TYPES and not looks_like_html(chunk):
+                return None
+            chunks.append(chunk)
+            size += len(chunk)
+            if size > max_bytes or time.time() > deadline:
+                truncated = True
+                break
+        if not chunks and declared in UNKNOWN_MEDIA_TYPES:
+            return None
+        content = b"".join(chunks)[:max_bytes]
+        return HtmlBody(decode_body(content, response.encoding), len(content), truncated)
+    finally:
+        response.close()
@@ -1,25 +1,74 @@
-from flask import Flask, request, jsonify
+from flask import Flask, Response, request, jsonify, stream_with_context
 from flask_cors import CORS
-from anthropic_api import analyze_with_anthropic
+from anthropic_api import analyze_with_cache
+from frontier import canonicalize_url
+from page_store import PageStore, open_page_store, PAGE_STORE_FILE
+from batch_analysis import run_batch, BATCH_CONCURRENCY, BATCH_MAX_URLS
+from timings import CRAWL_METRICS_FILE, load_metrics_file, prometheus_text
+from search_index import SearchIndex
 import json
+import threading
+import time
 
-site_structure = {}
+URLS_PAGE_SIZE = 1000
+
+MAX_URLS_PAGE_SIZE = 10000
+
+SEARCH_PAGE_SIZE = 20
+
+MAX_SEARCH_PAGE_SIZE = 10000
+
+page_store = PageStore()
+
+search_index = SearchIndex()
 
 app = Flask(__name__)
 CORS(app)
 
-def load_crawled_data(filename='links.json'):
-    global site_structure
+def load_crawled_data(filename='links.json', db_file=PAGE_STORE_FILE):
+    global page_store
     try:
-        with open(filename, 'r') as f:
-            site_structure = json.load(f)
-        print(f"Successfully loaded {len(site_structure)} URLs from {filename}")
+        page_store = open_page_store(filename, db_file)
+        print(f"Successfully loaded {len(page_store)} URLs from {filename}")
     except FileNotFoundError:
         print(f"ERROR: {filename} not found. Make sure app.py has run and created it.")
-        site_structure = {}
+        page_store = PageStore()
     except json.JSONDecodeError:
         print(f"ERROR: Could not decode JSON from {filename}. It might be corrupted.")
-        site_structure = {}
+        page_store = PageStore()
+    build_search_index()
+
+# Indexes the page store in a background thread; /api/search answers from the
+# pages indexed so far until it is done.
+def build_search_index():
+    global search_index
+    search_index = index = SearchIndex()
+    store = page_store
+
+    def run():
+        start = time.time()
+        index.add_all(store.iter_pages())
+        print(f"Search index built for {len(index)} URLs in {time.time() - start:.1f}s")
+
+    threading.Thread(target=run, daemon=True).start()
+
+def find_page(url):
+    requested_url = url.rstrip("/")
+    return (page_store.get(requested_url)
+            or page_store.get(requested_url + "/")
+            or page_store.get(canonicalize_url(requested_url)))
+
+# Full record for one page; main.js only loads graph.json up front and fetches
+# these when a node is inspected.
+@app.route('/api/page')
+def page_details():
+    url = request.args.get('url')
+    if not url:
+        return jsonify({"error": "Missing 'url' query parameter"}), 400
+    page_data = find_page(url)
+    if not page_data:
+        return jsonify({"error": "No data found for this URL"}), 404
+    return jsonify(page_data)
 
 @app.route('/api/analyze', methods=['POST'])
 def analyze():
@@ -28,29 +77,108 @@ def analyze():
         return jsonify({"error": "Missing 'url' in request body"}), 400
 
     requested_url = data['url'].rstrip("/")
-    page_data = site_structure.get(requested_url) or site_structure.get(requested_url + "/")
+    page_data = find_page(requested_url)
 
     if not page_data:
-        print(f"Debug: URL '{requested_url}' not found in site_structure.")
-        print(f"Debug: Available keys: {list(site_structure.keys())[:5]}")
+        print(f"Debug: URL '{requested_url}' not found in page store.")
+        print(f"Debug: Available keys: {page_store.urls(limit=5)}")
         return jsonify({"error": "No data found for this URL"}), 404
 
     try:
-        analysis = analyze_with_anthropic(page_data)
-        return jsonify({"analysis": analysis})
+        analysis, cached = analyze_with_cache(page_data)
+        return jsonify({"analysis": analysis, "cached": cached})
     except Exception as e:
         print(f"Error during analysis for {requested_url}: {e}")
         return jsonify({"error": f"An error occurred during analysis: {str(e)}"}), 500
 
+# Streams one JSON object per line as each analysis finishes, then a summary line.
+# Body: {"urls": [...]} or {"prefix": "https://site/blog", "limit": 50}, plus an
+# optional "concurrency".
+@app.route('/api/analyze/batch', methods=['POST'])
+def analyze_batch():
+    data = request.json or {}
+    try:
+        limit = min(BATCH_MAX_URLS, max(1, int(data.get('limit', BATCH_MAX_URLS))))
+        concurrency = min(BATCH_CONCURRENCY, max(1, int(data.get('concurrency', BATCH_CONCURRENCY))))
+    except (TypeError, ValueError):
+        return jsonify({"error": "'limit' and 'concurrency' must be integers"}), 400
+
+    if isinstance(data.get('urls'), list):
+        urls = [str(u).rstrip("/") for u in data['urls']][:limit]
+    elif 'prefix' in data:
+        urls = page_store.urls(prefix=str(data['prefix']), limit=limit)
+    else:
+        return jsonify({"error": "Provide either a 'urls' list or a 'prefix' in the request body"}), 400
+
+    def generate():
+        errors = 0
+        cached = 0
+        for result in run_batch(urls, find_page, concurrency=concurrency):
+            errors += 'error' in result
+            cached += bool(result.get('cached'))
+            yield json.dumps(result) + "\n"
+        yield json.dumps({"done": True, "total": len(urls), "errors": errors, "cached": cached}) + "\n"
+
+    return Response(stream_with_context(generate()), mimetype='application/x-ndjson')
+
 @app.route('/api/urls')
 def list_urls():
-    return jsonify(list(site_structure.keys()))
+    prefix = request.args.get('prefix', '')
+    after = request.args.get('after')
+    try:
+        offset = max(0, int(request.args.get('offset', 0)))
+        limit = min(MAX_URLS_PAGE_SIZE, max(1, int(request.args.get('limit', URLS_PAGE_SIZE))))
+    except ValueError:
+        return jsonify({"error": "'offset' and 'limit' must be integers"}), 400
+
+    urls = page_store.urls(prefix=prefix, after=after, offset=offset, limit=limit)
+    return jsonify({
+        "urls": urls,
+        "total": page_store.count(prefix),
+        "offset": offset,
+        "limit": limit,
+        "next_after": urls[-1] if len(urls) == limit else None
+    })
+
+# Ranked pages for a query: words, "phrases", a trailing * for prefixes and
+# field filters such as title:pricing or h1:"contact us" (see search_index.py).
+# 'fields' limits the unfiltered words to some fields, e.g. fields=title,h1.
+@app.route('/api/search')
+def search():
+    query = request.args.get('q', '')
+    fields = [f.strip() for f in request.args.get('fields', '').split(',') if f.strip()]
+    try:
+        offset = max(0, int(request.args.get('offset', 0)))
+        limit = min(MAX_SEARCH_PAGE_SIZE, max(1, int(request.args.get('limit', SEARCH_PAGE_SIZE))))
+    except ValueError:
+        return jsonify({"error": "'offset' and 'limit' must be integers"}), 400
+
+    index = search_index
+    try:
+        result = index.search(query, fields=fields or None, offset=offset, limit=limit, fetch=page_store.get)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    result.update({"query": query, "offset": offset, "limit": limit, "indexed": len(index), "complete": index.complete})
+    return jsonify(result)
+
+# Stage timing histograms of the last crawl (written by app.py to
+# crawl_metrics.json) in the Prometheus text format, read on every scrape.
+@app.route('/metrics')
+def metrics():
+    try:
+        crawl_metrics = load_metrics_file(CRAWL_METRICS_FILE)
+    except (FileNotFoundError, json.JSONDecodeError):
+        crawl_metrics = {}
+    body = prometheus_text(crawl_metrics)
+    body += f"# HELP crawler_page_store_pages Pages served by this server.\n# TYPE crawler_page_store_pages gauge\ncrawler_page_store_pages {len(page_store)}\n"
+    return Response(body, mimetype='text/plain; version=0.0.4')
 
 def attach_data(structure):
-    global site_structure
+    global page_store
     print("attach_data called. Note: Server primarily loads data from links.json on startup.")
-    site_structure = structure
+    page_store = PageStore.from_dict(structure)
+    build_search_index()
 
 if __name__ == "__main__": 
     load_crawled_data()
-    app.run(debug=True)
\ No newline at end of file
+    app.run(debug=True)
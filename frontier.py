@@ -0,0 +1,131 @@
+import heapq
+from collections import deque
+from urllib.parse import urlparse, urlsplit, urlunsplit, parse_qsl, urlencode, quote
+
+DEFAULT_PORTS = {"http": 80, "https": 443}
+
+TRACKING_PARAMS = {"gclid", "dclid", "fbclid", "msclkid", "yclid", "mc_cid", "mc_eid", "_ga", "_hsenc", "_hsmi"}
+TRACKING_PREFIXES = ("utm_",)
+
+ORDERINGS = ("bfs", "depth", "links")
+
+def is_internal(url, base):
+    return urlparse(url).netloc == urlparse(base).netloc
+
+def is_tracking_param(name):
+    name = name.lower()
+    return name in TRACKING_PARAMS or name.startswith(TRACKING_PREFIXES)
+
+def canonicalize_url(url):
+    parts = urlsplit((url or "").strip())
+    scheme = parts.scheme.lower()
+    host = (parts.hostname or "").lower()
+    if ":" in host:
+        host = f"[{host}]"
+    try:
+        port = parts.port
+    except ValueError:
+        port = None
+    netloc = host
+    if parts.username:
+        userinfo = parts.username + (f":{parts.password}" if parts.password else "")
+        netloc = f"{userinfo}@{netloc}"
+    if port and DEFAULT_PORTS.get(scheme) != port:
+        netloc = f"{netloc}:{port}"
+
+    path = parts.path.rstrip("/")
+    params = [(k, v) for (k, v) in parse_qsl(parts.query, keep_blank_values=True) if not is_tracking_param(k)]
+    query = urlencode(sorted(params), quote_via=quote)
+    return urlunsplit((scheme, netloc, path, query, ""))
+
+# `seen` holds every URL ever admitted, so a URL is queued at most once. URLs are
+# canonical forms used as keys; the URL a page was linked as, when different, is
+# kept until it is popped and is what gets fetched. Orderings: "bfs" is first in
+# first out, "depth" is shallowest first and "links" is most inbound links seen
+# while queued first, then shallowest. Only queued URLs are tracked, so memory
+# stays bounded by `max_size` however many links point outside the frontier.
+class Frontier:
+    def __init__(self, ordering="bfs", max_size=None):
+        if ordering not in ORDERINGS:
+            raise ValueError(f"Unknown frontier ordering '{ordering}'. Expected one of {ORDERINGS}.")
+        self.ordering = ordering
+        self.max_size = max_size
+        self.seen = set()
+        self._fifo = deque()
+        self._heap = []
+        self._queued = {}
+        self._fetch_urls = {}
+        self._inlinks = {}
+        self._seq = 0
+
+    def __len__(self):
+        return len(self._queued)
+
+    def __bool__(self):
+        return len(self) > 0
+
+    def __contains__(self, url):
+        return url in self.seen
+
+    def _push(self, url, depth):
+        self._seq += 1
+        if self.ordering == "depth":
+            heapq.heappush(self._heap, (depth, self._seq, url))
+        else:
+            heapq.heappush(self._heap, (-self._inlinks[url], depth, self._seq, url))
+
+    # Each new in-link pushes a fresh entry and leaves the old one to be skipped
+    # on pop; once stale entries outnumber queued URLs the heap is rebuilt.
+    def _compact(self):
+        if len(self._heap) > 2 * len(self._queued) + 64:
+            self._heap = [entry for entry in self._heap
+                          if entry[-1] in self._queued and -entry[0] == self._inlinks[entry[-1]]]
+            heapq.heapify(self._heap)
+
+    def add(self, url, depth, fetch_url=None):
+        if url in self._queued:
+            if self.ordering == "links":
+                self._inlinks[url] += 1
+                self._push(url, self._queued[url])
+                self._compact()
+            return False
+        if url in self.seen:
+            return False
+        if self.max_size is not None and len(self.seen) >= self.max_size:
+            return False
+        self.seen.add(url)
+        self._queued[url] = depth
+        if fetch_url is not None and fetch_url != url:
+            self._fetch_urls[url] = fetch_url
+        if self.ordering == "bfs":
+            self._fifo.append(url)
+        else:
+            if self.ordering == "links":
+                self._inlinks[url] = 1
+            self._push(url, depth)
+        return True
+
+    def discard(self, url):
+        self.seen.add(url)
+        if url in self._queued:
+            self._forget(url)
+
+    def _forget(self, url):
+        self._inlinks.pop(url, None)
+        return self._queued.pop(url), self._fetch_urls.pop(url, url)
+
+    # The next (url, depth, fetch_url) to crawl.
+    def pop(self):
+        while self.ordering == "bfs" and self._fifo:
+            url = self._fifo.popleft()
+            if url in self._queued:
+                return (url,) + self._forget(url)
+        while self._heap:
+            entry = heapq.heappop(self._heap)
+            url = entry[-1]
+            if url not in self._queued:
+                continue
+            if self.ordering == "links" and -entry[0] != self._inlinks[url]:
+                continue
+            return (url,) + self._forget(url)
+        raise IndexError("pop from an empty frontier")
@@ -0,0 +1,183 @@
+import json
+
+GRAPH_FILE = 'graph.json'
+
+GRAPH_FORMAT_VERSION = 1
+
+SCALAR_COLUMNS = ("title", "status_code", "depth", "word_count", "response_time", "ttfb",
+                  "in_degree", "out_degree", "is_orphan", "click_depth", "pagerank",
+                  "betweenness", "scc_id")
+
+# List fields are reduced to their length; the graph view only needs the counts
+# to flag pages with issues.
+COUNT_COLUMNS = ("unlabeled_inputs", "images_without_alt", "mixed_content", "heading_issues")
+
+SEMANTIC_TAGS = ["main", "nav", "article", "section", "header", "footer", "aside"]
+
+LANDMARK_TAGS = ["main", "nav", "header", "footer", "aside", "section", "article"]
+
+def _count(value):
+    return len(value) if isinstance(value, list) else 0
+
+def _number(value):
+    return value if isinstance(value, (int, float)) and not isinstance(value, bool) else 0
+
+# Mirrors calculateScorecard in main.js so the page can show site totals without
+# downloading every page record.
+class ScorecardBuilder:
+    def __init__(self):
+        self.total_pages = 0
+        self.sums = dict.fromkeys(("word_count", "readability_score", "sentiment", "image_count", "script_count",
+                                   "stylesheet_count", "heading_count", "paragraph_count", "response_time", "ttfb"), 0)
+        self.counts = dict.fromkeys(("internal_links", "external_links", "viewport_meta_count", "heading_issues",
+                                     "unlabeled_inputs", "images_without_alt", "pages_with_csp", "pages_with_hsts",
+                                     "pages_with_canonical", "jsonld_total_blocks", "hreflang_pairs_total",
+                                     "pages_with_mixed_content", "mixed_content_resources_total",
+                                     "redirect_hops_total", "generic_link_texts_total", "lazy_images_total",
+                                     "orphans_count"), 0)
+        self.keyword_density = {}
+        self.status_codes = {}
+        self.semantic_elements = dict.fromkeys(SEMANTIC_TAGS, 0)
+        self.landmarks = dict.fromkeys(LANDMARK_TAGS, 0)
+        self.aria_roles = {}
+        self.cookies = set()
+        self.preloads = {"preload": 0, "prefetch": 0, "preconnect": 0}
+        self.depth_total = 0
+        self.max_depth = 0
+
+    def add(self, page):
+        self.total_pages += 1
+        if not isinstance(page, dict):
+            return
+        for key in self.sums:
+            self.sums[key] += _number(page.get(key))
+        c = self.counts
+        c["internal_links"] += _count(page.get("internal_links"))
+        c["external_links"] += _count(page.get("external_links"))
+        for keyword, density in (page.get("keyword_density") or {}).items():
+            self.keyword_density[keyword] = self.keyword_density.get(keyword, 0) + density
+        if page.get("status_code"):
+            code = str(page["status_code"])
+            self.status_codes[code] = self.status_codes.get(code, 0) + 1
+        c["viewport_meta_count"] += 1 if page.get("has_viewport_meta") else 0
+        for tag, present in (page.get("semantic_elements") or {}).items():
+            if present:
+                self.semantic_elements[tag] = self.semantic_elements.get(tag, 0) + 1
+        c["heading_issues"] += _count(page.get("heading_issues"))
+        c["unlabeled_inputs"] += _count(page.get("unlabeled_inputs"))
+        c["images_without_alt"] += _count(page.get("images_without_alt"))
+
+        security = page.get("security") or {}
+        c["pages_with_csp"] += 1 if security.get("content_security_policy") else 0
+        c["pages_with_hsts"] += 1 if security.get("strict_transport_security") else 0
+
+        structured = page.get("structured") or {}
+        c["pages_with_canonical"] += 1 if structured.get("canonical") else 0
+        c["jsonld_total_blocks"] += _count(structured.get("jsonld"))
+        c["hreflang_pairs_total"] += _count(structured.get("hreflang"))
+
+        mixed = page.get("mixed_content")
+        if isinstance(mixed, list) and mixed:
+            c["pages_with_mixed_content"] += 1
+            c["mixed_content_resources_total"] += len(mixed)
+
+        delivery = page.get("http_delivery") or {}
+        if isinstance(delivery.get("set_cookies"), list):
+            self.cookies.update(delivery["set_cookies"])
+        if isinstance(delivery.get("redirect_chain"), list):
+            c["redirect_hops_total"] += max(0, len(delivery["redirect_chain"]) - 1)
+
+        a11y = page.get("a11y_extras") or {}
+        c["generic_link_texts_total"] += _count(a11y.get("generic_link_texts"))
+        for role, count in (a11y.get("aria_roles") or {}).items():
+            self.aria_roles[role] = self.aria_roles.get(role, 0) + count
+        for tag, count in (a11y.get("landmarks_count") or {}).items():
+            if tag in self.landmarks:
+                self.landmarks[tag] += count or 0
+
+        c["lazy_images_total"] += (page.get("media_hints") or {}).get("lazy_images_count") or 0
+        for entry in page.get("link_rel") or []:
+            rel = (entry.get("rel") or "").lower()
+            for kind in self.preloads:
+                if kind in rel:
+                    self.preloads[kind] += 1
+
+        c["orphans_count"] += 1 if page.get("is_orphan") else 0
+        depth = page.get("depth")
+        if isinstance(depth, (int, float)) and not isinstance(depth, bool):
+            self.depth_total += depth
+            self.max_depth = max(self.max_depth, depth)
+
+    def result(self):
+        total = self.total_pages or 1
+        out = {"totalPages": self.total_pages}
+        out.update(self.sums)
+        out.update(self.counts)
+        out.update({
+            "keyword_density": self.keyword_density,
+            "status_codes": self.status_codes,
+            "semantic_elements": self.semantic_elements,
+            "cookies_unique_names": sorted(self.cookies),
+            "aria_roles": self.aria_roles,
+            "landmarks_total": self.landmarks,
+            "preloads": self.preloads,
+            "avg_depth": self.depth_total / total,
+            "max_depth": self.max_depth,
+            "average_word_count": self.sums["word_count"] / total,
+            "average_readability_score": self.sums["readability_score"] / total,
+            "average_sentiment": self.sums["sentiment"] / total,
+            "average_response_time": self.sums["response_time"] / total,
+            "average_ttfb": self.sums["ttfb"] / total
+        })
+        return out
+
+# Writes the compact graph artifact main.js loads instead of links.json: an
+# interned URL table, edges as two parallel arrays of URL ids, one summary column
+# per field (null for linked pages that were not crawled) and the site scorecard.
+# Full records stay in links.json and are served per URL by /api/page.
+# `pages` is any iterable of (url, record) pairs, so a streamed links.json works.
+def write_graph_file(pages, filename=GRAPH_FILE):
+    ids = {}
+    urls = []
+
+    def intern(url):
+        i = ids.get(url)
+        if i is None:
+            i = ids[url] = len(urls)
+            urls.append(url)
+        return i
+
+    rows = {}
+    sources, targets = [], []
+    scorecard = ScorecardBuilder()
+    for url, data in pages:
+        i = intern(url)
+        scorecard.add(data)
+        if not isinstance(data, dict):
+            continue
+        row = {key: data.get(key) for key in SCALAR_COLUMNS}
+        row.update({key: _count(data.get(key)) for key in COUNT_COLUMNS})
+        row["has_csp"] = bool((data.get("security") or {}).get("content_security_policy"))
+        row["has_main"] = bool((data.get("semantic_elements") or {}).get("main"))
+        for target in data.get("internal_links") or []:
+            sources.append(i)
+            targets.append(intern(target))
+        parent = data.get("click_parent")
+        row["click_parent"] = intern(parent) if parent else None
+        layout = data.get("layout")
+        row["layout"] = [layout["x"], layout["y"]] if layout else None
+        rows[i] = row
+
+    names = list(SCALAR_COLUMNS) + list(COUNT_COLUMNS) + ["has_csp", "has_main", "click_parent", "layout"]
+    columns = {name: [rows[i][name] if i in rows else None for i in range(len(urls))] for name in names}
+    graph = {
+        "version": GRAPH_FORMAT_VERSION,
+        "urls": urls,
+        "edges": {"source": sources, "target": targets},
+        "nodes": columns,
+        "scorecard": scorecard.result()
+    }
+    with open(filename, 'w', encoding='utf-8') as f:
+        json.dump(graph, f, ensure_ascii=False, separators=(',', ':'))
+    print(f"Graph for {len(urls)} URLs and {len(sources)} links saved to {filename}")
+    return graph
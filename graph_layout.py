@@ -0,0 +1,194 @@
+import numpy as np
+
+from graph_metrics import build_link_graph
+
+LAYOUT_ITERATIONS = 200
+
+LAYOUT_REFINE_ITERATIONS = 30
+
+LAYOUT_REFINE_TEMPERATURE = 0.2
+
+LAYOUT_SEED = 0
+
+# Coarsening stops once a level has at most this many nodes or when matching
+# no longer shrinks the graph by at least 1 - LAYOUT_MIN_SHRINK.
+LAYOUT_COARSEST_SIZE = 50
+
+LAYOUT_MIN_SHRINK = 0.9
+
+LAYOUT_MATCHING_ROUNDS = 3
+
+LAYOUT_JITTER = 0.1
+
+# Up to this many pages every pair of nodes repels exactly; larger graphs use
+# the Barnes-Hut approximation below.
+LAYOUT_EXACT_LIMIT = 1000
+
+LAYOUT_LEAF_SIZE = 4
+
+LAYOUT_MAX_LEVEL = 9
+
+LAYOUT_CHUNK_SIZE = 512
+
+LAYOUT_GRAVITY = 0.05
+
+def _exact_repulsion(pos):
+    x, y = pos[:, 0], pos[:, 1]
+    disp = np.zeros_like(pos)
+    for start in range(0, len(pos), LAYOUT_CHUNK_SIZE):
+        dx = x[start:start + LAYOUT_CHUNK_SIZE, None] - x[None, :]
+        dy = y[start:start + LAYOUT_CHUNK_SIZE, None] - y[None, :]
+        weight = 1.0 / np.maximum(dx * dx + dy * dy, 1e-6)
+        disp[start:start + LAYOUT_CHUNK_SIZE, 0] = (dx * weight).sum(axis=1)
+        disp[start:start + LAYOUT_CHUNK_SIZE, 1] = (dy * weight).sum(axis=1)
+    return disp
+
+# Multilevel Barnes-Hut on a quadtree of uniform grids. At every level a node
+# feels each cell that is a child of its parent cell's neighbours but not a
+# neighbour of its own cell as one mass at that cell's centroid; on the finest
+# level the surrounding 3x3 cells repel it node by node. Each level costs at
+# most 27 cell interactions per node, so an iteration is O(n log n).
+def _multilevel_repulsion(pos):
+    n = len(pos)
+    x, y = pos[:, 0], pos[:, 1]
+    levels = min(LAYOUT_MAX_LEVEL, max(2, int(np.ceil(np.log(n / LAYOUT_LEAF_SIZE) / np.log(4)))))
+    lo = pos.min(axis=0)
+    unit = (pos - lo) / (max(float(np.ptp(pos, axis=0).max()), 1e-6) * (1 + 1e-9))
+    fx, fy = np.zeros(n), np.zeros(n)
+
+    for level in range(2, levels + 1):
+        side = 1 << level
+        cx = np.minimum((unit[:, 0] * side).astype(np.int64), side - 1)
+        cy = np.minimum((unit[:, 1] * side).astype(np.int64), side - 1)
+        cell = cx * side + cy
+        mass = np.bincount(cell, minlength=side * side).astype(float)
+        filled = np.maximum(mass, 1.0)
+        mx = np.bincount(cell, weights=x, minlength=side * side) / filled
+        my = np.bincount(cell, weights=y, minlength=side * side) / filled
+        px, py = cx - (cx & 1), cy - (cy & 1)
+        for ox in range(-2, 4):
+            tx = px + ox
+            for oy in range(-2, 4):
+                ty = py + oy
+                idx = np.flatnonzero((tx >= 0) & (tx < side) & (ty >= 0) & (ty < side) &
+                                     ((np.abs(tx - cx) > 1) | (np.abs(ty - cy) > 1)))
+                target = tx[idx] * side + ty[idx]
+                dx = x[idx] - mx[target]
+                dy = y[idx] - my[target]
+                weight = mass[target] / np.maximum(dx * dx + dy * dy, 1e-6)
+                fx[idx] += dx * weight
+                fy[idx] += dy * weight
+
+    counts = mass.astype(np.int64)
+    order = np.argsort(cell, kind='stable')
+    starts = np.cumsum(counts) - counts
+    for ox in (-1, 0, 1):
+        for oy in (-1, 0, 1):
+            tx, ty = cx + ox, cy + oy
+            valid = np.flatnonzero((tx >= 0) & (tx < side) & (ty >= 0) & (ty < side))
+            target = tx[valid] * side + ty[valid]
+            per_node = counts[target]
+            total = int(per_node.sum())
+            if total == 0:
+                continue
+            src = np.repeat(valid, per_node)
+            offsets = np.repeat(starts[target] - np.cumsum(per_node) + per_node, per_node) + np.arange(total)
+            dst = order[offsets]
+            keep = src != dst
+            src, dst = src[keep], dst[keep]
+            dx = x[src] - x[dst]
+            dy = y[src] - y[dst]
+            weight = 1.0 / np.maximum(dx * dx + dy * dy, 1e-6)
+            fx += np.bincount(src, weights=dx * weight, minlength=n)
+            fy += np.bincount(src, weights=dy * weight, minlength=n)
+    return np.stack([fx, fy], axis=1)
+
+def _edge_pairs(graph):
+    if not len(graph.src):
+        return np.zeros((0, 2), dtype=np.int64)
+    return np.unique(np.sort(np.stack([graph.src, graph.dst], axis=1), axis=1), axis=0)
+
+# Fruchterman-Reingold: nodes repel with k^2 / d, linked nodes attract with
+# d^2 / k (k = 1) and a weak pull towards the centre keeps disconnected pages
+# on screen. Moves are capped by a temperature that cools linearly to zero.
+def _refine(pos, pairs, iterations, temperature):
+    n = len(pos)
+    u, v = pairs[:, 0], pairs[:, 1]
+    repulsion = _exact_repulsion if n <= LAYOUT_EXACT_LIMIT else _multilevel_repulsion
+    cooling = temperature / (iterations + 1)
+    for _ in range(iterations):
+        disp = repulsion(pos)
+        if len(u):
+            delta = pos[v] - pos[u]
+            pull = delta * np.sqrt((delta ** 2).sum(axis=1))[:, None]
+            disp[:, 0] += np.bincount(u, weights=pull[:, 0], minlength=n) - np.bincount(v, weights=pull[:, 0], minlength=n)
+            disp[:, 1] += np.bincount(u, weights=pull[:, 1], minlength=n) - np.bincount(v, weights=pull[:, 1], minlength=n)
+        disp -= LAYOUT_GRAVITY * np.sqrt(n) * (pos - pos.mean(axis=0))
+        length = np.maximum(np.sqrt((disp ** 2).sum(axis=1)), 1e-9)
+        pos += disp / length[:, None] * np.minimum(length, temperature)[:, None]
+        temperature -= cooling
+    return pos
+
+# One coarsening step: a few rounds of randomized matching, where an edge is
+# kept when its random key is the smallest among the unmatched edges at both of
+# its ends. Matched pairs collapse into one coarse node. Returns the coarse node
+# of every node, the coarse node count and the coarse edge pairs.
+def _coarsen(n, pairs, rng):
+    match = np.full(n, -1, dtype=np.int64)
+    for _ in range(LAYOUT_MATCHING_ROUNDS):
+        free = pairs[(match[pairs[:, 0]] == -1) & (match[pairs[:, 1]] == -1)]
+        if not len(free):
+            break
+        key = rng.random(len(free))
+        best = np.full(n, np.inf)
+        np.minimum.at(best, free[:, 0], key)
+        np.minimum.at(best, free[:, 1], key)
+        chosen = free[(best[free[:, 0]] == key) & (best[free[:, 1]] == key)]
+        match[chosen[:, 0]] = chosen[:, 1]
+        match[chosen[:, 1]] = chosen[:, 0]
+    leader = np.where(match == -1, np.arange(n), np.minimum(np.arange(n), match))
+    leaders, coarse = np.unique(leader, return_inverse=True)
+    coarse_pairs = np.sort(coarse[pairs], axis=1)
+    coarse_pairs = np.unique(coarse_pairs[coarse_pairs[:, 0] != coarse_pairs[:, 1]], axis=0)
+    return coarse, len(leaders), coarse_pairs
+
+# Multilevel force-directed layout: the link graph is coarsened by repeated
+# matching, the smallest graph is laid out from a seeded random start and each
+# finer level starts from its coarse positions (spread out to make room for the
+# extra nodes) and only needs a short, cool refinement. The result is centered
+# on the origin and scaled so the median link has length 1.
+def force_directed_layout(graph, iterations=LAYOUT_ITERATIONS, seed=LAYOUT_SEED):
+    n = graph.n
+    if n == 0:
+        return np.zeros((0, 2))
+    rng = np.random.default_rng(seed)
+    pairs = _edge_pairs(graph)
+
+    hierarchy = [(n, pairs)]
+    mappings = []
+    while hierarchy[-1][0] > LAYOUT_COARSEST_SIZE:
+        size, level_pairs = hierarchy[-1]
+        coarse, coarse_size, coarse_pairs = _coarsen(size, level_pairs, rng)
+        if coarse_size > size * LAYOUT_MIN_SHRINK:
+            break
+        mappings.append(coarse)
+        hierarchy.append((coarse_size, coarse_pairs))
+
+    size, level_pairs = hierarchy[-1]
+    pos = (rng.random((size, 2)) - 0.5) * np.sqrt(size)
+    pos = _refine(pos, level_pairs, iterations, np.sqrt(size) / 10.0)
+    for (size, level_pairs), coarse in zip(reversed(hierarchy[:-1]), reversed(mappings)):
+        spread = np.sqrt(size / len(pos))
+        pos = pos[coarse] * spread + (rng.random((size, 2)) - 0.5) * LAYOUT_JITTER
+        pos = _refine(pos, level_pairs, LAYOUT_REFINE_ITERATIONS, np.sqrt(size) / 10.0 * LAYOUT_REFINE_TEMPERATURE)
+
+    pos -= pos.mean(axis=0)
+    if len(pairs):
+        u, v = pairs[:, 0], pairs[:, 1]
+        pos /= max(float(np.median(np.sqrt(((pos[v] - pos[u]) ** 2).sum(axis=1)))), 1e-6)
+    return pos
+
+def compute_graph_layout(urls, out_edges, iterations=LAYOUT_ITERATIONS):
+    graph = build_link_graph(urls, out_edges)
+    pos = force_directed_layout(graph, iterations)
+    return {url: {"x": round(float(pos[i, 0]), 3), "y": round(float(pos[i, 1]), 3)} for i, url in enumerate(graph.urls)}
@@ -0,0 +1,199 @@
+import numpy as np
+
+PAGERANK_DAMPING = 0.85
+
+PAGERANK_TOLERANCE = 1e-10
+
+PAGERANK_MAX_ITERATIONS = 100
+
+BETWEENNESS_SAMPLES = 64
+
+BETWEENNESS_SEED = 0
+
+# Directed link graph over the crawled pages in compressed sparse row form:
+# the targets of node i are indices[indptr[i]:indptr[i + 1]].
+class LinkGraph:
+    def __init__(self, urls, src, dst):
+        self.urls = list(urls)
+        self.n = len(self.urls)
+        order = np.lexsort((dst, src))
+        self.src = src[order]
+        self.dst = dst[order]
+        self.indptr = np.zeros(self.n + 1, dtype=np.int64)
+        np.cumsum(np.bincount(self.src, minlength=self.n), out=self.indptr[1:])
+        self.indices = self.dst
+
+    def out_degree(self):
+        return np.diff(self.indptr)
+
+    def neighbors_of(self, frontier):
+        starts = self.indptr[frontier]
+        counts = self.indptr[frontier + 1] - starts
+        total = int(counts.sum())
+        if total == 0:
+            empty = np.zeros(0, dtype=np.int64)
+            return empty, empty
+        offsets = np.repeat(starts - np.cumsum(counts) + counts, counts) + np.arange(total)
+        return np.repeat(frontier, counts), self.indices[offsets]
+
+def build_link_graph(urls, out_edges):
+    urls = list(urls)
+    index = {u: i for i, u in enumerate(urls)}
+    src, dst = [], []
+    for u, targets in out_edges.items():
+        i = index.get(u)
+        if i is None:
+            continue
+        for t in targets:
+            j = index.get(t)
+            if j is not None and j != i:
+                src.append(i)
+                dst.append(j)
+    return LinkGraph(urls, np.array(src, dtype=np.int64), np.array(dst, dtype=np.int64))
+
+def pagerank(graph, damping=PAGERANK_DAMPING, tol=PAGERANK_TOLERANCE, max_iter=PAGERANK_MAX_ITERATIONS):
+    n = graph.n
+    if n == 0:
+        return np.zeros(0)
+    out_deg = graph.out_degree().astype(float)
+    dangling = out_deg == 0
+    edge_weight = 1.0 / out_deg[graph.src] if len(graph.src) else np.zeros(0)
+    rank = np.full(n, 1.0 / n)
+    for _ in range(max_iter):
+        spread = np.bincount(graph.dst, weights=rank[graph.src] * edge_weight, minlength=n)
+        new_rank = (1.0 - damping) / n + damping * (spread + rank[dangling].sum() / n)
+        delta = np.abs(new_rank - rank).sum()
+        rank = new_rank
+        if delta < tol:
+            break
+    return rank / rank.sum()
+
+# Level-synchronous BFS along link direction. Returns the click depth of every
+# node (-1 when unreachable) and the parent it was first reached from.
+def click_depths(graph, root):
+    depth = np.full(graph.n, -1, dtype=np.int64)
+    parent = np.full(graph.n, -1, dtype=np.int64)
+    if root is None or graph.n == 0:
+        return depth, parent
+    depth[root] = 0
+    frontier = np.array([root], dtype=np.int64)
+    level = 0
+    while len(frontier):
+        srcs, dsts = graph.neighbors_of(frontier)
+        fresh = depth[dsts] == -1
+        dsts, srcs = dsts[fresh], srcs[fresh]
+        dsts, first = np.unique(dsts, return_index=True)
+        level += 1
+        depth[dsts] = level
+        parent[dsts] = srcs[first]
+        frontier = dsts
+    return depth, parent
+
+# Iterative Tarjan; component ids are numbered largest component first.
+def strongly_connected_components(graph):
+    n = graph.n
+    indptr, indices = graph.indptr, graph.indices
+    index = [-1] * n
+    low = [0] * n
+    on_stack = [False] * n
+    stack = []
+    comp = [-1] * n
+    components = []
+    counter = 0
+    for start in range(n):
+        if index[start] != -1:
+            continue
+        work = [(start, int(indptr[start]))]
+        index[start] = low[start] = counter
+        counter += 1
+        stack.append(start)
+        on_stack[start] = True
+        while work:
+            v, pos = work[-1]
+            end = int(indptr[v + 1])
+            if pos < end:
+                work[-1] = (v, pos + 1)
+                w = int(indices[pos])
+                if index[w] == -1:
+                    index[w] = low[w] = counter
+                    counter += 1
+                    stack.append(w)
+                    on_stack[w] = True
+                    work.append((w, int(indptr[w])))
+                elif on_stack[w]:
+                    low[v] = min(low[v], index[w])
+                continue
+            work.pop()
+            if work:
+                u = work[-1][0]
+                low[u] = min(low[u], low[v])
+            if low[v] == index[v]:
+                members = []
+                while True:
+                    w = stack.pop()
+                    on_stack[w] = False
+                    members.append(w)
+                    if w == v:
+                        break
+                components.append(members)
+    components.sort(key=lambda members: (-len(members), min(members)))
+    for cid, members in enumerate(components):
+        for v in members:
+            comp[v] = cid
+    return np.array(comp, dtype=np.int64), np.array([len(m) for m in components], dtype=np.int64)
+
+# Brandes' algorithm from a random sample of source pages, each BFS and its
+# dependency accumulation vectorized one level at a time. Scaled to estimate
+# betweenness over all sources and normalized to [0, 1].
+def approximate_betweenness(graph, samples=BETWEENNESS_SAMPLES, seed=BETWEENNESS_SEED):
+    n = graph.n
+    centrality = np.zeros(n)
+    if n < 3:
+        return centrality
+    rng = np.random.default_rng(seed)
+    sources = np.arange(n) if samples >= n else rng.choice(n, size=samples, replace=False)
+    for s in sources:
+        dist = np.full(n, -1, dtype=np.int64)
+        sigma = np.zeros(n)
+        dist[s] = 0
+        sigma[s] = 1.0
+        frontier = np.array([s], dtype=np.int64)
+        levels = []
+        level = 0
+        while len(frontier):
+            srcs, dsts = graph.neighbors_of(frontier)
+            unseen = dist[dsts] == -1
+            dist[np.unique(dsts[unseen])] = level + 1
+            tree = dist[dsts] == level + 1
+            srcs, dsts = srcs[tree], dsts[tree]
+            np.add.at(sigma, dsts, sigma[srcs])
+            levels.append((srcs, dsts))
+            frontier = np.unique(dsts)
+            level += 1
+        delta = np.zeros(n)
+        for srcs, dsts in reversed(levels):
+            np.add.at(delta, srcs, sigma[srcs] / sigma[dsts] * (1.0 + delta[dsts]))
+        delta[s] = 0.0
+        centrality += delta
+    centrality *= n / len(sources)
+    return centrality / ((n - 1) * (n - 2))
+
+def compute_graph_metrics(urls, out_edges, root_url, betweenness_samples=BETWEENNESS_SAMPLES):
+    graph = build_link_graph(urls, out_edges)
+    root = graph.urls.index(root_url) if root_url in graph.urls else None
+    ranks = pagerank(graph)
+    depth, parent = click_depths(graph, root)
+    comp, sizes = strongly_connected_components(graph)
+    betweenness = approximate_betweenness(graph, betweenness_samples)
+
+    metrics = {}
+    for i, url in enumerate(graph.urls):
+        metrics[url] = {
+            "pagerank": round(float(ranks[i]), 8),
+            "click_depth": int(depth[i]) if depth[i] >= 0 else None,
+            "click_parent": graph.urls[parent[i]] if parent[i] >= 0 else None,
+            "scc_id": int(comp[i]),
+            "scc_size": int(sizes[comp[i]]),
+            "betweenness": round(float(betweenness[i]), 8)
+        }
+    return metrics
@@ -0,0 +1,165 @@
+import json
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from contextlib import nullcontext
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.exceptions import NameResolutionError
+
+LINK_HEALTH_CACHE_FILE = 'link_health.sqlite'
+
+LINK_HEALTH_TTL_SECONDS = 24 * 3600
+
+# Failures that may be transient (timeouts, 5xx, 429) are rechecked sooner.
+LINK_HEALTH_RETRY_TTL_SECONDS = 3600
+
+LINK_CHECK_CONCURRENCY = 16
+
+LINK_CHECK_PER_HOST = 2
+
+LINK_CHECK_TIMEOUT = 10
+
+LINK_HEALTH_FLUSH_EVERY = 200
+
+LINK_CHECK_USER_AGENT = 'MyCrawler/1.0'
+
+def is_checkable(url):
+    return url.lower().startswith(("http://", "https://"))
+
+def _transient(result):
+    status = result.get("status_code")
+    return status is None or status == 429 or status >= 500
+
+# Results of earlier checks keyed by URL, reused until they are older than the TTL.
+class LinkHealthCache:
+    def __init__(self, db_file=LINK_HEALTH_CACHE_FILE, ttl=LINK_HEALTH_TTL_SECONDS, retry_ttl=LINK_HEALTH_RETRY_TTL_SECONDS):
+        self.ttl = ttl
+        self.retry_ttl = retry_ttl
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_file, check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS link_health ("
+            "url TEXT PRIMARY KEY, result TEXT NOT NULL, checked_at REAL NOT NULL) WITHOUT ROWID"
+        )
+        self._conn.commit()
+
+    def get_many(self, urls, batch_size=500):
+        now = time.time()
+        urls = list(urls)
+        found = {}
+        with self._lock:
+            for i in range(0, len(urls), batch_size):
+                batch = urls[i:i + batch_size]
+                rows = self._conn.execute(
+                    f"SELECT url, result, checked_at FROM link_health WHERE url IN ({','.join('?' * len(batch))})", batch
+                ).fetchall()
+                for url, encoded, checked_at in rows:
+                    result = json.loads(encoded)
+                    if now - checked_at <= (self.retry_ttl if _transient(result) else self.ttl):
+                        found[url] = result
+        return found
+
+    def put_many(self, results):
+        now = time.time()
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO link_health (url, result, checked_at) VALUES (?, ?, ?)",
+                ((url, json.dumps(result, ensure_ascii=False), now) for url, result in results.items())
+            )
+            self._conn.execute("DELETE FROM link_health WHERE checked_at < ?", (now - self.ttl,))
+            self._conn.commit()
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+def _result(response, error=None):
+    if response is None:
+        return {"status_code": None, "ok": False, "error": error}
+    result = {"status_code": response.status_code, "ok": response.status_code < 400}
+    if response.history:
+        result["redirect_count"] = len(response.history)
+        result["redirect_statuses"] = [r.status_code for r in response.history]
+        result["final_url"] = response.url
+    return result
+
+def _unresolvable(error):
+    reason = getattr(error.args[0] if error.args else None, "reason", None)
+    return isinstance(reason, NameResolutionError)
+
+# HEAD first; servers that reject or mishandle HEAD (an error status, a dropped
+# connection or a malformed response) get a streamed GET whose body is never
+# read. Hosts that time out or do not resolve are not tried twice.
+def check_url(session, url, timeout=LINK_CHECK_TIMEOUT):
+    try:
+        response = session.head(url, allow_redirects=True, timeout=timeout)
+        response.close()
+        if response.status_code < 400:
+            return _result(response)
+    except requests.Timeout:
+        return _result(None, "Request timed out")
+    except requests.ConnectionError as e:
+        if _unresolvable(e):
+            return _result(None, str(e))
+    except requests.RequestException:
+        pass
+    try:
+        response = session.get(url, allow_redirects=True, timeout=timeout, stream=True)
+        response.close()
+        return _result(response)
+    except requests.Timeout:
+        return _result(None, "Request timed out")
+    except requests.RequestException as e:
+        return _result(None, str(e))
+
+# A session for the link check only. Each check is one request (two with the
+# GET fallback) with no status or connection retries: a failure is a result, and
+# transient ones are rechecked after LINK_HEALTH_RETRY_TTL_SECONDS instead. The
+# pools hold a connection for every request that can be in flight.
+def build_check_session(concurrency=LINK_CHECK_CONCURRENCY):
+    session = requests.Session()
+    adapter = HTTPAdapter(max_retries=0, pool_connections=max(1, concurrency), pool_maxsize=max(1, concurrency))
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    session.headers.update({'User-Agent': LINK_CHECK_USER_AGENT})
+    return session
+
+# Checks each distinct URL once: fresh cached results are reused, the rest run
+# over the session's pooled connections with at most `concurrency` requests in
+# flight (and host_limiter's share per host). Returns {url: result}.
+def check_urls(urls, session, concurrency=LINK_CHECK_CONCURRENCY, host_limiter=None, cache=None, timeout=LINK_CHECK_TIMEOUT):
+    urls = list(dict.fromkeys(u for u in urls if is_checkable(u)))
+    results = cache.get_many(urls) if cache is not None else {}
+    cached = len(results)
+    pending = [u for u in urls if u not in results]
+    print(f"Checking {len(pending)} external URLs ({cached} cached)...")
+
+    def check(url):
+        with (host_limiter.slot(url) if host_limiter is not None else nullcontext()):
+            return check_url(session, url, timeout)
+
+    fresh, unsaved = {}, {}
+    with ThreadPoolExecutor(max_workers=max(1, concurrency)) as pool:
+        futures = {pool.submit(check, url): url for url in pending}
+        for future in as_completed(futures):
+            url = futures[future]
+            fresh[url] = unsaved[url] = future.result()
+            if cache is not None and len(unsaved) >= LINK_HEALTH_FLUSH_EVERY:
+                cache.put_many(unsaved)
+                unsaved = {}
+    if cache is not None and unsaved:
+        cache.put_many(unsaved)
+    results.update(fresh)
+    broken = sum(1 for r in results.values() if not r["ok"])
+    print(f"Checked {len(results)} external URLs: {broken} broken")
+    return {url: results[url] for url in urls}
+
+def link_health_summary(results):
+    return {
+        "checked": len(results),
+        "broken": sum(1 for r in results.values() if not r["ok"]),
+        "redirected": sum(1 for r in results.values() if r.get("redirect_count")),
+    }
@@ -17,98 +17,183 @@ function statusBucket(code) {
 const isGreen = (d) => statusBucket(d.status_code) === "2xx";
 const GREEN_FADE_OPACITY = 0.25;
 
+// Pixels per unit of the precomputed layout (one unit is a typical link).
+const LAYOUT_SPACING = 120;
+
+const API_BASE = "http://localhost:5000";
+
+const SEARCH_LIMIT = 10000;
+
 let currentlySelectedNode = null;
 
-d3.json("links.json")
-  .then(function (site_structure) {
-    if (!site_structure || Object.keys(site_structure).length === 0) {
-      console.warn("links.json is empty or invalid. Cannot render graph.");
-      d3.select("body").append("p").text("No crawl data available to display.");
-      return;
+function getNodeData(url, record) {
+  const d = record || {};
+  return {
+    id: url,
+
+    title: d.title || "",
+    meta_description: d.meta_description || "",
+    meta_keywords: d.meta_keywords || "",
+    h1_tags: d.h1_tags || [],
+    word_count: d.word_count || 0,
+    status_code: d.status_code || "",
+    response_time: d.response_time || 0,
+    readability_score: d.readability_score || 0,
+    sentiment: d.sentiment || 0,
+    keyword_density: d.keyword_density || {},
+    image_count: d.image_count || 0,
+    script_count: d.script_count || 0,
+    stylesheet_count: d.stylesheet_count || 0,
+    has_viewport_meta: !!d.has_viewport_meta,
+    heading_count: d.heading_count || 0,
+    paragraph_count: d.paragraph_count || 0,
+    internal_links: d.internal_links || [],
+    external_links: d.external_links || [],
+    semantic_elements: d.semantic_elements || {},
+    heading_issues: d.heading_issues || [],
+    unlabeled_inputs: d.unlabeled_inputs || [],
+    images_without_alt: d.images_without_alt || [],
+
+    text_content: d.text_content || "",
+    search_text: d.search_text || (d.text_content || "").toLowerCase(),
+
+    depth: d.depth ?? null,
+    ttfb: d.ttfb || 0,
+    in_degree: d.in_degree || 0,
+    out_degree: d.out_degree || 0,
+    is_orphan: !!d.is_orphan,
+    click_depth: d.click_depth ?? null,
+    click_parent: d.click_parent || null,
+    pagerank: d.pagerank ?? null,
+    betweenness: d.betweenness ?? null,
+    scc_id: d.scc_id ?? null,
+    layout: d.layout || null,
+    in_sitemap: d.in_sitemap ?? null,
+    sitemap_orphan: !!d.sitemap_orphan,
+
+    http_delivery: d.http_delivery || {},
+    security: d.security || {},
+    mixed_content: d.mixed_content || [],
+
+    structured: d.structured || {},
+    a11y_extras: d.a11y_extras || {},
+
+    text_hash: d.text_hash || "",
+    read_time_minutes: d.read_time_minutes || 0,
+    lang_attribute: d.lang_attribute || "",
+    detected_language: d.detected_language || "",
+    language_match: d.language_match,
+
+    link_rel: d.link_rel || [],
+    media_hints: d.media_hints || {},
+
+    site_wide: d.site_wide || null,
+  };
+}
+
+// graph.json holds the URL table, edges as parallel arrays of URL ids, one
+// summary column per field and the site scorecard; full page records are
+// fetched from the Flask server when a node is inspected.
+function graphFromArtifact(graph) {
+  if (!graph || !Array.isArray(graph.urls) || graph.urls.length === 0) return null;
+  const columns = graph.nodes || {};
+  const nodes = graph.urls.map((url, i) => {
+    const record = {};
+    Object.keys(columns).forEach((name) => (record[name] = columns[name][i]));
+    const parent = record.click_parent;
+    const layout = record.layout;
+    record.click_parent = parent == null ? null : graph.urls[parent];
+    record.layout = layout ? { x: layout[0], y: layout[1] } : null;
+    record.security = { content_security_policy: !!record.has_csp };
+    record.semantic_elements = { main: !!record.has_main };
+    return getNodeData(url, record);
+  });
+  const targets = graph.edges.target;
+  const links = graph.edges.source.map((s, k) => ({
+    source: graph.urls[s],
+    target: graph.urls[targets[k]],
+  }));
+  return { nodes, links, scorecard: graph.scorecard, detailsOnDemand: true };
+}
+
+// Crawls written before graph.json existed: everything comes from links.json.
+function graphFromLinks(site_structure) {
+  if (!site_structure || Object.keys(site_structure).length === 0) return null;
+
+  const nodes = [];
+  const links = [];
+  const nodeIds = new Set();
+
+  Object.keys(site_structure).forEach((sourceUrl) => {
+    const sourceData = site_structure[sourceUrl];
+
+    if (!nodeIds.has(sourceUrl)) {
+      nodeIds.add(sourceUrl);
+      nodes.push(getNodeData(sourceUrl, site_structure[sourceUrl]));
     }
 
-    const nodes = [];
-    const links = [];
-
-    function getNodeData(url) {
-      const d = site_structure[url] || {};
-      return {
-        id: url,
-
-        title: d.title || "",
-        meta_description: d.meta_description || "",
-        meta_keywords: d.meta_keywords || "",
-        h1_tags: d.h1_tags || [],
-        word_count: d.word_count || 0,
-        status_code: d.status_code || "",
-        response_time: d.response_time || 0,
-        readability_score: d.readability_score || 0,
-        sentiment: d.sentiment || 0,
-        keyword_density: d.keyword_density || {},
-        image_count: d.image_count || 0,
-        script_count: d.script_count || 0,
-        stylesheet_count: d.stylesheet_count || 0,
-        has_viewport_meta: !!d.has_viewport_meta,
-        heading_count: d.heading_count || 0,
-        paragraph_count: d.paragraph_count || 0,
-        internal_links: d.internal_links || [],
-        external_links: d.external_links || [],
-        semantic_elements: d.semantic_elements || {},
-        heading_issues: d.heading_issues || [],
-        unlabeled_inputs: d.unlabeled_inputs || [],
-        images_without_alt: d.images_without_alt || [],
-
-        text_content: d.text_content || "",
-        search_text: d.search_text || (d.text_content || "").toLowerCase(),
-
-        depth: d.depth ?? null,
-        ttfb: d.ttfb || 0,
-        in_degree: d.in_degree || 0,
-        out_degree: d.out_degree || 0,
-        is_orphan: !!d.is_orphan,
-
-        http_delivery: d.http_delivery || {},
-        security: d.security || {},
-        mixed_content: d.mixed_content || [],
-
-        structured: d.structured || {},
-        a11y_extras: d.a11y_extras || {},
-
-        text_hash: d.text_hash || "",
-        read_time_minutes: d.read_time_minutes || 0,
-        lang_attribute: d.lang_attribute || "",
-        detected_language: d.detected_language || "",
-        language_match: d.language_match,
-
-        link_rel: d.link_rel || [],
-        media_hints: d.media_hints || {},
-
-        site_wide: d.site_wide || null,
-      };
+    if (sourceData && Array.isArray(sourceData.internal_links)) {
+      sourceData.internal_links.forEach((targetUrl) => {
+        links.push({ source: sourceUrl, target: targetUrl });
+        if (!nodeIds.has(targetUrl)) {
+          nodeIds.add(targetUrl);
+          nodes.push(getNodeData(targetUrl, site_structure[targetUrl]));
+        }
+      });
     }
+  });
 
-    Object.keys(site_structure).forEach((sourceUrl) => {
-      const sourceData = site_structure[sourceUrl];
+  return {
+    nodes,
+    links,
+    scorecard: calculateScorecard(site_structure),
+    detailsOnDemand: false,
+  };
+}
 
-      if (!nodes.some((node) => node.id === sourceUrl)) {
-        nodes.push(getNodeData(sourceUrl));
-      }
+function loadCrawl() {
+  return d3
+    .json("graph.json")
+    .then(graphFromArtifact, () => d3.json("links.json").then(graphFromLinks));
+}
 
-      if (sourceData && Array.isArray(sourceData.internal_links)) {
-        sourceData.internal_links.forEach((targetUrl) => {
-          links.push({ source: sourceUrl, target: targetUrl });
-          if (!nodes.some((node) => node.id === targetUrl)) {
-            nodes.push(getNodeData(targetUrl));
-          }
-        });
-      }
-    });
+function loadPageDetails(d) {
+  if (!d._detailsRequest) {
+    d._detailsRequest = fetch(
+      `${API_BASE}/api/page?url=${encodeURIComponent(d.id)}`
+    )
+      .then((response) => {
+        if (response.status === 404) return {};
+        if (!response.ok) throw new Error(`HTTP error ${response.status}`);
+        return response.json();
+      })
+      .then((page) => {
+        Object.assign(d, getNodeData(d.id, page));
+        d._details = true;
+      })
+      .catch((err) => {
+        d._detailsRequest = null;
+        throw err;
+      });
+  }
+  return d._detailsRequest;
+}
 
-    if (nodes.length === 0) {
-      console.warn("No nodes to display in the graph.");
+loadCrawl()
+  .then(function (graph) {
+    if (!graph || graph.nodes.length === 0) {
+      console.warn("No crawl data found. Cannot render graph.");
+      d3.select("body").append("p").text("No crawl data available to display.");
+      d3.select("#scorecard-list")
+        .html("")
+        .append("li")
+        .text("No scorecard data loaded.");
       return;
     }
 
+    const { nodes, links, detailsOnDemand } = graph;
+    displayScorecard(graph.scorecard);
+
     const degreeById = (() => {
       const counts = new Map();
       links.forEach((l) => {
@@ -252,8 +337,23 @@ d3.json("links.json")
         )[0].id;
     }
 
+    function pathFromParents(srcId, dstId) {
+      const out = [srcId];
+      const seen = new Set(out);
+      let cur = nodeById.get(srcId);
+      while (cur && cur.click_parent && !seen.has(cur.click_parent)) {
+        out.push(cur.click_parent);
+        seen.add(cur.click_parent);
+        if (cur.click_parent === dstId) return out;
+        cur = nodeById.get(cur.click_parent);
+      }
+      return null;
+    }
+
     function shortestPath(srcId, dstId) {
       if (srcId === dstId) return [srcId];
+      const fromParents = pathFromParents(srcId, dstId);
+      if (fromParents) return fromParents;
       const q = [srcId];
       const prev = new Map([[srcId, null]]);
       while (q.length) {
@@ -328,11 +428,11 @@ d3.json("links.json")
     });
 
     function issueScore(d) {
-      const unlabeled = d.unlabeled_inputs?.length || 0;
-      const noAlt = d.images_without_alt?.length || 0;
-      const mixed = d.mixed_content?.length || 0;
+      const unlabeled = countOf(d.unlabeled_inputs);
+      const noAlt = countOf(d.images_without_alt);
+      const mixed = countOf(d.mixed_content);
       const noCSP = d.security?.content_security_policy ? 0 : 1;
-      const heading = d.heading_issues?.length || 0;
+      const heading = countOf(d.heading_issues);
       const isError = /^4|^5/.test(String(d.status_code)) ? 1 : 0;
       return unlabeled + noAlt + mixed + noCSP + heading + isError;
     }
@@ -386,6 +486,32 @@ d3.json("links.json")
       path.exit().remove();
     }
 
+    // Crawls exported with a precomputed layout are drawn at those positions
+    // straight away instead of running the live simulation over every node.
+    // Linked pages that were not crawled sit next to the page linking to them.
+    const usePrecomputedLayout = nodes.some((n) => n.layout);
+    if (usePrecomputedLayout) {
+      nodes.forEach((n) => {
+        if (!n.layout) return;
+        n.x = width / 2 + n.layout.x * LAYOUT_SPACING;
+        n.y = height / 2 + n.layout.y * LAYOUT_SPACING;
+      });
+      links.forEach((l) => {
+        const s = nodeById.get(idOf(l.source));
+        const t = nodeById.get(idOf(l.target));
+        if (s && t && s.x !== undefined && t.x === undefined) {
+          t.x = s.x + (Math.random() - 0.5) * LAYOUT_SPACING;
+          t.y = s.y + (Math.random() - 0.5) * LAYOUT_SPACING;
+        }
+      });
+      nodes.forEach((n) => {
+        if (n.x === undefined) {
+          n.x = width / 2;
+          n.y = height / 2;
+        }
+      });
+    }
+
     const simulation = d3
       .forceSimulation(nodes)
       .force(
@@ -407,7 +533,7 @@ d3.json("links.json")
       )
       .alphaDecay(0.03);
 
-    simulation.on("tick", () => {
+    function ticked() {
       link.attr("d", (d) => {
         const sx = d.source.x,
           sy = d.source.y,
@@ -423,7 +549,34 @@ d3.json("links.json")
       labels.attr("x", (d) => d.x + 10).attr("y", (d) => d.y + 4);
 
       drawHulls();
-    });
+    }
+
+    simulation.on("tick", ticked);
+
+    function reheat(alpha) {
+      if (usePrecomputedLayout) ticked();
+      else simulation.alpha(alpha).restart();
+    }
+
+    if (usePrecomputedLayout) {
+      simulation.stop();
+      ticked();
+
+      const [x0, x1] = d3.extent(nodes, (n) => n.x);
+      const [y0, y1] = d3.extent(nodes, (n) => n.y);
+      const scale = Math.min(
+        1,
+        width / (x1 - x0 + LAYOUT_SPACING),
+        height / (y1 - y0 + LAYOUT_SPACING)
+      );
+      svg.call(
+        zoomHandler.transform,
+        d3.zoomIdentity
+          .translate(width / 2, height / 2)
+          .scale(scale)
+          .translate(-(x0 + x1) / 2, -(y0 + y1) / 2)
+      );
+    }
 
     const searchInput = document.getElementById("node-search");
     const clearBtn = document.getElementById("node-search-clear");
@@ -432,17 +585,39 @@ d3.json("links.json")
       nodes.forEach((n) => (n._filteredOut = false));
 
       function matchesQuery(d, keywords) {
-        const hay = (d.search_text || d.text_content || "").toLowerCase();
+        const hay = (
+          detailsOnDemand
+            ? `${d.title} ${d.id}`
+            : d.search_text || d.text_content || ""
+        ).toLowerCase();
         if (!hay) return false;
         return keywords.every((kw) => hay.includes(kw));
       }
 
+      // With graph.json the page text stays on the server: ask its search
+      // index, and fall back to matching titles and URLs if it is unreachable.
+      // A trailing * makes the word being typed match as a prefix.
+      function searchServer(query) {
+        const q = /\w$/.test(query) ? `${query}*` : query;
+        return fetch(
+          `${API_BASE}/api/search?q=${encodeURIComponent(q)}&limit=${SEARCH_LIMIT}`
+        )
+          .then((response) => {
+            if (!response.ok) throw new Error(`HTTP error ${response.status}`);
+            return response.json();
+          })
+          .then((body) => new Set(body.results.map((r) => r.url)));
+      }
+
+      let filterRequest = 0;
+
       function applyFilter(query) {
         const keywords = query
           .toLowerCase()
           .split(/\s+/)
           .map((k) => k.trim())
           .filter(Boolean);
+        const request = ++filterRequest;
 
         if (keywords.length === 0) {
           nodes.forEach((n) => (n._filteredOut = false));
@@ -456,10 +631,29 @@ d3.json("links.json")
           return;
         }
 
-        const keepSet = new Set(
-          nodes.filter((n) => matchesQuery(n, keywords)).map((n) => n.id)
-        );
+        const localMatches = () =>
+          new Set(
+            nodes.filter((n) => matchesQuery(n, keywords)).map((n) => n.id)
+          );
 
+        if (!detailsOnDemand) {
+          showMatches(localMatches());
+          return;
+        }
+        searchServer(query.trim())
+          .catch((err) => {
+            console.warn(
+              "Search API unavailable, matching titles and URLs:",
+              err
+            );
+            return localMatches();
+          })
+          .then((keepSet) => {
+            if (request === filterRequest) showMatches(keepSet);
+          });
+      }
+
+      function showMatches(keepSet) {
         nodes.forEach((n) => (n._filteredOut = !keepSet.has(n.id)));
 
         node
@@ -513,22 +707,11 @@ d3.json("links.json")
         const h = window.innerHeight;
         svg.attr("width", w).attr("height", h);
         simulation.force("center", d3.forceCenter(w / 2, h / 2));
-        simulation.alpha(0.2).restart();
+        reheat(0.2);
       }, 150);
     });
 
-    function mouseover(event, d) {
-      d3.select(this).raise();
-
-      const claudeDiv = document.querySelector("#claude-analysis-section");
-      const claudeOutput = document.querySelector("#claude-analysis-output");
-      if (claudeDiv && claudeOutput) {
-        claudeDiv.style.display = "block";
-        claudeOutput.innerHTML = "";
-      }
-
-      currentlySelectedNode = d;
-
+    function tooltipHtml(d) {
       const connectedLinks = links.filter(
         (l) =>
           (l.source.id || l.source) === d.id ||
@@ -593,7 +776,7 @@ d3.json("links.json")
 
       const preloadCounts = countPreloadKinds(d.link_rel);
 
-      const tooltipContent = `
+      return `
     <li><strong>Title:</strong> ${escapeHtml(d.title || "N/A")}</li>
     <li><strong>URL:</strong> <a href="${d.id}" target="_blank">${d.id}</a></li>
     <li><strong>Connections:</strong> ${connectedLinks}</li>
@@ -605,6 +788,12 @@ d3.json("links.json")
     <li><strong>In/Out Degree:</strong> ${d.in_degree || 0} / ${
         d.out_degree || 0
       } ${d.is_orphan ? "(orphan)" : ""}</li>
+    <li><strong>In Sitemap:</strong> ${
+        d.in_sitemap == null ? "N/A" : yesNo(d.in_sitemap)
+      } ${d.sitemap_orphan ? "(not reachable by links)" : ""}</li>
+    <li><strong>Click Depth / PageRank:</strong> ${numOrNA(d.click_depth)} / ${
+        d.pagerank != null ? d.pagerank.toFixed(5) : "N/A"
+      }</li>
 
     <li><strong>Meta Description:</strong> ${escapeHtml(
       d.meta_description || "N/A"
@@ -705,8 +894,45 @@ d3.json("links.json")
       d.external_links ? d.external_links.length : 0
     } links</li>
   `;
+    }
+
+    function renderTooltip(d) {
+      const list = d3.select("#tooltip-scorecard-list");
+      if (!detailsOnDemand || d._details) {
+        list.html(tooltipHtml(d));
+        return;
+      }
+      list.html(`
+    <li><strong>Title:</strong> ${escapeHtml(d.title || "N/A")}</li>
+    <li><strong>URL:</strong> <a href="${d.id}" target="_blank">${d.id}</a></li>
+    <li>Loading page details…</li>
+  `);
+      loadPageDetails(d).then(
+        () => {
+          if (currentlySelectedNode === d) list.html(tooltipHtml(d));
+        },
+        (err) => {
+          if (currentlySelectedNode === d)
+            list
+              .append("li")
+              .text(`Could not load page details: ${err.message}`);
+        }
+      );
+    }
+
+    function mouseover(event, d) {
+      d3.select(this).raise();
 
-      d3.select("#tooltip-scorecard-list").html(tooltipContent);
+      const claudeDiv = document.querySelector("#claude-analysis-section");
+      const claudeOutput = document.querySelector("#claude-analysis-output");
+      if (claudeDiv && claudeOutput) {
+        claudeDiv.style.display = "block";
+        claudeOutput.innerHTML = "";
+      }
+
+      currentlySelectedNode = d;
+
+      renderTooltip(d);
 
       d3.select(this).style("cursor", "pointer");
       labels.filter((l) => l === d).attr("display", null);
@@ -769,7 +995,8 @@ d3.json("links.json")
     }
 
     function dragstarted(event, d) {
-      if (!event.active) simulation.alphaTarget(0.3).restart();
+      if (!event.active && !usePrecomputedLayout)
+        simulation.alphaTarget(0.3).restart();
       d.fx = d.x;
       d.fy = d.y;
     }
@@ -777,10 +1004,15 @@ d3.json("links.json")
     function dragged(event, d) {
       d.fx = event.x;
       d.fy = event.y;
+      if (usePrecomputedLayout) {
+        d.x = event.x;
+        d.y = event.y;
+        ticked();
+      }
     }
 
     function dragended(event, d) {
-      if (!event.active) simulation.alphaTarget(0);
+      if (!event.active && !usePrecomputedLayout) simulation.alphaTarget(0);
       d.fx = null;
       d.fy = null;
     }
@@ -825,17 +1057,25 @@ d3.json("links.json")
       if (e.key === "5") sizeMode = "hub";
       if ("12345".includes(e.key)) {
         node.attr("r", (d) => sizeModes[sizeMode](d));
-        simulation.alpha(0.2).restart();
+        reheat(0.2);
       }
     });
   })
   .catch(function (error) {
-    console.error("Error loading or processing links.json:", error);
+    console.error("Error loading or processing crawl data:", error);
     d3.select("body")
       .append("p")
       .text(
         "Could not load or process crawl data. Check the console for errors."
       );
+    d3.select("#scorecard-list")
+      .html("")
+      .append("li")
+      .html(
+        `<strong>Error loading scorecard data:</strong> ${escapeHtml(
+          error.message
+        )}`
+      );
   });
 
 function calculateScorecard(site_structure) {
@@ -1299,32 +1539,6 @@ function displayScorecard(scorecard) {
     .html(`<strong>Status Codes:</strong><br/>${statusList || "N/A"}`);
 }
 
-d3.json("links.json")
-  .then((loaded_site_structure) => {
-    if (
-      loaded_site_structure &&
-      Object.keys(loaded_site_structure).length > 0
-    ) {
-      const scorecard = calculateScorecard(loaded_site_structure);
-      displayScorecard(scorecard);
-    } else {
-      console.warn("No data for scorecard in the d3.json call.");
-      const list = d3.select("#scorecard-list").html("");
-      list.append("li").text("No scorecard data loaded.");
-    }
-  })
-  .catch(function (error) {
-    console.error("Error loading links.json for scorecard:", error);
-    const list = d3.select("#scorecard-list").html("");
-    list
-      .append("li")
-      .html(
-        `<strong>Error loading scorecard data:</strong> ${escapeHtml(
-          error.message
-        )}`
-      );
-  });
-
 document.addEventListener("DOMContentLoaded", () => {
   const analyzeButton = document.getElementById("analyze-node-button");
   const analysisOutput = document.getElementById("claude-analysis-output");
@@ -1339,7 +1553,7 @@ document.addEventListener("DOMContentLoaded", () => {
 
       analysisOutput.textContent = "Running analysis...";
 
-      fetch("http://localhost:5000/api/analyze", {
+      fetch(`${API_BASE}/api/analyze`, {
         method: "POST",
         headers: {
           "Content-Type": "application/json",
@@ -1439,12 +1653,18 @@ document.addEventListener("DOMContentLoaded", () => {
   updateActiveLegend();
 })();
 
+// Page records hold lists; graph.json summaries hold just their lengths.
+function countOf(v) {
+  if (Array.isArray(v)) return v.length;
+  return Number.isFinite(v) ? v : 0;
+}
+
 function hasIssues(d) {
   return (
-    (d.unlabeled_inputs?.length || 0) > 0 ||
-    (d.images_without_alt?.length || 0) > 0 ||
+    countOf(d.unlabeled_inputs) > 0 ||
+    countOf(d.images_without_alt) > 0 ||
     !d.semantic_elements?.main ||
-    (!!d.mixed_content && d.mixed_content.length > 0) ||
+    countOf(d.mixed_content) > 0 ||
     !d.security?.content_security_policy
   );
 }
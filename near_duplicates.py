@@ -0,0 +1,98 @@
+import hashlib
+import re
+from collections import defaultdict
+
+SIMHASH_BITS = 64
+
+SHINGLE_SIZE = 3
+
+# Pages whose SimHashes differ in at most this many bits are near-duplicates.
+NEAR_DUPLICATE_DISTANCE = 3
+
+# Each hash is compared with at most this many others from one band bucket.
+NEAR_DUPLICATE_BUCKET_LIMIT = 200
+
+# Exact fingerprint of the normalized text, used to skip unchanged pages on
+# recrawl; simhash below catches pages that are only nearly the same.
+def text_fingerprint(text):
+    norm = re.sub(r'\s+', ' ', (text or '').lower()).strip()
+    return hashlib.md5(norm.encode()).hexdigest() if norm else ""
+
+def shingles(text, size=SHINGLE_SIZE):
+    words = re.findall(r"\w+", (text or "").lower())
+    if len(words) < size:
+        return [" ".join(words)] if words else []
+    return [" ".join(words[i:i + size]) for i in range(len(words) - size + 1)]
+
+def simhash(text, size=SHINGLE_SIZE):
+    weights = [0] * SIMHASH_BITS
+    counts = defaultdict(int)
+    for shingle in shingles(text, size):
+        counts[shingle] += 1
+    if not counts:
+        return None
+    for shingle, count in counts.items():
+        h = int.from_bytes(hashlib.blake2b(shingle.encode('utf-8'), digest_size=8).digest(), 'big')
+        for bit in range(SIMHASH_BITS):
+            weights[bit] += count if (h >> bit) & 1 else -count
+    value = 0
+    for bit in range(SIMHASH_BITS):
+        if weights[bit] > 0:
+            value |= 1 << bit
+    return value
+
+def simhash_hex(text, size=SHINGLE_SIZE):
+    value = simhash(text, size)
+    return f"{value:016x}" if value is not None else ""
+
+def _find(parent, x):
+    while parent[x] != x:
+        parent[x] = parent[parent[x]]
+        x = parent[x]
+    return x
+
+# Locality-sensitive bucketing: the 64-bit hash is cut into max_distance + 1
+# bands, so any two hashes within max_distance bits agree on at least one whole
+# band. Only hashes sharing a band bucket are compared, which keeps clustering
+# close to linear instead of comparing every pair of pages. Template-heavy sites
+# fill a few buckets with pages that share their boilerplate, so comparing
+# whole buckets is quadratic again: a bucket larger than bucket_limit is sorted
+# and each hash is compared with the next bucket_limit only. Near-duplicates
+# further apart in such a bucket are still found if they share another band.
+def near_duplicate_clusters(fingerprints, max_distance=NEAR_DUPLICATE_DISTANCE, bucket_limit=NEAR_DUPLICATE_BUCKET_LIMIT):
+    by_hash = defaultdict(list)
+    for url, fp in fingerprints.items():
+        if fp:
+            by_hash[int(fp, 16) if isinstance(fp, str) else fp].append(url)
+
+    hashes = list(by_hash)
+    parent = {h: h for h in hashes}
+    bands = max_distance + 1
+    width = -(-SIMHASH_BITS // bands)
+    mask = (1 << width) - 1
+    for band in range(bands):
+        buckets = defaultdict(list)
+        for h in hashes:
+            buckets[(h >> (band * width)) & mask].append(h)
+        for bucket in buckets.values():
+            if len(bucket) > bucket_limit:
+                bucket.sort()
+            for i in range(len(bucket)):
+                for j in range(i + 1, min(len(bucket), i + 1 + bucket_limit)):
+                    a, b = bucket[i], bucket[j]
+                    if bin(a ^ b).count("1") <= max_distance:
+                        ra, rb = _find(parent, a), _find(parent, b)
+                        if ra != rb:
+                            parent[ra] = rb
+
+    members = defaultdict(list)
+    for h, urls in by_hash.items():
+        members[_find(parent, h)].extend(urls)
+
+    clusters = {url: None for url in fingerprints}
+    for urls in members.values():
+        if len(urls) > 1:
+            representative = min(urls)
+            for url in urls:
+                clusters[url] = representative
+    return clusters
@@ -0,0 +1,104 @@
+import json
+import os
+import re
+import tempfile
+import threading
+import time
+from collections import Counter
+from functools import lru_cache
+
+# NLTK, textstat and TextBlob take about a second to import (NLTK pulls in
+# scipy), so each is imported on first use and its resources are loaded once per
+# process. Crawls whose analysis profile has no NLP step never load them.
+# word_tokenize in NLTK 3.9 reads punkt_tab.
+NLTK_RESOURCES = (("punkt_tab", "tokenizers/punkt_tab"), ("stopwords", "corpora/stopwords"))
+
+# A failed download is recorded here and not retried, by any process, for
+# NLTK_RETRY_SECONDS; offline, the NLP steps then fail fast instead of every
+# analysis process trying to download again.
+NLTK_FAILED_DOWNLOADS_FILE = os.path.join(tempfile.gettempdir(), 'crawler_nltk_failed_downloads.json')
+
+NLTK_RETRY_SECONDS = 3600
+
+KEYWORD_COUNT = 10
+
+ENGLISH_STOPWORD_RATIO = 0.02
+
+_nltk_lock = threading.Lock()
+
+def _failed_downloads():
+    try:
+        with open(NLTK_FAILED_DOWNLOADS_FILE, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+def _record_failed_download(package):
+    failed = _failed_downloads()
+    failed[package] = time.time()
+    try:
+        with open(NLTK_FAILED_DOWNLOADS_FILE, 'w', encoding='utf-8') as f:
+            json.dump(failed, f)
+    except OSError:
+        pass
+
+@lru_cache(maxsize=None)
+def _nltk():
+    import nltk
+    with _nltk_lock:
+        failed = None
+        for package, path in NLTK_RESOURCES:
+            try:
+                nltk.data.find(path)
+                continue
+            except LookupError:
+                pass
+            if failed is None:
+                failed = _failed_downloads()
+            if time.time() - failed.get(package, 0) < NLTK_RETRY_SECONDS:
+                continue
+            if not nltk.download(package, quiet=True):
+                _record_failed_download(package)
+    return nltk
+
+@lru_cache(maxsize=None)
+def english_stopwords():
+    _nltk()
+    from nltk.corpus import stopwords
+    with _nltk_lock:
+        return frozenset(stopwords.words('english'))
+
+def readability(text):
+    if not text:
+        return 0
+    import textstat
+    return textstat.flesch_kincaid_grade(text)
+
+def sentiment(text):
+    if not text:
+        return 0
+    from textblob import TextBlob
+    return TextBlob(text).sentiment.polarity
+
+def keyword_density(text):
+    if not text:
+        return {}
+    text_clean = re.sub(r'[^\w\s]', '', text.lower())
+    tokens = _nltk().word_tokenize(text_clean)
+    stop_words = english_stopwords()
+    filtered_tokens = [word for word in tokens if word not in stop_words and word.isalpha() and len(word) > 1]
+    if not filtered_tokens:
+        return {}
+    word_freq = Counter(filtered_tokens)
+    total_filtered_words = sum(word_freq.values())
+    return {word: round(count / total_filtered_words, 4) for word, count in word_freq.most_common(KEYWORD_COUNT)}
+
+def detect_language(text):
+    if not text:
+        return "unknown"
+    words = re.findall(r"[a-zA-Z']+", text.lower())
+    if not words:
+        return "unknown"
+    stop_words = english_stopwords()
+    hits = sum(1 for w in words if w in stop_words)
+    return "en" if hits / max(1, len(words)) >= ENGLISH_STOPWORD_RATIO else "unknown"
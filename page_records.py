@@ -0,0 +1,167 @@
+import hashlib
+import json
+import re
+import zlib
+from array import array
+from collections.abc import MutableMapping
+
+TEXT_COMPRESSION_LEVEL = 6
+
+FIELD_COMPRESSION_LEVEL = 1
+
+LINK_FIELDS = ("internal_links", "external_links")
+
+# How each field of a record is kept: the page's own URL and its link lists as
+# ids into the shared URL table, text_content in the TextStore, search_text not
+# at all (it is rebuilt from text_content), other strings and numbers as they
+# are, and all lists and dicts together in one compressed JSON blob.
+URL, LINKS, TEXT, DERIVED, SCALAR, NESTED = range(6)
+
+def search_text_of(text_content):
+    return re.sub(r'\s+', ' ', text_content).lower()
+
+def _encode(values):
+    return json.dumps(values, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+class UrlTable:
+    def __init__(self):
+        self._ids = {}
+        self.urls = []
+
+    def __len__(self):
+        return len(self.urls)
+
+    def intern(self, url):
+        i = self._ids.get(url)
+        if i is None:
+            i = self._ids[url] = len(self.urls)
+            self.urls.append(url)
+        return i
+
+    def id(self, url):
+        return self._ids.get(url)
+
+# Compressed page text, stored once per distinct text. Keys are the record's
+# text_hash; text_hash ignores case and whitespace, so texts that differ only in
+# those get a suffixed key of their own.
+class TextStore:
+    def __init__(self, level=TEXT_COMPRESSION_LEVEL):
+        self.level = level
+        self._texts = {}
+
+    def __len__(self):
+        return len(self._texts)
+
+    def put(self, text, text_hash=None):
+        data = text.encode('utf-8')
+        digest = hashlib.blake2b(data, digest_size=8).digest()
+        key = text_hash or digest.hex()
+        while key in self._texts:
+            if self._texts[key][0] == digest:
+                return key
+            key += "+"
+        self._texts[key] = (digest, zlib.compress(data, self.level))
+        return key
+
+    def get(self, key):
+        return zlib.decompress(self._texts[key][1]).decode('utf-8')
+
+class PageRecord:
+    __slots__ = ("shape", "scalars", "nested", "links", "text")
+
+    def __init__(self, shape, scalars, nested, links, text):
+        self.shape = shape
+        self.scalars = scalars
+        self.nested = nested
+        self.links = links
+        self.text = text
+
+# Page records keyed by URL, held as PageRecords instead of dicts. Reading a URL
+# rebuilds the same dict (key order included; tuples come back as lists, as
+# they would from JSON), so the store can stand in for the dict crawl_site used
+# to return. Field layouts are shared: most pages have the same keys.
+class PageRecordStore(MutableMapping):
+    def __init__(self):
+        self.url_table = UrlTable()
+        self.texts = TextStore()
+        self._records = {}
+        self._shapes = {}
+        self._shape_list = []
+
+    def _shape_id(self, shape):
+        i = self._shapes.get(shape)
+        if i is None:
+            i = self._shapes[shape] = len(self._shape_list)
+            self._shape_list.append(shape)
+        return i
+
+    def __setitem__(self, url, record):
+        url_id = self.url_table.intern(url)
+        text_content = record.get("text_content")
+        has_text = isinstance(text_content, str) and text_content != ""
+        shape, scalars, nested, links = [], [], [], []
+        text = None
+        for key, value in record.items():
+            if key == "url" and value == url:
+                kind = URL
+            elif key in LINK_FIELDS and isinstance(value, list) and all(isinstance(u, str) for u in value):
+                kind = LINKS
+                links.append(array('I', (self.url_table.intern(u) for u in value)))
+            elif key == "text_content" and has_text:
+                kind = TEXT
+                text = self.texts.put(value, record.get("text_hash"))
+            elif key == "search_text" and has_text and value == search_text_of(text_content):
+                kind = DERIVED
+            elif isinstance(value, (list, dict, tuple)):
+                kind = NESTED
+                nested.append(value)
+            else:
+                kind = SCALAR
+                scalars.append(value)
+            shape.append((key, kind))
+        blob = zlib.compress(_encode(nested), FIELD_COMPRESSION_LEVEL) if nested else None
+        self._records[url_id] = PageRecord(self._shape_id(tuple(shape)), tuple(scalars), blob, tuple(links), text)
+
+    def __getitem__(self, url):
+        url_id = self.url_table.id(url)
+        if url_id is None or url_id not in self._records:
+            raise KeyError(url)
+        page = self._records[url_id]
+        scalars = iter(page.scalars)
+        nested = iter(json.loads(zlib.decompress(page.nested)) if page.nested is not None else ())
+        links = iter(page.links)
+        urls = self.url_table.urls
+        text_content = self.texts.get(page.text) if page.text is not None else None
+        record = {}
+        for key, kind in self._shape_list[page.shape]:
+            if kind == URL:
+                record[key] = url
+            elif kind == LINKS:
+                record[key] = [urls[i] for i in next(links)]
+            elif kind == TEXT:
+                record[key] = text_content
+            elif kind == DERIVED:
+                record[key] = search_text_of(text_content)
+            elif kind == NESTED:
+                record[key] = next(nested)
+            else:
+                record[key] = next(scalars)
+        return record
+
+    def __delitem__(self, url):
+        url_id = self.url_table.id(url)
+        if url_id is None or url_id not in self._records:
+            raise KeyError(url)
+        del self._records[url_id]
+
+    def __iter__(self):
+        urls = self.url_table.urls
+        for url_id in list(self._records):
+            yield urls[url_id]
+
+    def __len__(self):
+        return len(self._records)
+
+    def __contains__(self, url):
+        url_id = self.url_table.id(url)
+        return url_id is not None and url_id in self._records
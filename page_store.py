@@ -0,0 +1,177 @@
+import json
+import os
+import sqlite3
+import threading
+
+PAGE_STORE_FILE = 'links.sqlite'
+
+READ_CHUNK_SIZE = 1 << 20
+
+# SQLite compares TEXT as UTF-8 bytes, so every string starting with `prefix`
+# sorts below prefix + the highest code point.
+PREFIX_UPPER_BOUND = '\U0010ffff'
+
+def _skip_ws(buf, pos):
+    while pos < len(buf) and buf[pos] in ' \t\r\n':
+        pos += 1
+    return pos
+
+# Yields (key, value) pairs of a top-level JSON object one at a time, so a large
+# links.json never has to be decoded in a single json.load.
+def iter_json_object(filename, chunk_size=READ_CHUNK_SIZE):
+    decoder = json.JSONDecoder()
+    with open(filename, 'r', encoding='utf-8') as f:
+        buf = f.read(chunk_size)
+        eof = not buf
+        pos = _skip_ws(buf, 0)
+
+        def more():
+            nonlocal buf, pos, eof
+            chunk = f.read(chunk_size)
+            if not chunk:
+                eof = True
+                return False
+            buf = buf[pos:] + chunk
+            pos = 0
+            return True
+
+        def decode():
+            nonlocal pos
+            while True:
+                start = _skip_ws(buf, pos)
+                if start >= len(buf) and more():
+                    continue
+                try:
+                    value, end = decoder.raw_decode(buf, start)
+                except json.JSONDecodeError:
+                    if eof or not more():
+                        raise
+                    continue
+                pos = end
+                return value
+
+        def expect(chars):
+            nonlocal pos
+            while True:
+                pos = _skip_ws(buf, pos)
+                if pos < len(buf):
+                    break
+                if not more():
+                    raise json.JSONDecodeError("Unexpected end of data", buf, pos)
+            ch = buf[pos]
+            if ch not in chars:
+                raise json.JSONDecodeError(f"Expected one of {chars!r}", buf, pos)
+            pos += 1
+            return ch
+
+        expect('{')
+        while _skip_ws(buf, pos) >= len(buf) and more():
+            pass
+        pos = _skip_ws(buf, pos)
+        if pos < len(buf) and buf[pos] == '}':
+            return
+        while True:
+            key = decode()
+            if not isinstance(key, str):
+                raise json.JSONDecodeError("Object keys must be strings", buf, pos)
+            expect(':')
+            yield key, decode()
+            if expect(',}') == '}':
+                return
+
+class PageStore:
+    def __init__(self, db_file=':memory:'):
+        self.db_file = db_file
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_file, check_same_thread=False)
+        self._conn.execute("CREATE TABLE IF NOT EXISTS pages (url TEXT PRIMARY KEY, data TEXT NOT NULL) WITHOUT ROWID")
+        self._conn.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)")
+        self._conn.commit()
+
+    @classmethod
+    def from_dict(cls, structure, db_file=':memory:'):
+        store = cls(db_file)
+        store.replace_all(structure.items())
+        return store
+
+    def replace_all(self, items, source_mtime=None):
+        with self._lock:
+            try:
+                self._conn.execute("DELETE FROM pages")
+                self._conn.executemany(
+                    "INSERT OR REPLACE INTO pages (url, data) VALUES (?, ?)",
+                    ((url, json.dumps(data, ensure_ascii=False, separators=(',', ':'))) for url, data in items)
+                )
+                self._conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('source_mtime', ?)", (str(source_mtime),))
+                self._conn.commit()
+            except Exception:
+                self._conn.rollback()
+                raise
+
+    def source_mtime(self):
+        with self._lock:
+            row = self._conn.execute("SELECT value FROM meta WHERE key = 'source_mtime'").fetchone()
+        return row[0] if row else None
+
+    def get(self, url):
+        with self._lock:
+            row = self._conn.execute("SELECT data FROM pages WHERE url = ?", (url,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def __len__(self):
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM pages").fetchone()[0]
+
+    def urls(self, prefix='', after=None, offset=0, limit=1000):
+        clauses, params = [], []
+        if prefix:
+            clauses.append("url >= ? AND url < ?")
+            params += [prefix, prefix + PREFIX_UPPER_BOUND]
+        if after is not None:
+            clauses.append("url > ?")
+            params.append(after)
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT url FROM pages {where} ORDER BY url LIMIT ? OFFSET ?",
+                params + [limit, offset]
+            ).fetchall()
+        return [r[0] for r in rows]
+
+    def count(self, prefix=''):
+        if not prefix:
+            return len(self)
+        with self._lock:
+            return self._conn.execute(
+                "SELECT COUNT(*) FROM pages WHERE url >= ? AND url < ?",
+                (prefix, prefix + PREFIX_UPPER_BOUND)
+            ).fetchone()[0]
+
+    def iter_pages(self, batch_size=500):
+        after = None
+        while True:
+            with self._lock:
+                if after is None:
+                    rows = self._conn.execute("SELECT url, data FROM pages ORDER BY url LIMIT ?", (batch_size,)).fetchall()
+                else:
+                    rows = self._conn.execute("SELECT url, data FROM pages WHERE url > ? ORDER BY url LIMIT ?", (after, batch_size)).fetchall()
+            if not rows:
+                return
+            for url, data in rows:
+                yield url, json.loads(data)
+            after = rows[-1][0]
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+# Reuses the on-disk index when it was built from the current links.json and
+# rebuilds it (streaming the JSON, record by record) otherwise.
+def open_page_store(json_file='links.json', db_file=PAGE_STORE_FILE):
+    source_mtime = str(os.path.getmtime(json_file))
+    store = PageStore(db_file)
+    if store.source_mtime() == source_mtime:
+        return store
+    print(f"Indexing {json_file} into {db_file}...")
+    store.replace_all(iter_json_object(json_file), source_mtime=source_mtime)
+    return store
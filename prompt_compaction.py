@@ -0,0 +1,96 @@
+import json
+from collections import Counter
+from urllib.parse import urlparse
+
+PROMPT_TOKEN_BUDGET = 3000
+
+CHARS_PER_TOKEN = 4
+
+LIST_SAMPLE_SIZES = (10, 5, 2, 0)
+
+MIN_TEXT_CHARS = 400
+
+# search_text is a lowercased copy of text_content and response_time repeats
+# ttfb plus download time; layout and timings say nothing about the page.
+DROPPED_FIELDS = {"search_text", "response_time", "reused_analysis", "layout", "timings"}
+
+SAMPLED_LIST_FIELDS = ("images_without_alt", "mixed_content", "unlabeled_inputs", "h1_tags")
+
+def estimate_tokens(text):
+    return len(text) // CHARS_PER_TOKEN + 1
+
+def encode(obj):
+    return json.dumps(obj, ensure_ascii=False, separators=(',', ':'))
+
+def sample_list(values, size):
+    values = list(values or [])
+    out = {"count": len(values)}
+    if size:
+        out["sample"] = values[:size]
+    return out
+
+def summarize_links(links, size, with_hosts=True):
+    links = sorted(set(links or []))
+    out = sample_list(links, size)
+    if size and with_hosts:
+        hosts = Counter(urlparse(u).netloc for u in links)
+        out["top_hosts"] = dict(sorted(hosts.items(), key=lambda kv: (-kv[1], kv[0]))[:size])
+    return out
+
+def summarize_robots(robots_txt, size):
+    lines = [l.strip() for l in (robots_txt or "").splitlines() if l.strip() and not l.strip().startswith("#")]
+    rules = [l for l in lines if l.lower().startswith(("user-agent", "disallow", "allow", "crawl-delay"))]
+    return {"lines": len(lines), "rules": rules[:size * 2]}
+
+def truncate_text(text, max_chars):
+    if len(text) <= max_chars:
+        return text
+    if max_chars <= 0:
+        return ""
+    head = (max_chars * 2) // 3
+    tail = max_chars - head
+    return text[:head].rstrip() + " […] " + text[len(text) - tail:].lstrip()
+
+def compact_without_text(page_data, size):
+    out = {}
+    for key, value in page_data.items():
+        if key in DROPPED_FIELDS or key == "text_content":
+            continue
+        if key in ("internal_links", "external_links"):
+            out[key] = summarize_links(value, size, with_hosts=(key == "external_links"))
+        elif key in SAMPLED_LIST_FIELDS:
+            out[key] = sample_list(value, size)
+        elif key == "a11y_extras" and isinstance(value, dict):
+            out[key] = dict(value, generic_link_texts=sample_list(value.get("generic_link_texts"), size))
+        elif key == "structured" and isinstance(value, dict):
+            jsonld = value.get("jsonld") or []
+            types = sorted({str(item.get("@type")) for item in jsonld if isinstance(item, dict) and item.get("@type")})
+            out[key] = dict(value, jsonld={"count": len(jsonld), "types": types}, hreflang=sample_list(value.get("hreflang"), size))
+        elif key == "http_delivery" and isinstance(value, dict):
+            chain = value.get("redirect_chain") or []
+            out[key] = dict({k: v for k, v in value.items() if k != "redirect_chain"},
+                            redirects=[{"url": hop.get("url"), "status": hop.get("status")} for hop in chain[:-1]])
+        elif key == "external_link_health" and isinstance(value, dict):
+            broken = [{"url": url, "status_code": health.get("status_code")} for url, health in value.items() if not health.get("ok")]
+            out[key] = {"checked": len(value), "broken": sample_list(broken, size),
+                        "redirected": sum(1 for health in value.values() if health.get("redirect_count"))}
+        elif key == "site_wide" and isinstance(value, dict):
+            out[key] = dict({k: v for k, v in value.items() if k != "robots_txt"}, robots=summarize_robots(value.get("robots_txt"), size))
+        else:
+            out[key] = value
+    return out
+
+# Builds a deterministic, deduplicated summary of a crawled page record that fits
+# in roughly `token_budget` tokens: link lists are aggregated, repeated text is
+# dropped and the body text is cut (head and tail kept) to whatever budget remains.
+def compact_page_data(page_data, token_budget=PROMPT_TOKEN_BUDGET):
+    text = " ".join((page_data.get("text_content") or "").split())
+    for size in LIST_SAMPLE_SIZES:
+        compact = compact_without_text(page_data, size)
+        remaining_chars = (token_budget - estimate_tokens(encode(compact))) * CHARS_PER_TOKEN
+        if remaining_chars >= min(len(text), MIN_TEXT_CHARS) or size == LIST_SAMPLE_SIZES[-1]:
+            break
+    if text:
+        compact["text_content"] = truncate_text(text, max(0, remaining_chars - 32))
+        compact["text_truncated"] = len(compact["text_content"]) < len(text)
+    return compact
@@ -0,0 +1,174 @@
+import threading
+import time
+from email.utils import parsedate_to_datetime
+from urllib.parse import urlparse
+
+# Requests per second allowed to each host.
+RATE_INITIAL = 4.0
+
+RATE_MIN = 0.1
+
+RATE_MAX = 64.0
+
+# Until a host first pushes back, its rate grows by RATE_SLOW_START per healthy
+# response; afterwards it grows by RATE_INCREASE (additive increase) and every
+# sign of overload multiplies it by RATE_DECREASE.
+RATE_SLOW_START = 1.1
+
+RATE_INCREASE = 0.25
+
+RATE_DECREASE = 0.5
+
+RATE_BURST = 2.0
+
+THROTTLE_STATUS_CODES = {429, 503}
+
+RETRY_AFTER_MAX = 300.0
+
+# A latency spike is a fast-moving TTFB average exceeding the slow-moving one by
+# LATENCY_SPIKE_FACTOR (and by at least LATENCY_SPIKE_FLOOR seconds, so jitter
+# on very fast hosts does not count) once LATENCY_WARMUP responses are in.
+LATENCY_FAST_ALPHA = 0.3
+
+LATENCY_SLOW_ALPHA = 0.05
+
+LATENCY_SPIKE_FACTOR = 2.0
+
+LATENCY_SPIKE_FLOOR = 0.05
+
+LATENCY_WARMUP = 5
+
+# Back-to-back overload signals from requests already in flight count once.
+DECREASE_COOLDOWN = 1.0
+
+def parse_retry_after(value, now=None):
+    if value is None:
+        return None
+    value = str(value).strip()
+    try:
+        seconds = float(value)
+    except ValueError:
+        try:
+            seconds = parsedate_to_datetime(value).timestamp() - (now or time.time())
+        except (TypeError, ValueError, IndexError, OverflowError):
+            return None
+    return min(RETRY_AFTER_MAX, max(0.0, seconds))
+
+def host_of(url):
+    return urlparse(url).netloc.lower()
+
+class HostRate:
+    def __init__(self, rate=RATE_INITIAL):
+        self.rate = rate
+        self.max_rate = RATE_MAX
+        self.burst = RATE_BURST
+        self.crawl_delay = None
+        self.tokens = 1.0
+        self.updated = time.time()
+        self.resume_at = 0.0
+        self.slow_start = True
+        self.last_decrease = 0.0
+        self.ttfb_fast = None
+        self.ttfb_slow = None
+        self.responses = 0
+        self.throttled = 0
+        self.failures = 0
+        self.latency_decreases = 0
+        self.waited = 0.0
+
+    def state(self):
+        return {
+            "rate": round(self.rate, 3),
+            "max_rate": round(self.max_rate, 3),
+            "slow_start": self.slow_start,
+            "crawl_delay": self.crawl_delay,
+            "responses": self.responses,
+            "throttled": self.throttled,
+            "failures": self.failures,
+            "latency_decreases": self.latency_decreases,
+            "ttfb_fast": round(self.ttfb_fast, 4) if self.ttfb_fast is not None else None,
+            "ttfb_baseline": round(self.ttfb_slow, 4) if self.ttfb_slow is not None else None,
+            "seconds_waited": round(self.waited, 3)
+        }
+
+# Per-host token bucket whose refill rate is steered by AIMD: healthy responses
+# with a flat TTFB raise it, 429/503, failed requests and TTFB spikes cut it.
+# Retry-After pauses the host until the given time and Crawl-delay caps the rate.
+class RateController:
+    def __init__(self, initial_rate=RATE_INITIAL):
+        self.initial_rate = initial_rate
+        self._lock = threading.Lock()
+        self._hosts = {}
+
+    def _host(self, url):
+        host = host_of(url)
+        state = self._hosts.get(host)
+        if state is None:
+            state = self._hosts[host] = HostRate(self.initial_rate)
+        return state
+
+    def set_crawl_delay(self, url, seconds):
+        if not seconds or seconds <= 0:
+            return
+        with self._lock:
+            h = self._host(url)
+            h.crawl_delay = seconds
+            h.max_rate = min(RATE_MAX, 1.0 / seconds)
+            h.rate = min(h.rate, h.max_rate)
+            h.burst = 1.0
+
+    def acquire(self, url, sleep=time.sleep):
+        while True:
+            with self._lock:
+                h = self._host(url)
+                now = time.time()
+                h.tokens = min(h.burst, h.tokens + (now - h.updated) * h.rate)
+                h.updated = now
+                delay = max(h.resume_at - now, (1.0 - h.tokens) / h.rate)
+                if delay <= 0:
+                    h.tokens -= 1.0
+                    return
+                h.waited += delay
+            sleep(delay)
+
+    def _decrease(self, h, now):
+        h.slow_start = False
+        if now - h.last_decrease < max(DECREASE_COOLDOWN, h.ttfb_slow or 0.0):
+            return False
+        h.rate = max(RATE_MIN, h.rate * RATE_DECREASE)
+        h.last_decrease = now
+        return True
+
+    # `status_code` is None when the request itself failed (timeout, reset).
+    def record(self, url, status_code, ttfb=None, headers=None):
+        with self._lock:
+            h = self._host(url)
+            now = time.time()
+            if status_code is None:
+                h.failures += 1
+                self._decrease(h, now)
+                return
+            h.responses += 1
+            if status_code in THROTTLE_STATUS_CODES:
+                h.throttled += 1
+                self._decrease(h, now)
+                retry_after = parse_retry_after((headers or {}).get('Retry-After'), now)
+                h.resume_at = max(h.resume_at, now + (retry_after if retry_after is not None else 1.0 / h.rate))
+                return
+            if ttfb is not None:
+                if h.ttfb_fast is None:
+                    h.ttfb_fast = h.ttfb_slow = ttfb
+                else:
+                    h.ttfb_fast += LATENCY_FAST_ALPHA * (ttfb - h.ttfb_fast)
+                    h.ttfb_slow += LATENCY_SLOW_ALPHA * (ttfb - h.ttfb_slow)
+                if (h.responses > LATENCY_WARMUP and h.ttfb_fast > h.ttfb_slow * LATENCY_SPIKE_FACTOR
+                        and h.ttfb_fast - h.ttfb_slow > LATENCY_SPIKE_FLOOR):
+                    if self._decrease(h, now):
+                        h.latency_decreases += 1
+                    return
+            if status_code < 500:
+                h.rate = min(h.max_rate, h.rate * RATE_SLOW_START if h.slow_start else h.rate + RATE_INCREASE)
+
+    def stats(self):
+        with self._lock:
+            return {host: h.state() for host, h in sorted(self._hosts.items())}
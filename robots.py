@@ -0,0 +1,64 @@
+import re
+from urllib.parse import urlsplit
+
+def _compile_rule(pattern):
+    anchored = pattern.endswith("$")
+    if anchored:
+        pattern = pattern[:-1]
+    regex = ".*".join(re.escape(part) for part in pattern.split("*"))
+    return re.compile(regex + ("$" if anchored else ""))
+
+def _parse_groups(robots_txt):
+    groups = []
+    agents, rules, delay = [], [], None
+    for raw in (robots_txt or "").splitlines():
+        line = raw.split("#", 1)[0].strip()
+        if ":" not in line:
+            continue
+        key, value = (part.strip() for part in line.split(":", 1))
+        key = key.lower()
+        if key == "user-agent":
+            if rules or delay is not None:
+                groups.append((agents, rules, delay))
+                agents, rules, delay = [], [], None
+            agents.append(value.lower())
+        elif key in ("allow", "disallow") and agents:
+            rules.append((key == "allow", value))
+        elif key == "crawl-delay" and agents:
+            try:
+                delay = float(value)
+            except ValueError:
+                pass
+    if agents:
+        groups.append((agents, rules, delay))
+    return groups
+
+# robots.txt rules for one user agent, compiled once. Follows RFC 9309: the
+# groups naming the most specific matching agent token apply (falling back to
+# "*"), the longest matching rule wins and Allow wins a tie. `*` matches any
+# run of characters and a trailing `$` anchors the end of the path.
+class RobotsMatcher:
+    def __init__(self, robots_txt="", user_agent="*"):
+        agent = user_agent.lower()
+        groups = _parse_groups(robots_txt)
+        best = max((len(a) for agents, _, _ in groups for a in agents if a != "*" and a in agent), default=0)
+        if best:
+            selected = [g for g in groups if any(a != "*" and a in agent and len(a) == best for a in g[0])]
+        else:
+            selected = [g for g in groups if "*" in g[0]]
+
+        self.crawl_delay = next((delay for _, _, delay in selected if delay is not None), None)
+        rules = [(allow, pattern) for _, group_rules, _ in selected for allow, pattern in group_rules if pattern]
+        rules.sort(key=lambda rule: (-len(rule[1]), not rule[0]))
+        self._rules = [(allow, _compile_rule(pattern)) for allow, pattern in rules]
+
+    def __len__(self):
+        return len(self._rules)
+
+    def allowed(self, url):
+        parts = urlsplit(url)
+        path = (parts.path or "/") + (f"?{parts.query}" if parts.query else "")
+        for allow, regex in self._rules:
+            if regex.match(path):
+                return allow
+        return True
@@ -0,0 +1,240 @@
+import bisect
+import re
+import threading
+import time
+from array import array
+from collections import Counter, namedtuple
+
+import numpy as np
+
+# Text of each searchable field of a page record.
+SEARCH_FIELDS = {
+    "title": lambda url, record: record.get("title") or "",
+    "h1": lambda url, record: " ".join(record.get("h1_tags") or []),
+    "description": lambda url, record: record.get("meta_description") or "",
+    "url": lambda url, record: url,
+    "text": lambda url, record: record.get("text_content") or "",
+}
+
+# A page's score is the weighted sum of its BM25 score in each field searched.
+FIELD_WEIGHTS = {"title": 3.0, "h1": 2.0, "description": 1.5, "url": 1.0, "text": 1.0}
+
+BM25_K1 = 1.2
+
+BM25_B = 0.75
+
+# Term frequencies are stored as 16-bit counts; BM25 saturates long before.
+MAX_TERM_FREQUENCY = 0xFFFF
+
+PREFIX_EXPANSION_LIMIT = 50
+
+# Phrases are matched on the indexed terms first and then checked against the
+# page text, best candidates first; at most this many are checked per query.
+PHRASE_CHECK_LIMIT = 2000
+
+TOKEN_RE = re.compile(r"\w+")
+
+QUERY_RE = re.compile(r'(?:(\w+):)?(?:"([^"]*)"?|(\S+))')
+
+def tokenize(text):
+    return TOKEN_RE.findall(text.lower())
+
+# One part of a query: its terms must all occur in one of `fields`, next to each
+# other when `phrase` is set. With `prefix` the last term matches any indexed
+# term it starts.
+Clause = namedtuple("Clause", ["fields", "terms", "phrase", "prefix"])
+
+# Query syntax: plain words (all must match), "quoted phrases", a trailing * for
+# a prefix, and field filters such as title:seo or h1:"getting started".
+# Unquoted words that split into several terms (state-of-the-art) are phrases.
+def parse_query(query, fields=None):
+    default_fields = tuple(fields or SEARCH_FIELDS)
+    unknown = [f for f in default_fields if f not in SEARCH_FIELDS]
+    if unknown:
+        raise ValueError(f"Unknown search fields {unknown}; expected some of {', '.join(SEARCH_FIELDS)}")
+    clauses = []
+    for m in QUERY_RE.finditer(query or ""):
+        field, quoted, word = m.groups()
+        if field is not None and field.lower() not in SEARCH_FIELDS:
+            word = m.group(0)
+            field = quoted = None
+        text = quoted if quoted is not None else word
+        prefix = quoted is None and text.endswith("*")
+        terms = tokenize(text)
+        if not terms:
+            continue
+        clauses.append(Clause((field.lower(),) if field else default_fields, tuple(terms),
+                              quoted is not None or len(terms) > 1, prefix))
+    return clauses
+
+def _contains(tokens, terms, prefix):
+    n = len(terms)
+    for i in range(len(tokens) - n + 1):
+        if tokens[i:i + n - 1] == list(terms[:-1]):
+            last = tokens[i + n - 1]
+            if last == terms[-1] or (prefix and last.startswith(terms[-1])):
+                return True
+    return False
+
+# The best `k` of `docs` by score, ties broken by page id. Only the pages
+# scoring at least the k-th best score are sorted.
+def _top(docs, scores, k):
+    if len(docs) > k > 0:
+        kth = np.partition(scores[docs], len(docs) - k)[len(docs) - k]
+        docs = docs[scores[docs] >= kth]
+    docs = docs[np.lexsort((docs, -scores[docs]))]
+    return docs[:k]
+
+# Inverted index over page records: per field, term -> (page ids, term counts)
+# in array-backed posting lists, with BM25 ranking. Pages can be added while
+# the index is being searched; adding a URL again replaces its page.
+class SearchIndex:
+    def __init__(self, k1=BM25_K1, b=BM25_B):
+        self.k1 = k1
+        self.b = b
+        self.complete = False
+        self._lock = threading.Lock()
+        self._ids = {}
+        self._urls = []
+        self._titles = []
+        self._live = bytearray()
+        self._postings = {field: {} for field in SEARCH_FIELDS}
+        self._lengths = {field: array('I') for field in SEARCH_FIELDS}
+        self._total_length = dict.fromkeys(SEARCH_FIELDS, 0)
+        self._norms = {}
+        self._vocabulary = []
+        self._vocabulary_size = 0
+
+    def __len__(self):
+        with self._lock:
+            return len(self._ids)
+
+    def add(self, url, record):
+        if not isinstance(record, dict):
+            return
+        counts = {field: Counter(tokenize(extract(url, record))) for field, extract in SEARCH_FIELDS.items()}
+        with self._lock:
+            previous = self._ids.get(url)
+            if previous is not None:
+                self._live[previous] = 0
+                for field in SEARCH_FIELDS:
+                    self._total_length[field] -= self._lengths[field][previous]
+            doc = self._ids[url] = len(self._urls)
+            self._urls.append(url)
+            self._titles.append(record.get("title") or "")
+            self._live.append(1)
+            for field, terms in counts.items():
+                length = sum(terms.values())
+                self._lengths[field].append(length)
+                self._total_length[field] += length
+                postings = self._postings[field]
+                for term, tf in terms.items():
+                    posting = postings.get(term)
+                    if posting is None:
+                        posting = postings[term] = (array('I'), array('H'))
+                    posting[0].append(doc)
+                    posting[1].append(min(tf, MAX_TERM_FREQUENCY))
+
+    def add_all(self, pages):
+        for url, record in pages:
+            self.add(url, record)
+        self.complete = True
+
+    def _expand(self, term, prefix):
+        if not prefix:
+            return [term]
+        size = sum(len(p) for p in self._postings.values())
+        if size != self._vocabulary_size:
+            self._vocabulary = sorted(set().union(*self._postings.values()))
+            self._vocabulary_size = size
+        start = bisect.bisect_left(self._vocabulary, term)
+        terms = []
+        for candidate in self._vocabulary[start:start + PREFIX_EXPANSION_LIMIT]:
+            if not candidate.startswith(term):
+                break
+            terms.append(candidate)
+        return terms
+
+    # BM25 length normalization of every page in a field, kept until pages are
+    # added. The average length is over the live pages, whose lengths alone
+    # make up _total_length.
+    def _norm(self, field, n):
+        cached = self._norms.get(field)
+        if cached is None or len(cached) != n:
+            lengths = np.frombuffer(self._lengths[field], dtype=np.uint32)[:n].astype(float)
+            average = self._total_length[field] / max(1, len(self._ids))
+            cached = self._norms[field] = self.k1 * (1 - self.b + self.b * lengths / max(1.0, average))
+        return cached
+
+    # Matches and BM25 score of every page for one clause, as arrays over page
+    # ids. Replaced pages stay in the posting lists, so document frequencies
+    # count only the `live` ones.
+    def _score_clause(self, clause, live):
+        n = len(live)
+        live_count = len(self._ids)
+        matched = np.zeros(n, dtype=bool)
+        scores = np.zeros(n)
+        for field in clause.fields:
+            postings = self._postings[field]
+            norm = self._norm(field, n)
+            field_matched = np.ones(n, dtype=bool)
+            field_scores = np.zeros(n)
+            for i, term in enumerate(clause.terms):
+                term_matched = np.zeros(n, dtype=bool)
+                for expanded in self._expand(term, clause.prefix and i == len(clause.terms) - 1):
+                    posting = postings.get(expanded)
+                    if posting is None:
+                        continue
+                    docs = np.frombuffer(posting[0], dtype=np.uint32).copy()
+                    tfs = np.frombuffer(posting[1], dtype=np.uint16).astype(float)
+                    frequency = int(np.count_nonzero(live[docs]))
+                    idf = np.log(1 + (live_count - frequency + 0.5) / (frequency + 0.5))
+                    term_matched[docs] = True
+                    field_scores[docs] += FIELD_WEIGHTS[field] * idf * tfs * (self.k1 + 1) / (tfs + norm[docs])
+                field_matched &= term_matched
+            matched |= field_matched
+            scores += np.where(field_matched, field_scores, 0.0)
+        return matched, scores
+
+    # Ranked URLs for a query. Phrase clauses are checked on the candidates'
+    # records, loaded with fetch(url); without fetch any order of the terms
+    # matches. When a phrase query stops checking early, "total" counts the
+    # unchecked candidates too and "total_exact" is false.
+    def search(self, query, fields=None, offset=0, limit=20, fetch=None):
+        start = time.perf_counter()
+        clauses = parse_query(query, fields)
+        with self._lock:
+            live = np.frombuffer(bytes(self._live), dtype=np.uint8).astype(bool)
+            matched = live.copy()
+            scores = np.zeros(len(live))
+            for clause in clauses:
+                clause_matched, clause_scores = self._score_clause(clause, live)
+                matched &= clause_matched
+                scores += clause_scores
+        docs = np.flatnonzero(matched) if clauses else np.zeros(0, dtype=np.int64)
+        total, total_exact = len(docs), True
+        phrases = [c for c in clauses if c.phrase]
+        docs = _top(docs, scores, PHRASE_CHECK_LIMIT if phrases and fetch is not None else offset + limit)
+        if phrases and fetch is not None:
+            checked = []
+            for i, doc in enumerate(docs.tolist()):
+                if len(checked) >= offset + limit:
+                    total, total_exact = len(checked) + total - i, False
+                    break
+                url = self._urls[doc]
+                record = fetch(url) or {}
+                if all(any(_contains(tokenize(SEARCH_FIELDS[f](url, record)), c.terms, c.prefix) for f in c.fields)
+                       for c in phrases):
+                    checked.append(doc)
+            else:
+                total_exact = total == len(docs)
+                total = len(checked) + total - len(docs)
+            docs = checked
+
+        return {
+            "results": [{"url": self._urls[d], "title": self._titles[d], "score": round(float(scores[d]), 4)}
+                        for d in docs[offset:offset + limit]],
+            "total": total,
+            "total_exact": total_exact,
+            "took_ms": round((time.perf_counter() - start) * 1000, 2),
+        }
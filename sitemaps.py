@@ -0,0 +1,125 @@
+import heapq
+import zlib
+from collections import deque, namedtuple
+from xml.etree.ElementTree import XMLPullParser
+
+SITEMAP_CHUNK_SIZE = 64 * 1024
+
+SITEMAP_TIMEOUT = 15
+
+# Upper bounds on what one crawl reads from sitemaps: entries kept and sitemap
+# files fetched (an index can point at thousands of child sitemaps).
+SITEMAP_MAX_URLS = 100000
+
+SITEMAP_MAX_FILES = 50
+
+DEFAULT_PRIORITY = 0.5
+
+GZIP_MAGIC = b"\x1f\x8b"
+
+SitemapEntry = namedtuple("SitemapEntry", ["loc", "lastmod", "priority"])
+
+def _local_name(tag):
+    return tag.rsplit("}", 1)[-1]
+
+def _priority(value):
+    try:
+        return min(1.0, max(0.0, float(value)))
+    except (TypeError, ValueError):
+        return DEFAULT_PRIORITY
+
+def _prepend(first, rest):
+    yield first
+    yield from rest
+
+# Sitemaps served as .xml.gz files (rather than with Content-Encoding: gzip,
+# which requests already undoes) are recognized by their magic bytes and
+# inflated at most `chunk_size` bytes at a time: sitemap XML compresses so well
+# that one compressed chunk can expand to megabytes.
+def _decompressed(chunks, chunk_size=SITEMAP_CHUNK_SIZE):
+    chunks = iter(chunks)
+    first = b""
+    for first in chunks:
+        if first:
+            break
+    if not first.startswith(GZIP_MAGIC):
+        yield first
+        yield from chunks
+        return
+    inflater = zlib.decompressobj(16 + zlib.MAX_WBITS)
+    for chunk in _prepend(first, chunks):
+        while chunk:
+            yield inflater.decompress(chunk, chunk_size)
+            chunk = inflater.unconsumed_tail
+    yield inflater.flush()
+
+# Incrementally parses one sitemap document from an iterable of byte chunks.
+# Yields ("url", SitemapEntry) for <urlset> entries and ("sitemap", loc) for
+# <sitemapindex> entries as soon as each element closes, then drops it from the
+# tree, so memory stays flat however large the file is.
+def parse_sitemap(chunks):
+    parser = XMLPullParser(events=("start", "end"))
+    root = None
+    for chunk in _decompressed(chunks):
+        parser.feed(chunk)
+        for event, el in parser.read_events():
+            if event == "start":
+                if root is None:
+                    root = el
+                continue
+            name = _local_name(el.tag)
+            if name not in ("url", "sitemap"):
+                continue
+            fields = {_local_name(child.tag): (child.text or "").strip() for child in el}
+            loc = fields.get("loc")
+            if loc and name == "url":
+                yield "url", SitemapEntry(loc, fields.get("lastmod", ""), _priority(fields.get("priority")))
+            elif loc:
+                yield "sitemap", loc
+            root.clear()
+    parser.close()
+
+# Follows sitemap indexes breadth first and yields every page entry.
+def iter_sitemap_entries(session, sitemap_urls, max_urls=SITEMAP_MAX_URLS, max_files=SITEMAP_MAX_FILES):
+    queue = deque(sitemap_urls)
+    seen = set()
+    count = 0
+    while queue and len(seen) < max_files:
+        url = queue.popleft()
+        if url in seen:
+            continue
+        seen.add(url)
+        try:
+            with session.get(url, stream=True, timeout=SITEMAP_TIMEOUT) as r:
+                if r.status_code != 200:
+                    print(f"Skipping sitemap {url}: HTTP {r.status_code}")
+                    continue
+                for kind, value in parse_sitemap(r.iter_content(SITEMAP_CHUNK_SIZE)):
+                    if kind == "sitemap":
+                        queue.append(value)
+                        continue
+                    yield value
+                    count += 1
+                    if count >= max_urls:
+                        return
+        except Exception as e:
+            print(f"Could not read sitemap {url}: {e}")
+
+# Reads every sitemap once. `normalize` maps a <loc> to the URL the crawler
+# would use, or None to skip it (e.g. another host). Returns the set of sitemap
+# URLs and the `seed_limit` best entries, highest priority and then most
+# recently modified first, without holding the remaining entries in memory.
+def read_sitemaps(session, sitemap_urls, normalize, seed_limit, max_urls=SITEMAP_MAX_URLS):
+    urls = set()
+    heap = []
+    for entry in iter_sitemap_entries(session, sitemap_urls, max_urls):
+        url = normalize(entry.loc)
+        if not url or url in urls:
+            continue
+        urls.add(url)
+        item = (entry.priority, entry.lastmod, -len(urls), entry._replace(loc=url))
+        if len(heap) < seed_limit:
+            heapq.heappush(heap, item)
+        elif heap and item > heap[0]:
+            heapq.heapreplace(heap, item)
+    return urls, [item[-1] for item in sorted(heap, reverse=True)]
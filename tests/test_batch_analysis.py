@@ -0,0 +1,106 @@
+import json
+import threading
+import time
+from types import SimpleNamespace
+
+import anthropic
+import httpx
+import pytest
+
+API_URL = "https://api.anthropic.com/v1/messages"
+
+# Stands in for the Anthropic client: each call takes `latency` seconds, and
+# URLs listed in `rate_limited` get one 429 with a Retry-After header first.
+class StubClient:
+    def __init__(self, latency=0.05, rate_limited=(), retry_after=0.2, error=None):
+        self.latency = latency
+        self.rate_limited = set(rate_limited)
+        self.retry_after = retry_after
+        self.error = error
+        self.lock = threading.Lock()
+        self.active = 0
+        self.max_active = 0
+        self.calls = []
+        self.messages = SimpleNamespace(create=self.create)
+
+    def create(self, **kwargs):
+        payload = kwargs["messages"][0]["content"]
+        url = next(u for u in self.urls if json.dumps(u) in payload)
+        with self.lock:
+            self.active += 1
+            self.max_active = max(self.max_active, self.active)
+            self.calls.append((url, time.time()))
+        try:
+            time.sleep(self.latency)
+            if self.error is not None:
+                raise self.error
+            if url in self.rate_limited:
+                self.rate_limited.discard(url)
+                response = httpx.Response(429, headers={"retry-after": str(self.retry_after)},
+                                          request=httpx.Request("POST", API_URL))
+                raise anthropic.RateLimitError("rate limited", response=response, body=None)
+            return SimpleNamespace(content=[SimpleNamespace(text=f"Analysis of {url}")],
+                                   usage=SimpleNamespace(input_tokens=10, output_tokens=5))
+        finally:
+            with self.lock:
+                self.active -= 1
+
+@pytest.fixture
+def server(tmp_path, monkeypatch):
+    monkeypatch.setenv("ANTHROPIC_API_KEY", "test-key")
+    monkeypatch.chdir(tmp_path)
+    import anthropic_api
+    import flask_server
+    from analysis_cache import AnalysisCache
+
+    monkeypatch.setattr(anthropic_api, "analysis_cache", AnalysisCache(str(tmp_path / "analysis_cache.sqlite")))
+    original = anthropic_api.anthropic
+    pages = {f"https://example.com/p{i}": {"url": f"https://example.com/p{i}", "title": f"Page {i}", "text_content": "words " * 20}
+             for i in range(6)}
+    flask_server.attach_data(pages)
+
+    def use(client):
+        client.urls = list(pages)
+        anthropic_api.set_client(client)
+        return flask_server.app.test_client()
+
+    yield SimpleNamespace(use=use, urls=list(pages))
+    anthropic_api.set_client(original)
+
+def post_batch(client, body):
+    response = client.post("/api/analyze/batch", json=body)
+    assert response.mimetype == "application/x-ndjson"
+    return [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+
+def test_batch_streams_results_within_concurrency_and_honours_retry_after(server):
+    stub = StubClient(rate_limited=[server.urls[0]])
+    lines = post_batch(server.use(stub), {"urls": server.urls, "concurrency": 2})
+
+    results, summary = lines[:-1], lines[-1]
+    assert summary == {"done": True, "total": 6, "errors": 0, "cached": 0}
+    assert sorted(r["url"] for r in results) == server.urls
+    assert all(r["analysis"] == f"Analysis of {r['url']}" for r in results)
+    assert stub.max_active <= 2
+
+    attempts = [at for url, at in stub.calls if url == server.urls[0]]
+    assert len(attempts) == 2
+    assert attempts[1] - attempts[0] >= stub.latency + stub.retry_after - 0.01
+
+    again = post_batch(server.use(StubClient()), {"urls": server.urls[:2]})
+    assert again[-1]["cached"] == 2
+
+def test_batch_does_not_retry_errors_without_a_status(server):
+    stub = StubClient(error=ValueError("bad payload"))
+    lines = post_batch(server.use(stub), {"urls": server.urls[:2]})
+
+    assert lines[-1]["errors"] == 2
+    assert len(stub.calls) == 2
+
+def test_connection_errors_are_retried():
+    from anthropic_api import AnthropicAPIError
+    from batch_analysis import is_retryable
+
+    assert is_retryable(AnthropicAPIError("timed out", connection_error=True))
+    assert is_retryable(AnthropicAPIError("overloaded", status_code=529))
+    assert not is_retryable(AnthropicAPIError("bad request", status_code=400))
+    assert not is_retryable(AnthropicAPIError("unexpected"))
@@ -0,0 +1,65 @@
+import pytest
+
+import app
+import distributed
+from benchmark import SyntheticSite, serve_site
+
+@pytest.fixture
+def site():
+    server, start_url = serve_site(SyntheticSite(pages=120, fanout=6, html_kb=4, words=150, broken=0.02, redirects=0.03))
+    yield start_url
+    server.shutdown()
+    server.server_close()
+
+def crawl_options():
+    return {"analysis_profile": "full", "seed_from_sitemaps": False, "check_links": False, "metrics_file": None}
+
+def test_workers_crawl_the_same_site_as_one_process(site, tmp_path):
+    single = dict(app.crawl_site(site, 1000, **crawl_options()))
+    out_file = tmp_path / "links.json"
+    distributed.crawl_site_distributed(site, 1000, workers=3, work_dir=str(tmp_path / "shards"), filename=str(out_file),
+                                       **crawl_options())
+    merged = dict(distributed.iter_json_object(str(out_file)))
+
+    assert set(merged) == set(single)
+    assert not [url for url, record in merged.items() if record.get("error") and not single[url].get("error")]
+    for field in ("in_degree", "out_degree", "depth", "is_orphan"):
+        assert {url: r.get(field) for url, r in merged.items()} == {url: r.get(field) for url, r in single.items()}
+
+def test_merge_keeps_the_record_of_the_worker_that_completed_the_page(tmp_path):
+    url = "http://127.0.0.1:1/"
+    frontier = distributed.SharedFrontier(str(tmp_path / distributed.FRONTIER_FILE), shards=2)
+    frontier.set_meta("start_url", url)
+    frontier.add([(url, 0)])
+
+    # Worker 1 crawls the page and dies before completing it; once its lease
+    # expires worker 0 crawls the page again and completes it.
+    assert frontier.claim("1:100", 1, 1, lease_seconds=0) == [(url, 0, url)]
+    writer = distributed.CheckpointWriter(distributed.partial_file(str(tmp_path), 1))
+    writer.write({"url": url, "title": "stale", "depth": 0}, [])
+    writer.close()
+    assert frontier.claim("0:200", 0, 1) == [(url, 0, url)]
+    writer = distributed.CheckpointWriter(distributed.partial_file(str(tmp_path), 0))
+    writer.write({"url": url, "title": "fresh", "depth": 0}, [])
+    writer.close()
+    frontier.complete(url, [], "0:200")
+    frontier.close()
+
+    out_file = tmp_path / "links.json"
+    distributed.merge_partials(str(tmp_path), str(out_file), check_links=False, metrics_file=None)
+    assert dict(distributed.iter_json_object(str(out_file)))[url]["title"] == "fresh"
+
+def test_frontier_admits_candidates_beyond_the_page_budget(tmp_path):
+    frontier = distributed.SharedFrontier(str(tmp_path / distributed.FRONTIER_FILE), shards=2, max_size=6, max_pages=3)
+    frontier.add([(f"http://h/{i}", 1) for i in range(4)])
+    frontier.add([(f"http://h/{i}", 1) for i in range(2, 10)])
+    assert frontier.get_meta("admitted") == 6
+    assert frontier._conn.execute("SELECT COUNT(*) FROM urls").fetchone()[0] == 6
+
+    claimed = frontier.claim("0:1", 0, 10) + frontier.claim("1:2", 1, 10)
+    assert len(claimed) == 3
+    assert not frontier.finished()
+    for url, _, _ in claimed:
+        frontier.complete(url, [], "0:1")
+    assert frontier.finished()
+    frontier.close()
@@ -0,0 +1,40 @@
+from downloads import read_html_body
+
+class FakeResponse:
+    def __init__(self, body, content_type="text/html; charset=utf-8", encoding="utf-8", chunk=10):
+        self.headers = {"content-type": content_type} if content_type is not None else {}
+        self.encoding = encoding
+        self.body = body
+        self.chunk = chunk
+        self.read = 0
+        self.closed = False
+
+    def iter_content(self, chunk_size):
+        for i in range(0, len(self.body), self.chunk):
+            self.read += 1
+            yield self.body[i:i + self.chunk]
+
+    def close(self):
+        self.closed = True
+
+def test_truncation_flag_marks_bodies_cut_by_size_or_time():
+    page = b"<html>" + b"x" * 94
+    body = read_html_body(FakeResponse(page), max_bytes=100)
+    assert (body.text, body.bytes_read, body.truncated) == (page.decode(), 100, False)
+
+    response = FakeResponse(page * 10)
+    body = read_html_body(response, max_bytes=100)
+    assert (body.text, body.bytes_read, body.truncated) == (page.decode(), 100, True)
+    assert response.read == 11 and response.closed
+
+    body = read_html_body(FakeResponse(page), time_budget=-1)
+    assert (body.bytes_read, body.truncated) == (10, True)
+
+def test_non_html_is_not_downloaded():
+    response = FakeResponse(b"%PDF-1.4" * 100, content_type="application/pdf")
+    assert read_html_body(response) is None
+    assert response.read == 0 and response.closed
+    response = FakeResponse(b"\x89PNG\r\n" * 100, content_type=None)
+    assert read_html_body(response) is None
+    assert response.read == 1 and response.closed
+    assert read_html_body(FakeResponse(b"  <!doctype html><p>hi", content_type=None, chunk=1024)).text == "  <!doctype html><p>hi"
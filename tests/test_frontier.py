@@ -0,0 +1,24 @@
+from frontier import Frontier, canonicalize_url
+
+def test_canonical_url_is_the_key_and_the_linked_url_is_fetched():
+    linked = "http://Example.com:80/search/?q&tag=a+b&utm_source=x#top"
+    key = canonicalize_url(linked)
+    assert key == "http://example.com/search?q=&tag=a%20b"
+
+    frontier = Frontier()
+    assert frontier.add(key, 1, linked)
+    assert not frontier.add(canonicalize_url("http://example.com/search?tag=a%20b&q="), 1, "http://example.com/search?tag=a%20b&q=")
+    assert frontier.pop() == (key, 1, linked)
+
+def test_links_ordering_prefers_most_linked_and_only_tracks_queued_urls():
+    frontier = Frontier("links", max_size=3)
+    for url in ("a", "b", "c"):
+        frontier.add(url, 1)
+    for _ in range(5):
+        frontier.add("c", 2)
+    for i in range(1000):
+        frontier.add(f"outside-{i % 10}", 1)
+        frontier.add("b", 2)
+    assert len(frontier._inlinks) == 3
+    assert len(frontier._heap) <= 2 * len(frontier) + 64
+    assert [frontier.pop()[0] for _ in range(3)] == ["b", "c", "a"]
@@ -0,0 +1,29 @@
+import json
+
+from graph_export import GRAPH_FORMAT_VERSION, write_graph_file
+
+def test_graph_file_interns_urls_and_keeps_columns_aligned(tmp_path):
+    pages = [
+        ("http://example.com/", {"title": "Home", "status_code": 200, "depth": 0, "word_count": 100,
+                                 "internal_links": ["http://example.com/a", "http://example.com/gone"],
+                                 "images_without_alt": ["x.png", "y.png"], "semantic_elements": {"main": 1},
+                                 "layout": {"x": 0.5, "y": -1.0}}),
+        ("http://example.com/a", {"title": "A", "status_code": 200, "depth": 1, "word_count": 300,
+                                  "internal_links": ["http://example.com/"], "click_parent": "http://example.com/"}),
+        ("http://example.com/broken", "not a record"),
+    ]
+    filename = tmp_path / "graph.json"
+    graph = write_graph_file(pages, filename)
+    assert json.loads(filename.read_text(encoding="utf-8")) == graph
+    assert graph["version"] == GRAPH_FORMAT_VERSION
+    assert graph["urls"] == ["http://example.com/", "http://example.com/a", "http://example.com/gone", "http://example.com/broken"]
+    assert graph["edges"] == {"source": [0, 0, 1], "target": [1, 2, 0]}
+    nodes = graph["nodes"]
+    assert all(len(column) == 4 for column in nodes.values())
+    assert nodes["title"] == ["Home", "A", None, None]
+    assert nodes["images_without_alt"] == [2, 0, None, None]
+    assert nodes["has_main"] == [True, False, None, None]
+    assert nodes["click_parent"] == [None, 0, None, None]
+    assert nodes["layout"] == [[0.5, -1.0], None, None, None]
+    assert graph["scorecard"]["totalPages"] == 3
+    assert graph["scorecard"]["average_word_count"] == 400 / 3
@@ -0,0 +1,24 @@
+import numpy as np
+
+import app
+from graph_layout import compute_graph_layout
+
+def _chain(n):
+    urls = [f"http://example.com/p{i}" for i in range(n)]
+    return urls, {url: urls[i + 1:i + 2] for i, url in enumerate(urls)}
+
+def test_layout_is_deterministic_and_keeps_linked_pages_close():
+    urls, out_edges = _chain(120)
+    layout = compute_graph_layout(urls, out_edges)
+    assert layout == compute_graph_layout(urls, out_edges)
+    pos = np.array([[layout[url]["x"], layout[url]["y"]] for url in urls])
+    linked = np.sqrt(((pos[1:] - pos[:-1]) ** 2).sum(axis=1))
+    assert abs(np.median(linked) - 1.0) < 0.01
+    assert np.sqrt(((pos[0] - pos[-1]) ** 2).sum()) > 5 * np.median(linked)
+
+def test_layout_is_skipped_above_the_page_cutoff(monkeypatch):
+    urls, out_edges = _chain(5)
+    result = app.CrawlResult(urls[0], urls, {}, out_edges, {}, {}, set(), {}, {})
+    assert all("layout" in fields for fields in app.site_annotations(result).values())
+    monkeypatch.setattr(app, "LAYOUT_MAX_PAGES", 4)
+    assert not any("layout" in fields for fields in app.site_annotations(result).values())
@@ -0,0 +1,20 @@
+import numpy as np
+
+from graph_metrics import PAGERANK_DAMPING, build_link_graph, compute_graph_metrics, pagerank
+
+def test_pagerank_of_a_three_node_graph_matches_the_linear_solution():
+    graph = build_link_graph(["a", "b", "c"], {"a": ["b", "c"], "b": ["c"], "c": ["a"]})
+    d = PAGERANK_DAMPING
+    # r = (1 - d) / 3 + d * M r, with M[i, j] the share of j's rank passed to i.
+    m = np.array([[0, 0, 1], [0.5, 0, 0], [0.5, 1, 0]])
+    expected = np.linalg.solve(np.eye(3) - d * m, np.full(3, (1 - d) / 3))
+    assert np.allclose(pagerank(graph), expected, atol=1e-9)
+    assert np.allclose(expected, [0.3877897, 0.2148106, 0.3973997])
+
+def test_graph_metrics_depths_and_components():
+    metrics = compute_graph_metrics(["a", "b", "c", "d"], {"a": ["b", "c", "a"], "b": ["c"], "c": ["a"], "d": ["a"]}, "a")
+    assert [metrics[u]["click_depth"] for u in "abcd"] == [0, 1, 1, None]
+    assert metrics["c"]["click_parent"] == "a"
+    assert [metrics[u]["scc_size"] for u in "abcd"] == [3, 3, 3, 1]
+    assert metrics["d"]["pagerank"] == round(0.15 / 4, 8)
+    assert abs(sum(m["pagerank"] for m in metrics.values()) - 1) < 1e-6
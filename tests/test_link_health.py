@@ -0,0 +1,59 @@
+import threading
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from link_health import build_check_session, check_urls
+
+class Handler(BaseHTTPRequestHandler):
+    hits = Counter()
+
+    def _respond(self, body):
+        Handler.hits[(self.command, self.path)] += 1
+        if self.path == "/no-head" and self.command == "HEAD":
+            status = 405
+        elif self.path == "/moved":
+            self.send_response(301)
+            self.send_header("Location", "/ok")
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        else:
+            status = {"/ok": 200, "/no-head": 200, "/error": 500}.get(self.path, 404)
+        self.send_response(status)
+        self.send_header("Content-Length", "2")
+        self.end_headers()
+        if body:
+            self.wfile.write(b"ok")
+
+    def do_HEAD(self):
+        self._respond(False)
+
+    def do_GET(self):
+        self._respond(True)
+
+    def log_message(self, *args):
+        pass
+
+@pytest.fixture
+def server():
+    Handler.hits.clear()
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=httpd.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{httpd.server_address[1]}"
+    httpd.shutdown()
+    httpd.server_close()
+
+def test_head_falls_back_to_get_without_retries(server):
+    urls = [server + path for path in ("/ok", "/no-head", "/moved", "/error", "/missing")]
+    results = check_urls(urls, build_check_session(4), concurrency=4)
+    assert results[server + "/ok"] == {"status_code": 200, "ok": True}
+    assert results[server + "/no-head"] == {"status_code": 200, "ok": True}
+    assert results[server + "/moved"]["redirect_statuses"] == [301]
+    assert results[server + "/moved"]["final_url"] == server + "/ok"
+    assert results[server + "/error"] == {"status_code": 500, "ok": False}
+    assert results[server + "/missing"] == {"status_code": 404, "ok": False}
+    assert Handler.hits[("HEAD", "/no-head")] == Handler.hits[("GET", "/no-head")] == 1
+    assert Handler.hits[("HEAD", "/error")] == Handler.hits[("GET", "/error")] == 1
+    assert ("GET", "/ok") not in Handler.hits
@@ -0,0 +1,25 @@
+import random
+
+from near_duplicates import near_duplicate_clusters, simhash, simhash_hex
+
+def test_simhash_clusters_near_duplicates_only():
+    text = " ".join(f"word{i}" for i in range(300))
+    assert simhash(text) == simhash(text.upper())
+    assert simhash_hex("") == ""
+    clusters = near_duplicate_clusters({
+        "http://example.com/b": simhash_hex(text + " footer"),
+        "http://example.com/a": simhash_hex(text),
+        "http://example.com/c": simhash_hex("a completely different page about something else entirely"),
+        "http://example.com/d": "",
+    })
+    assert clusters == {"http://example.com/a": "http://example.com/a", "http://example.com/b": "http://example.com/a",
+                        "http://example.com/c": None, "http://example.com/d": None}
+
+def test_oversized_buckets_still_find_neighbours():
+    rng = random.Random(0)
+    shared_band = rng.getrandbits(16)
+    fingerprints = {f"u{i:04d}": (rng.getrandbits(48) << 16) | shared_band for i in range(2000)}
+    fingerprints["near"] = fingerprints["u0007"] ^ (1 << 40)
+    clusters = near_duplicate_clusters(fingerprints, bucket_limit=50)
+    assert clusters["near"] == clusters["u0007"] == "near"
+    assert sum(1 for c in clusters.values() if c) == 2
@@ -0,0 +1,56 @@
+import os
+import subprocess
+import sys
+import textwrap
+
+REPO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# NLTK corpora load lazily, so this runs in a fresh interpreter where only the
+# NLTK module and its data lookup are ready and no corpus has been read yet.
+THREADED_FIRST_USE = textwrap.dedent("""
+    import threading
+    import nlp
+
+    nlp._nltk()
+    errors = []
+    barrier = threading.Barrier(16)
+
+    def use():
+        barrier.wait()
+        try:
+            nlp.english_stopwords()
+        except Exception as e:
+            errors.append(repr(e))
+
+    threads = [threading.Thread(target=use) for _ in range(16)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    print(errors)
+""")
+
+def test_stopwords_load_once_when_first_used_on_many_threads():
+    result = subprocess.run([sys.executable, "-c", THREADED_FIRST_USE], cwd=REPO, capture_output=True, text=True, timeout=300)
+    assert result.returncode == 0, result.stderr
+    assert result.stdout.strip().splitlines()[-1] == "[]"
+
+def test_failed_nltk_download_is_not_retried(tmp_path, monkeypatch):
+    import nltk
+    import nlp
+
+    downloads = []
+    monkeypatch.setattr(nltk, "download", lambda package, quiet=False: downloads.append(package) or False)
+    monkeypatch.setattr(nlp, "NLTK_RESOURCES", (("no_such_corpus", "corpora/no_such_corpus"),))
+    monkeypatch.setattr(nlp, "NLTK_FAILED_DOWNLOADS_FILE", str(tmp_path / "failed.json"))
+    for _ in range(2):
+        nlp._nltk.cache_clear()
+        nlp._nltk()
+    nlp._nltk.cache_clear()
+    assert downloads == ["no_such_corpus"]
+
+def test_tokenizer_resources_are_the_ones_word_tokenize_reads():
+    import nlp
+
+    assert ("punkt_tab", "tokenizers/punkt_tab") in nlp.NLTK_RESOURCES
+    assert nlp.keyword_density("Crawlers crawl pages; pages link pages.")["pages"] > 0
@@ -0,0 +1,43 @@
+import json
+
+from page_records import PageRecordStore, search_text_of
+
+def _record(url, text, **extra):
+    record = {
+        "url": url,
+        "status_code": 200,
+        "title": "Page",
+        "internal_links": ["http://example.com/", "http://example.com/b"],
+        "external_links": [],
+        "text_content": text,
+        "search_text": search_text_of(text),
+        "text_hash": "abc",
+        "h1_tags": ("One", "Two"),
+        "structured": {"json_ld": [{"@type": "Article"}]},
+        "layout": None,
+        "depth": 1.5,
+    }
+    record.update(extra)
+    return record
+
+def test_records_round_trip_as_json_would():
+    store = PageRecordStore()
+    pages = {
+        "http://example.com/a": _record("http://example.com/a", "Hello  World"),
+        "http://example.com/b": _record("http://example.com/b", "hello world"),
+        "http://example.com/c": dict(_record("http://example.com/other", ""), search_text="stale"),
+        "http://example.com/d": {"error": "Timeout", "internal_links": ["x", 1]},
+    }
+    for url, record in pages.items():
+        store[url] = record
+    assert list(store) == list(pages)
+    for url, record in pages.items():
+        expected = json.loads(json.dumps(record))
+        assert store[url] == expected
+        assert list(store[url]) == list(record)
+    assert len(store.texts) == 2
+
+    store["http://example.com/a"] = {"url": "http://example.com/a", "title": "Replaced"}
+    del store["http://example.com/b"]
+    assert store["http://example.com/a"] == {"url": "http://example.com/a", "title": "Replaced"}
+    assert "http://example.com/b" not in store and len(store) == 3
@@ -0,0 +1,37 @@
+import pytest
+
+import rate_control
+from rate_control import RATE_DECREASE, RATE_INCREASE, RATE_SLOW_START, RateController, parse_retry_after
+
+URL = "http://example.com/page"
+
+def test_aimd_slow_start_then_halving_and_additive_increase():
+    rates = RateController(initial_rate=4.0)
+    rates.record(URL, 200)
+    assert rates.stats()["example.com"]["rate"] == pytest.approx(4.0 * RATE_SLOW_START, abs=1e-3)
+    rates.record(URL, 429, headers={"Retry-After": "30"})
+    rates.record(URL, 503)
+    state = rates.stats()["example.com"]
+    assert state["rate"] == pytest.approx(4.0 * RATE_SLOW_START * RATE_DECREASE, abs=1e-3)
+    assert not state["slow_start"] and state["throttled"] == 2
+    rates.record(URL, 200)
+    assert rates.stats()["example.com"]["rate"] == pytest.approx(4.0 * RATE_SLOW_START * RATE_DECREASE + RATE_INCREASE, abs=1e-3)
+
+    waits = []
+
+    def sleep(seconds):
+        waits.append(seconds)
+        rates._hosts["example.com"].resume_at = 0.0
+
+    rates.acquire(URL, sleep=sleep)
+    assert len(waits) == 1 and 29 < waits[0] <= 30
+
+def test_crawl_delay_caps_the_rate(monkeypatch):
+    rates = RateController(initial_rate=4.0)
+    rates.set_crawl_delay(URL, 2)
+    for _ in range(20):
+        rates.record(URL, 200)
+    assert rates.stats()["example.com"]["rate"] == 0.5
+    monkeypatch.setattr(rate_control.time, "time", lambda: 1000.0)
+    assert parse_retry_after("Thu, 01 Jan 1970 00:16:50 GMT") == 10.0
+    assert parse_retry_after("soon") is None
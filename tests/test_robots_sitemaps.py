@@ -0,0 +1,55 @@
+import gzip
+
+from robots import RobotsMatcher
+from sitemaps import parse_sitemap
+
+ROBOTS_TXT = """
+User-agent: *
+Disallow: /
+
+User-agent: MyCrawler
+Disallow: /private
+Allow: /private/*.html$
+Disallow: /*.pdf$
+Allow: /shop
+Disallow: /shop/
+Crawl-delay: 2
+"""
+
+def test_robots_longest_rule_wins_and_allow_breaks_ties():
+    robots = RobotsMatcher(ROBOTS_TXT, "MyCrawler")
+    assert robots.crawl_delay == 2
+    assert not robots.allowed("http://example.com/private/data.json")
+    assert robots.allowed("http://example.com/private/page.html")
+    assert not robots.allowed("http://example.com/private/page.html?x=1")
+    assert not robots.allowed("http://example.com/docs/report.pdf")
+    assert robots.allowed("http://example.com/docs/report.pdf.html")
+    assert robots.allowed("http://example.com/shop")
+    assert not robots.allowed("http://example.com/shop/cart")
+    assert robots.allowed("http://example.com/")
+
+    tie = RobotsMatcher("User-agent: *\nDisallow: /page\nAllow: /page\n")
+    assert tie.allowed("http://example.com/page")
+    assert not RobotsMatcher(ROBOTS_TXT, "OtherBot").allowed("http://example.com/shop")
+
+SITEMAP = b"""<?xml version="1.0" encoding="UTF-8"?>
+<urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">
+  <url><loc>http://example.com/a</loc><lastmod>2024-01-02</lastmod><priority>0.8</priority></url>
+  <url><loc>http://example.com/b</loc><priority>bad</priority></url>
+</urlset>"""
+
+INDEX = b"""<sitemapindex xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">
+  <sitemap><loc>http://example.com/sitemap-1.xml.gz</loc></sitemap>
+</sitemapindex>"""
+
+def _chunks(data, size=7):
+    return [data[i:i + size] for i in range(0, len(data), size)]
+
+def test_gzip_sitemap_is_parsed_in_chunks():
+    entries = list(parse_sitemap(_chunks(gzip.compress(SITEMAP))))
+    assert entries == list(parse_sitemap([SITEMAP]))
+    assert [(kind, e.loc, e.lastmod, e.priority) for kind, e in entries] == [
+        ("url", "http://example.com/a", "2024-01-02", 0.8),
+        ("url", "http://example.com/b", "", 0.5),
+    ]
+    assert list(parse_sitemap(_chunks(gzip.compress(INDEX)))) == [("sitemap", "http://example.com/sitemap-1.xml.gz")]
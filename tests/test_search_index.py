@@ -0,0 +1,32 @@
+from search_index import SearchIndex
+
+PAGES = {
+    "http://example.com/a": {"title": "Crawler guide", "text_content": "crawler crawler crawler basics"},
+    "http://example.com/b": {"title": "Sitemaps", "text_content": "a crawler reads sitemaps and robots files for every site"},
+    "http://example.com/c": {"title": "Robots", "text_content": "robots files tell a crawler what to skip"},
+    "http://example.com/d": {"title": "About", "text_content": "nothing to see here"},
+}
+
+def _index(pages):
+    index = SearchIndex()
+    index.add_all(pages.items())
+    return index
+
+def test_bm25_ranks_title_and_frequent_terms_first():
+    index = _index(PAGES)
+    results = index.search("crawler")
+    assert [r["url"] for r in results["results"]] == ["http://example.com/a", "http://example.com/c", "http://example.com/b"]
+    assert results["total"] == 3
+    assert [r["url"] for r in index.search("robots files")["results"]] == ["http://example.com/c", "http://example.com/b"]
+    assert index.search("title:sitemaps")["total"] == 1
+
+def test_replacing_a_page_scores_like_a_fresh_index():
+    index = _index(PAGES)
+    replacement = {"title": "About us", "text_content": "a much longer page about the crawler team " * 20}
+    index.add("http://example.com/a", {"title": "Old", "text_content": "old text " * 500})
+    index.add("http://example.com/d", replacement)
+    index.add("http://example.com/a", PAGES["http://example.com/a"])
+    fresh = _index(dict(PAGES, **{"http://example.com/d": replacement}))
+    assert len(index) == len(fresh) == 4
+    for query in ("crawler", "robots", "about"):
+        assert index.search(query)["results"] == fresh.search(query)["results"]
@@ -0,0 +1,165 @@
+import json
+import threading
+import time
+from contextlib import contextmanager
+
+from requests.adapters import HTTPAdapter
+from urllib3.connection import HTTPConnection, HTTPSConnection
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+
+CRAWL_METRICS_FILE = 'crawl_metrics.json'
+
+# Upper bounds (seconds) of the histogram buckets, as in Prometheus clients.
+TIMING_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# Seconds spent in each named stage of one page, summed if a stage repeats.
+class StageTimer:
+    def __init__(self, stages=None):
+        self.stages = dict(stages or {})
+
+    @contextmanager
+    def stage(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(name, time.perf_counter() - start)
+
+    def add(self, name, seconds):
+        self.stages[name] = self.stages.get(name, 0.0) + seconds
+
+    def result(self):
+        return {name: round(seconds, 6) for name, seconds in self.stages.items()}
+
+# One histogram per stage, fed with the per-page timings as pages are merged.
+class StageHistograms:
+    def __init__(self, buckets=TIMING_BUCKETS):
+        self.buckets = tuple(buckets)
+        self.stages = {}
+
+    def observe(self, name, seconds):
+        stage = self.stages.get(name)
+        if stage is None:
+            stage = self.stages[name] = {"counts": [0] * (len(self.buckets) + 1), "sum": 0.0, "count": 0}
+        i = next((i for i, bound in enumerate(self.buckets) if seconds <= bound), len(self.buckets))
+        stage["counts"][i] += 1
+        stage["sum"] += seconds
+        stage["count"] += 1
+
+    def observe_all(self, timings):
+        for name, seconds in (timings or {}).items():
+            self.observe(name, seconds)
+
+    # Adds in the stages of another histogram's to_dict(), e.g. from a worker process.
+    def merge(self, other):
+        if tuple(other.get("buckets") or self.buckets) != self.buckets:
+            raise ValueError("Cannot merge histograms with different buckets")
+        for name, other_stage in (other.get("stages") or {}).items():
+            stage = self.stages.get(name)
+            if stage is None:
+                stage = self.stages[name] = {"counts": [0] * (len(self.buckets) + 1), "sum": 0.0, "count": 0}
+            stage["counts"] = [a + b for a, b in zip(stage["counts"], other_stage["counts"])]
+            stage["sum"] += other_stage["sum"]
+            stage["count"] += other_stage["count"]
+
+    def to_dict(self):
+        return {"buckets": list(self.buckets),
+                "stages": {name: dict(stage, sum=round(stage["sum"], 6)) for name, stage in sorted(self.stages.items())}}
+
+def write_metrics_file(histograms, crawl_stats=None, filename=CRAWL_METRICS_FILE):
+    metrics = {"generated_at": round(time.time(), 3), "crawl_stats": crawl_stats or {}}
+    metrics.update(histograms.to_dict())
+    with open(filename, 'w', encoding='utf-8') as f:
+        json.dump(metrics, f, indent=2)
+    print(f"Crawl metrics saved to {filename}")
+    return metrics
+
+def load_metrics_file(filename=CRAWL_METRICS_FILE):
+    with open(filename, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+def _label(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+def _number(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+# Prometheus text exposition of a metrics file: the stage histograms with
+# cumulative buckets plus a few gauges from the crawl stats.
+def prometheus_text(metrics):
+    lines = ["# HELP crawler_stage_seconds Time spent per page in each crawl stage.",
+             "# TYPE crawler_stage_seconds histogram"]
+    bounds = [_number(float(b)) for b in metrics.get("buckets", [])] + ["+Inf"]
+    for name, stage in metrics.get("stages", {}).items():
+        total = 0
+        for bound, count in zip(bounds, stage["counts"]):
+            total += count
+            lines.append(f'crawler_stage_seconds_bucket{{stage="{_label(name)}",le="{bound}"}} {total}')
+        lines.append(f'crawler_stage_seconds_sum{{stage="{_label(name)}"}} {_number(stage["sum"])}')
+        lines.append(f'crawler_stage_seconds_count{{stage="{_label(name)}"}} {stage["count"]}')
+
+    stats = metrics.get("crawl_stats") or {}
+    for key, help_text in (("pages", "Pages crawled in the last crawl."),
+                           ("seconds", "Duration of the last crawl in seconds."),
+                           ("pages_per_second", "Crawl throughput of the last crawl.")):
+        if stats.get(key) is not None:
+            lines += [f"# HELP crawler_{key} {help_text}", f"# TYPE crawler_{key} gauge", f"crawler_{key} {_number(stats[key])}"]
+    hosts = stats.get("rate_control") or {}
+    if hosts:
+        lines += ["# HELP crawler_host_rate Final request rate per host (requests per second).",
+                  "# TYPE crawler_host_rate gauge"]
+        lines += [f'crawler_host_rate{{host="{_label(host)}"}} {_number(state["rate"])}' for host, state in hosts.items()]
+    lines.append(f"crawler_metrics_generated_timestamp_seconds {_number(metrics.get('generated_at', 0))}")
+    return "\n".join(lines) + "\n"
+
+_connection_timings = threading.local()
+
+# Time spent opening connections (DNS lookup and TCP connect, then the TLS
+# handshake for https) on the current thread since the last call. Connections
+# reused from the pool cost nothing.
+def pop_connection_timings():
+    timings = getattr(_connection_timings, "stages", None) or {}
+    _connection_timings.stages = {}
+    return timings
+
+def _add_connection_timing(name, seconds):
+    stages = getattr(_connection_timings, "stages", None)
+    if stages is None:
+        stages = _connection_timings.stages = {}
+    stages[name] = stages.get(name, 0.0) + seconds
+
+class TimedHTTPConnection(HTTPConnection):
+    def _new_conn(self):
+        start = time.perf_counter()
+        try:
+            return super()._new_conn()
+        finally:
+            _add_connection_timing("connect", time.perf_counter() - start)
+
+class TimedHTTPSConnection(HTTPSConnection):
+    def _new_conn(self):
+        start = time.perf_counter()
+        try:
+            return super()._new_conn()
+        finally:
+            self._connected_at = time.perf_counter()
+            _add_connection_timing("connect", self._connected_at - start)
+
+    def connect(self):
+        self._connected_at = None
+        try:
+            return super().connect()
+        finally:
+            if self._connected_at is not None:
+                _add_connection_timing("tls", time.perf_counter() - self._connected_at)
+
+class TimedHTTPConnectionPool(HTTPConnectionPool):
+    ConnectionCls = TimedHTTPConnection
+
+class TimedHTTPSConnectionPool(HTTPSConnectionPool):
+    ConnectionCls = TimedHTTPSConnection
+
+class TimedHTTPAdapter(HTTPAdapter):
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = {"http": TimedHTTPConnectionPool, "https": TimedHTTPSConnectionPool}